@@ -0,0 +1,245 @@
+from datetime import *
+import threading
+import random
+
+try:
+    from .onsched_service import parse_date_time
+except ImportError:
+    from onsched_service import parse_date_time
+
+
+class AppointmentConflictError(Exception):
+    """Raised when an appointment overlaps appointments already held by its resource
+
+    The overlapping appointments are available in the appointments attribute.
+    """
+    def __init__(self, resource_id, appointments):
+        super().__init__(f'resource {resource_id} has {len(appointments)} overlapping appointment(s)')
+        self.resource_id = resource_id
+        self.appointments = appointments
+
+
+class AppointmentIndex:
+    def __init__(self, appointments=None):
+        """Creates an AppointmentIndex instance.
+
+        The index holds the appointments of each resource in an interval tree (a treap ordered by start,
+        each node keeping the latest end of its subtree), so the appointments overlapping a time are
+        found in O(log n + k).  Cancelled ("CN") appointments are not indexed.  Times with a timezone
+        offset are indexed (and queried) in UTC, so appointments sent with different offsets are
+        compared correctly; times without offset are used as they are.
+
+        Pass the index to OnSchedService as appointment_index to check appointments for conflicts before
+        they are created, and keep the index current with the appointments created, booked and cancelled
+        through the client.
+
+        :param appointments: an appointments response, or a list of appointments, to index
+        :type appointments: dict or list
+        """
+        self.roots = {}
+        self.keys = {}
+        self.lock = threading.Lock()
+
+        if appointments:
+            self.add_appointments(appointments)
+
+
+    def add_appointments(self, appointments):
+        """Index the appointments of an appointments response
+
+        :param appointments: an appointments response, or a list of appointments
+        :type appointments: dict or list
+        """
+        if isinstance(appointments, dict):
+            appointments = appointments.get('data') or []
+
+        for appointment in appointments:
+            self.add(appointment)
+
+
+    def add(self, appointment):
+        """Index an appointment, replacing the appointment with the same id
+
+        Appointments without a resource or times are ignored, and cancelled appointments are removed.
+
+        :param appointment: the appointment, as returned by the OnSched API
+        :type appointment: dict
+        """
+        with self.lock:
+            if appointment.get('id') is not None:
+                self._remove(str(appointment['id']))
+
+            resource_id = str(appointment.get('resourceId') or '')
+            if not resource_id or appointment.get('status') == 'CN' \
+                    or not appointment.get('startDateTime') or not appointment.get('endDateTime'):
+                return
+
+            node = _Node(parse_date_time(appointment['startDateTime'], utc=True),
+                         parse_date_time(appointment['endDateTime'], utc=True),
+                         appointment)
+            if appointment.get('id') is not None:
+                self.keys[str(appointment['id'])] = (resource_id, node.key)
+
+            self.roots[resource_id] = _insert(self.roots.get(resource_id), node)
+
+
+    def remove(self, appointment_id):
+        """Remove an appointment from the index
+
+        :param appointment_id: the id of the appointment
+        :type appointment_id: str
+
+        :return: True if the appointment was indexed
+        :rtype: bool
+        """
+        with self.lock:
+            return self._remove(str(appointment_id))
+
+
+    def overlapping(self, resource_id, start_date_time, end_date_time):
+        """Get the appointments of a resource overlapping the time between start_date_time and end_date_time
+
+        :param resource_id: the resource id
+        :type resource_id: str
+        :param start_date_time: the start of the time
+        :type start_date_time: datetime
+        :param end_date_time: the end of the time
+        :type end_date_time: datetime
+
+        :return: the overlapping appointments, sorted by start
+        :rtype: list
+        """
+        appointments = []
+        with self.lock:
+            _overlapping(self.roots.get(str(resource_id)),
+                         parse_date_time(start_date_time, utc=True),
+                         parse_date_time(end_date_time, utc=True),
+                         appointments)
+
+        return appointments
+
+
+    def check(self, resource_id, start_date_time, end_date_time, exclude=None):
+        """Check that a resource holds no appointment overlapping the time between start_date_time and end_date_time
+
+        :param resource_id: the resource id
+        :type resource_id: str
+        :param start_date_time: the start of the time
+        :type start_date_time: datetime
+        :param end_date_time: the end of the time
+        :type end_date_time: datetime
+        :param exclude: the id of an appointment allowed to overlap the time, e.g. an appointment being moved
+        :type exclude: str
+
+        :return: None
+
+        :exception AppointmentConflictError: raised if appointments of the resource overlap the time
+        """
+        appointments = [appointment for appointment in self.overlapping(resource_id, start_date_time, end_date_time)
+                        if exclude is None or str(appointment.get('id')) != str(exclude)]
+        if appointments:
+            raise AppointmentConflictError(resource_id, appointments)
+
+
+    #####################
+    # Private methods
+    #####################
+    def _remove(self, appointment_id):
+        """Remove an appointment from the index, the lock being held
+
+        :return: True if the appointment was indexed
+        :rtype: bool
+        """
+        if appointment_id not in self.keys:
+            return False
+
+        resource_id, key = self.keys.pop(appointment_id)
+        self.roots[resource_id] = _delete(self.roots.get(resource_id), key)
+        if self.roots[resource_id] is None:
+            del self.roots[resource_id]
+
+        return True
+
+
+class _Node:
+    __slots__ = ('key', 'start', 'end', 'appointment', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, start, end, appointment):
+        self.key = (start, end, id(appointment))
+        self.start = start
+        self.end = end
+        self.appointment = appointment
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+
+def _update(node):
+    """Recompute the latest end of the subtree of a node"""
+    node.max_end = node.end
+    if node.left is not None and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+    return node
+
+
+def _split(node, key):
+    """Split a treap into the nodes with keys lower than key and the others"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        return _update(node), right
+
+    left, node.left = _split(node.left, key)
+    return left, _update(node)
+
+
+def _merge(left, right):
+    """Merge two treaps, the keys of left being lower than the keys of right"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+def _insert(root, node):
+    """Insert a node in a treap"""
+    left, right = _split(root, node.key)
+    return _merge(_merge(left, node), right)
+
+
+def _delete(node, key):
+    """Delete the node with the given key from a treap"""
+    if node is None:
+        return None
+    if node.key == key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+
+    return _update(node)
+
+
+def _overlapping(node, start, end, appointments):
+    """Collect, in order, the appointments of a treap overlapping the time between start and end"""
+    if node is None or node.max_end <= start:
+        return
+
+    _overlapping(node.left, start, end, appointments)
+    if node.start < end:
+        if node.end > start:
+            appointments.append(node.appointment)
+        _overlapping(node.right, start, end, appointments)
+
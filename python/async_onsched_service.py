@@ -0,0 +1,870 @@
+try:
+    from .onsched_service import OnSchedBase
+except ImportError:
+    from onsched_service import OnSchedBase
+from datetime import *
+import asyncio
+import aiohttp
+import json
+
+
+class AsyncOnSchedService(OnSchedBase):
+    def __init__(self,
+                 client_id,
+                 client_secret,
+                 scope='OnSchedAPI',
+                 environment='sandbox',
+                 max_workers=8,
+                 setup_scope=None,
+                 pool_size=100,
+                 timeout=30,
+                 json_decoder=None):
+        """Creates an AsyncOnSchedService instance.
+
+        The client offers part of the methods of OnSchedService, as coroutines that must be awaited (the iter_*
+        methods return async generators).  It has no bulk operations, response caches, retries, deadlines, circuit breaker or token
+        store.  The HTTP session is created on first use inside the running event loop and its connection pool
+        is shared by every call made through the client.  Release it with close(), or use the client as an async
+        context manager.
+
+        :param client_id: client id provided by OnSched
+        :type client_id: str
+        :param client_secret: client secret provided by OnSched
+        :type client_secret: str
+        :param scope: client scope provided by OnSched
+        :type scope: str
+        :param environment: app environment ('sandbox' for sandbox endpoints, 'live' for production endpoints)
+        :type environment: str
+        :param max_workers: maximum number of pages fetched concurrently by the list endpoints (1 fetches serially)
+        :type max_workers: int
+        :param setup_scope: client scope used for the setup API. Defaults to scope
+        :type setup_scope: str
+        :param pool_size: maximum number of simultaneous connections in the shared connection pool
+        :type pool_size: int
+        :param timeout: number of seconds a request may take.  None waits forever
+        :type timeout: float
+        :param json_decoder: function decoding the raw bytes of the JSON responses. Defaults to decode_json
+        :type json_decoder: function
+        """
+        super().__init__(client_id=client_id,
+                         client_secret=client_secret,
+                         scope=scope,
+                         environment=environment,
+                         max_workers=max_workers,
+                         setup_scope=setup_scope,
+                         json_decoder=json_decoder)
+
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.http_session = None
+        # tokens are fetched on first use and shared by the APIs using the same scope
+        self.tokens = {}
+        self._token_locks = {}
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+    async def close(self):
+        """Close the shared HTTP session and its connection pool
+
+        :return: None
+        """
+        if self.http_session:
+            await self.http_session.close()
+            self.http_session = None
+
+
+    async def locations(self):
+        """Get a complete list of locations
+
+        :return: location data dictionary
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        locations_url = f'{self.consumer_api}/locations?'
+
+        return await self._fetch_data(url=locations_url)
+
+
+    def iter_locations(self, prefetch=False):
+        """Iterate over the complete list of locations, one page at a time
+
+        :param prefetch: fetch the next page while the current page is being processed
+        :type prefetch: bool
+
+        :return: async generator of location data dictionaries
+        :rtype: async_generator
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        locations_url = f'{self.consumer_api}/locations?'
+
+        return self._iter_data(url=locations_url, prefetch=prefetch)
+
+
+    async def location(self, location_id):
+        """Get a single location
+
+        :param location_id: the specific location id to be searched
+        :type location_id: str
+
+        :return: a single location data
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        location_url = f'{self.consumer_api}/locations/{location_id}?'
+
+        return await self._fetch_data(url=location_url)
+
+
+    async def services(self, location_id='', service_group='', default_service=False):
+        """Get a complete list of services based on location_id
+
+        See OnSchedService.services for the parameters.
+
+        :return: services data dictionary
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        services_url = self._services_url(location_id=location_id,
+                                          service_group=service_group,
+                                          default_service=default_service)
+
+        return await self._fetch_data(url=services_url)
+
+
+    def iter_services(self, location_id='', service_group='', default_service=False, prefetch=False):
+        """Iterate over the complete list of services based on location_id, one page at a time
+
+        See OnSchedService.iter_services for the parameters.
+
+        :return: async generator of service data dictionaries
+        :rtype: async_generator
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        services_url = self._services_url(location_id=location_id,
+                                          service_group=service_group,
+                                          default_service=default_service)
+
+        return self._iter_data(url=services_url, prefetch=prefetch)
+
+
+    async def customers(self, location_id='', group_id='', email='', lastname='', deleted=False):
+        """Return a list of customers based on a location
+
+        See OnSchedService.customers for the parameters.
+
+        :return: a list of customers matching the criteria
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        customers_url = self._customers_url(location_id=location_id,
+                                            group_id=group_id,
+                                            email=email,
+                                            lastname=lastname,
+                                            deleted=deleted)
+
+        return await self._fetch_data(url=customers_url)
+
+
+    def iter_customers(self, location_id='', group_id='', email='', lastname='', deleted=False, prefetch=False):
+        """Iterate over the customers based on a location, one page at a time
+
+        See OnSchedService.iter_customers for the parameters.
+
+        :return: async generator of customer data dictionaries
+        :rtype: async_generator
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        customers_url = self._customers_url(location_id=location_id,
+                                            group_id=group_id,
+                                            email=email,
+                                            lastname=lastname,
+                                            deleted=deleted)
+
+        return self._iter_data(url=customers_url, prefetch=prefetch)
+
+
+    async def availability(self,
+                           service_id,
+                           start_date,
+                           end_date,
+                           start_time=0,
+                           end_time=0,
+                           location_id='',
+                           resource_id='',
+                           resource_group_id='',
+                           resource_ids=None,
+                           duration=0,
+                           tz_offset=0,
+                           day_availability=0,
+                           first_day_available=False):
+        """Get Availability information for a given service between start_date and end_date
+
+        Availability is an expensive call, see OnSchedService.availability for guidance on the parameters.
+
+        :return: Returns a list of times available as well as information about the resource and service
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        :exception TypeError: raised if date inputs are in incorrect format
+        """
+        availability_url = self._availability_url(service_id=service_id,
+                                                  start_date=start_date,
+                                                  end_date=end_date,
+                                                  start_time=start_time,
+                                                  end_time=end_time,
+                                                  location_id=location_id,
+                                                  resource_id=resource_id,
+                                                  resource_group_id=resource_group_id,
+                                                  resource_ids=resource_ids,
+                                                  duration=duration,
+                                                  tz_offset=tz_offset,
+                                                  day_availability=day_availability,
+                                                  first_day_available=first_day_available)
+
+        return await self._fetch_data(url=availability_url)
+
+
+    async def appointments(self,
+                           location_id='',
+                           email='',
+                           lastname='',
+                           service_id='',
+                           service_allocation_id='',
+                           resource_id='',
+                           customer_id='',
+                           start_date=None,
+                           end_date=None,
+                           status='',
+                           booked_by=''):
+        """List all appointments
+
+        See OnSchedService.appointments for the parameters.
+
+        :return: Returns a dictionary containing a list of appointments filtered
+                 by the parameters specified
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        :exception TypeError: raised if date_time inputs are in incorrect format
+        """
+        appointments_url = self._appointments_url(location_id=location_id,
+                                                  email=email,
+                                                  lastname=lastname,
+                                                  service_id=service_id,
+                                                  service_allocation_id=service_allocation_id,
+                                                  resource_id=resource_id,
+                                                  customer_id=customer_id,
+                                                  start_date=start_date,
+                                                  end_date=end_date,
+                                                  status=status,
+                                                  booked_by=booked_by)
+
+        return await self._fetch_data(url=appointments_url)
+
+
+    def iter_appointments(self,
+                          location_id='',
+                          email='',
+                          lastname='',
+                          service_id='',
+                          service_allocation_id='',
+                          resource_id='',
+                          customer_id='',
+                          start_date=None,
+                          end_date=None,
+                          status='',
+                          booked_by='',
+                          prefetch=False):
+        """Iterate over all appointments, one page at a time
+
+        See OnSchedService.iter_appointments for the parameters.
+
+        :return: async generator of appointment data dictionaries
+        :rtype: async_generator
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        :exception TypeError: raised if date_time inputs are in incorrect format
+        """
+        appointments_url = self._appointments_url(location_id=location_id,
+                                                  email=email,
+                                                  lastname=lastname,
+                                                  service_id=service_id,
+                                                  service_allocation_id=service_allocation_id,
+                                                  resource_id=resource_id,
+                                                  customer_id=customer_id,
+                                                  start_date=start_date,
+                                                  end_date=end_date,
+                                                  status=status,
+                                                  booked_by=booked_by)
+
+        return self._iter_data(url=appointments_url, prefetch=prefetch)
+
+
+    async def create_appointment(self,
+                                 service_id,
+                                 start_date_time,
+                                 end_date_time,
+                                 resource_id,
+                                 location_id='',
+                                 customer_id='',
+                                 service_allocation_id='',
+                                 booked_by=''):
+        """Create a new appointment in an Initial "IN" status
+
+        See OnSchedService.create_appointment for the parameters.
+
+        :return: Returns a dictionary containing the appointment reservations, including appointment id
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        :exception TypeError: raised if date_time inputs are in incorrect format
+        """
+        appointment_url = f'{self.consumer_api}/appointments'
+
+        payload = self._appointment_payload(service_id=service_id,
+                                            start_date_time=start_date_time,
+                                            end_date_time=end_date_time,
+                                            resource_id=resource_id,
+                                            location_id=location_id,
+                                            customer_id=customer_id,
+                                            service_allocation_id=service_allocation_id,
+                                            booked_by=booked_by)
+
+        return await self._post_data(url=appointment_url, data=payload)
+
+
+    async def book_appointment(self,
+                               appointment_id,
+                               email='',
+                               name='',
+                               phone='',
+                               phone_type='',
+                               phone_ext='',
+                               customer_message='',
+                               notes='',
+                               appointment_booking_fields=None,
+                               customer_booking_fields=None):
+        """Finalize a booking
+
+        See OnSchedService.book_appointment for the parameters.
+
+        :return: Returns a dictionary of the appointment
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        appointment_url = f'{self.consumer_api}/appointments/{appointment_id}/book'
+
+        payload = self._booking_payload(email=email,
+                                        name=name,
+                                        phone=phone,
+                                        phone_type=phone_type,
+                                        phone_ext=phone_ext,
+                                        customer_message=customer_message,
+                                        notes=notes,
+                                        appointment_booking_fields=appointment_booking_fields,
+                                        customer_booking_fields=customer_booking_fields)
+
+        return await self._update_data(url=appointment_url, data=payload)
+
+
+    async def cancel_appointment(self, appointment_id):
+        """Cancel an appointment which has been booked with book_appointment
+
+        :param appointment_id: the appointment id to be cancelled
+        :type appointment_id: str
+
+        :return: returns the booking that has been cancelled with the status updated to CN
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        cancellation_url = f'{self.consumer_api}/appointments/{appointment_id}/cancel'
+
+        return await self._update_data(url=cancellation_url, data={})
+
+
+    # Setup API actions
+    async def create_resource(self, name, **resource_data):
+        """Create a resource
+
+        :param name: the resource name
+        :type name: str
+        :param resource_data: the optional keyword arguments accepted by OnSchedService.create_resource
+
+        :return: A resource object dictionary
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        create_resource_url = f'{self.setup_api}/resources'
+
+        payload = { 'name': name }
+
+        payload.update(self._get_resources_data(**resource_data))
+
+        return await self._post_data(url=create_resource_url, data=payload, setup=True)
+
+
+    async def update_resource(self, resource_id, name='', **resource_data):
+        """Update a resource
+
+        :param resource_id: the resource id to be updated
+        :type resource_id: str
+        :param name: the resource name
+        :type name: str
+        :param resource_data: the optional keyword arguments accepted by OnSchedService.update_resource
+
+        :return: A resource object dictionary
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        update_resource_url = f'{self.setup_api}/resources/{resource_id}'
+
+        payload = {}
+
+        if name:
+            payload['name'] = name
+
+        payload.update(self._get_resources_data(**resource_data))
+
+        return await self._update_data(url=update_resource_url, data=payload, setup=True)
+
+
+    async def delete_resource(self, resource_id):
+        """Delete a resource
+
+        :param resource_id: the id of the resource to be deleted
+        :type resource_id: str
+        :return: the resource object that has been deleted
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        delete_resource_url = f'{self.setup_api}/resources/{resource_id}'
+
+        return await self._delete_data(url=delete_resource_url, setup=True)
+
+
+    async def create_service(self, name, description, duration, **service_data):
+        """Create a new service
+
+        :param name: the name of the service
+        :type name: str
+        :param description: a description of the service
+        :type description: str
+        :param duration: the default duration of the service
+        :type duration: int
+        :param service_data: the optional keyword arguments accepted by OnSchedService.create_service
+
+        :return: a new service object
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        service_url = f'{self.setup_api}/services'
+
+        payload = self._service_payload(name=name, description=description, duration=duration, **service_data)
+
+        return await self._post_data(url=service_url, data=payload)
+
+
+    async def delete_service(self, service_id):
+        """Delete a service
+
+        :param service_id: the id of the service to be deleted
+        :type service_id: str
+
+        :return: the service object that has been deleted
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        delete_service_url = f'{self.setup_api}/services/{service_id}'
+
+        return await self._delete_data(url=delete_service_url, setup=True)
+
+
+    async def service_allocations(self, service_id, start_date=None, end_date=None, location_id=''):
+        """Get the service allocations for a given service
+
+        See OnSchedService.service_allocations for the parameters.
+
+        :return: service allocations data dictionary
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        service_allocations_url = self._service_allocations_url(service_id=service_id,
+                                                                start_date=start_date,
+                                                                end_date=end_date,
+                                                                location_id=location_id)
+
+        return await self._fetch_data(url=service_allocations_url, setup=True)
+
+
+    def iter_service_allocations(self, service_id, start_date=None, end_date=None, location_id='', prefetch=False):
+        """Iterate over the service allocations for a given service, one page at a time
+
+        See OnSchedService.iter_service_allocations for the parameters.
+
+        :return: async generator of service allocation data dictionaries
+        :rtype: async_generator
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        service_allocations_url = self._service_allocations_url(service_id=service_id,
+                                                                start_date=start_date,
+                                                                end_date=end_date,
+                                                                location_id=location_id)
+
+        return self._iter_data(url=service_allocations_url, setup=True, prefetch=prefetch)
+
+
+    async def service_allocation(self, service_allocation_id):
+        """Get a single service allocation
+
+        :param service_allocation_id: the id of the service allocation
+        :type service_allocation_id: str
+
+        :return: single service allocation data
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        service_allocation_url = f'{self.consumer_api}/services/allocations/{service_allocation_id}?'
+
+        return await self._fetch_data(url=service_allocation_url)
+
+
+    async def create_service_allocation(self,
+                                        service_id,
+                                        start_date,
+                                        end_date,
+                                        start_time,
+                                        end_time,
+                                        location_id='',
+                                        resource_id='',
+                                        reason='',
+                                        all_day=False):
+        """Create a new service allocation
+
+        See OnSchedService.create_service_allocation for the parameters.
+
+        :return: a serviceAllocation object containing the data of the new allocation
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        create_service_allocation_url = f'{self.setup_api}/services/{service_id}/allocations'
+
+        payload = self._service_allocation_payload(start_date=start_date,
+                                                   end_date=end_date,
+                                                   start_time=start_time,
+                                                   end_time=end_time,
+                                                   location_id=location_id,
+                                                   resource_id=resource_id,
+                                                   reason=reason,
+                                                   all_day=all_day)
+
+        return await self._post_data(url=create_service_allocation_url, data=payload, setup=True)
+
+
+    #####################
+    # Private methods
+    #####################
+    async def _fetch_data(self, url, setup=False):
+        """Perform a paginated GET request on the given URL and merge the pages
+
+        The first page is fetched on its own to learn the total number of records.  The
+        remaining pages are then fetched concurrently, at most max_workers at a time, and
+        merged in offset order.
+
+        :param url: complete API URL
+        :type url: str
+        :param setup: use the setup API scope instead of the consumer API scope
+        :type setup: bool
+
+        :return: API response formatted as a data dictionary
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        offset = 0
+        has_more = False
+        data = None
+
+        formatted_response = await self._fetch_page(url, offset, setup)
+
+        if 'hasMore' in formatted_response:
+            has_more = formatted_response['hasMore']
+        if 'data' in formatted_response:
+            data = formatted_response['data']
+
+        # once the total is known, fetch the remaining pages concurrently
+        if has_more and 'total' in formatted_response and self.max_workers > 1:
+            offsets = range(self.PAGE_LIMIT, formatted_response['total'], self.PAGE_LIMIT)
+
+            if offsets:
+                semaphore = asyncio.Semaphore(self.max_workers)
+
+                async def fetch_page(page_offset):
+                    async with semaphore:
+                        return await self._fetch_page(url, page_offset, setup)
+
+                # gather returns the pages in offset order
+                pages = await asyncio.gather(*(fetch_page(page_offset) for page_offset in offsets))
+
+                for offset, formatted_response in zip(offsets, pages):
+                    data += formatted_response['data']
+
+                has_more = formatted_response['hasMore']
+
+        # loop over any remaining data until 'hasMore' is False
+        while has_more:
+            offset += self.PAGE_LIMIT
+            formatted_response = await self._fetch_page(url, offset, setup)
+
+            data += formatted_response['data']
+            # update has_more
+            has_more = formatted_response['hasMore']
+
+        # use the final response
+        result = formatted_response
+        # if data exists, replace data with the accumulated result
+        if data:
+            result['count'] = result['total']
+            result['data'] = data
+
+        return result
+
+
+    async def _iter_data(self, url, setup=False, prefetch=False):
+        """Perform a paginated GET request on the given URL, yielding the records one page at a time
+
+        :param url: complete API URL
+        :type url: str
+        :param setup: use the setup API scope instead of the consumer API scope
+        :type setup: bool
+        :param prefetch: fetch the next page while the current page is being processed
+        :type prefetch: bool
+
+        :return: async generator of the records found in the 'data' of each page
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        next_page = None
+        offset = 0
+        has_more = True
+
+        try:
+            while has_more:
+                if next_page:
+                    formatted_response = await next_page
+                else:
+                    formatted_response = await self._fetch_page(url, offset, setup)
+
+                has_more = formatted_response.get('hasMore', False)
+                offset += self.PAGE_LIMIT
+
+                # start fetching the next page before handing out the current one
+                next_page = None
+                if has_more and prefetch:
+                    next_page = asyncio.ensure_future(self._fetch_page(url, offset, setup))
+
+                for record in formatted_response.get('data', []):
+                    yield record
+        finally:
+            if next_page:
+                next_page.cancel()
+
+
+    async def _fetch_page(self, url, offset, setup=False):
+        """Perform a GET request for a single page of the given URL
+
+        :param url: complete API URL
+        :type url: str
+        :param offset: the offset of the first record of the page
+        :type offset: int
+        :param setup: use the setup API scope instead of the consumer API scope
+        :type setup: bool
+
+        :return: API response formatted as a data dictionary
+        :rtype: dict
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        return await self._request('GET', url + f'&limit={self.PAGE_LIMIT}&offset={offset}', setup=setup)
+
+
+    async def _post_data(self, url, data, setup=False):
+        """Perform a POST request on the given URL
+
+        :param url: complete API URL
+        :type: str
+        :param data: a dictionary of data to post to the API.  the data is submitted as JSON
+        :type: dict
+        :param setup: use the setup API scope instead of the consumer API scope
+        :type setup: bool
+
+        :return: API response formatted as a data dictionary
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        return await self._request('POST', url, data=data, setup=setup)
+
+
+    async def _update_data(self, url, data, setup=False):
+        """Perform a PUT request on the given URL
+
+        :param url: complete API URL
+        :param data: a dictionary of data to send to the update (PUT/PATCH) endpoint.  the data is submitted as JSON
+        :param setup: use the setup API scope instead of the consumer API scope
+        :type setup: bool
+
+        :return: API response formatted as a data dictionary
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        return await self._request('PUT', url, data=data, setup=setup)
+
+
+    async def _delete_data(self, url, setup=False):
+        """Perform a DELETE request on the given URL
+
+        :param url: complete API URL
+        :param setup: use the setup API scope instead of the consumer API scope
+        :type setup: bool
+
+        :return: API response formatted as a data dictionary
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        return await self._request('DELETE', url, setup=setup)
+
+
+    async def _request(self, method, url, data=None, setup=False):
+        """Perform an authorized request through the shared HTTP session
+
+        :param method: the HTTP method
+        :type method: str
+        :param url: complete API URL
+        :type url: str
+        :param data: a dictionary of data submitted as JSON, if any
+        :type data: dict
+        :param setup: use the setup API scope instead of the consumer API scope
+        :type setup: bool
+
+        :return: API response formatted as a data dictionary
+
+        :exception ClientResponseError: raised if the HTTP request returned an unsuccessful status code
+        :exception TimeoutError: raised if the request times out
+        """
+        scope = self.setup_scope if setup else self.scope
+
+        await self._set_session(scope)  # verify the session is setup
+
+        headers = { 'Authorization': f"Bearer {self.tokens[scope]['access_token']}" }
+
+        async with self.http_session.request(method, url, json=data, headers=headers) as response:
+            response.raise_for_status()
+
+            return self.json_decoder(await response.read())
+
+
+    async def _set_session(self, scope):
+        """Setup the shared HTTP session and fetch a token for the scope from the OAuth server if needed
+
+        Concurrent callers wait on a single token request instead of each fetching their own.
+
+        :param scope: the scope the token is requested for
+        :type scope: str
+
+        :return: None
+        """
+        if self.http_session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.http_session = aiohttp.ClientSession(connector=connector,
+                                                      timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+        if self._token_is_valid(scope):
+            return
+
+        token_lock = self._token_locks.setdefault(scope, asyncio.Lock())
+
+        async with token_lock:
+            # another task may have fetched the token while we were waiting
+            if self._token_is_valid(scope):
+                return
+
+            payload = { 'grant_type': 'client_credentials', 'scope': scope }
+            auth = aiohttp.BasicAuth(self.client_id, self.client_secret)
+
+            async with self.http_session.post(self.token_url, data=payload, auth=auth) as response:
+                response.raise_for_status()
+
+                token = json.loads(await response.text())
+
+            token['expires_at'] = datetime.now(timezone.utc).timestamp() + int(token.get('expires_in', 0))
+            self.tokens[scope] = token
+
+
+    def _token_is_valid(self, scope):
+        """Check whether the token for the scope exists and has not expired
+
+        :param scope: the scope of the token
+        :type scope: str
+
+        :return: True if the token can be used
+        :rtype: bool
+        """
+        token = self.tokens.get(scope)
+        unix_timestamp = datetime.now(timezone.utc).timestamp()
+
+        return bool(token) and token['expires_at'] > unix_timestamp
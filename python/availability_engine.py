@@ -0,0 +1,349 @@
+from datetime import *
+import threading
+import numpy
+
+try:
+    from .onsched_service import parse_date_time
+except ImportError:
+    from onsched_service import parse_date_time
+
+
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+class AvailabilityEngine:
+    def __init__(self,
+                 onsched,
+                 service_id,
+                 resource_ids,
+                 location_id='',
+                 duration=0,
+                 interval=0,
+                 business_hours=None):
+        """Creates an AvailabilityEngine instance.
+
+        The engine computes the open slots of a service locally, from data the client can already fetch:
+        the business hours of the location, the service allocations and the appointments of the resources.
+        Each day is held as a NumPy array of minutes per resource, so a slot search is a few vectorized
+        operations instead of a call to the availability endpoint.  Call load() for a span of dates, then
+        keep the engine current with add_appointment() and remove_appointment() as appointments change.
+        Appointments are counted by id, so adding an appointment again replaces it.
+
+        The engine models business hours, allocations and appointments only.  Use verify() to compare its
+        slots against the availability endpoint before relying on it for a service.
+
+        :param onsched: the client used to load the data
+        :type onsched: OnSchedService
+        :param service_id: the service id for which slots are computed
+        :type service_id: str
+        :param resource_ids: List of resource id strings offering the service
+        :type resource_ids: list
+        :param location_id: the id of the business location. Defaults to first business location.
+        :type location_id: str
+        :param duration: duration of the service in minutes.  Read from the service when not given.
+        :type duration: int
+        :param interval: minutes between two slot starts.  Defaults to the duration.
+        :type interval: int
+        :param business_hours: business hours keyed by 'mon' to 'sun', each a dict with startTime and endTime
+                               as military times.  Read from the location when not given.
+        :type business_hours: dict
+        """
+        self.onsched = onsched
+        self.service_id = str(service_id)
+        self.resource_ids = [str(resource_id) for resource_id in resource_ids]
+        self.location_id = location_id
+        self.duration = duration
+        self.interval = interval
+        self.business_hours = business_hours
+
+        self.allocations = []
+        self.open_minutes = {}
+        self.busy_minutes = {}
+        self.marked = {}
+        self.lock = threading.Lock()
+
+        self._resource_rows = {resource_id: row for row, resource_id in enumerate(self.resource_ids)}
+
+
+    def load(self, start_date, end_date):
+        """Fetch the data needed to compute the slots between start_date and end_date
+
+        Any data previously loaded for other dates is dropped.
+
+        :param start_date: the first date to load
+        :type start_date: date
+        :param end_date: the last date to load
+        :type end_date: date
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if date inputs are in incorrect format
+        :exception ValueError: raised if the duration is not given and the service is not found
+        """
+        first_day = self.onsched._as_date(start_date)
+        last_day = self.onsched._as_date(end_date)
+
+        if not self.duration:
+            services = self.onsched.services(location_id=self.location_id)
+            service = next((service for service in services.get('data') or []
+                            if str(service['id']) == self.service_id), None)
+            if service is None:
+                raise ValueError(f'service {self.service_id} not found, pass its duration')
+            self.duration = int(service['duration'])
+
+        if self.business_hours is None:
+            location_id = self.location_id or self.onsched.locations()['data'][0]['id']
+            self.business_hours = self.onsched.location(location_id).get('businessHours') or {}
+
+        allocations = self.onsched.service_allocations(self.service_id,
+                                                       start_date=first_day,
+                                                       end_date=last_day,
+                                                       location_id=self.location_id)
+        appointments = self.onsched.appointments(location_id=self.location_id,
+                                                 start_date=first_day,
+                                                 end_date=last_day)
+
+        with self.lock:
+            self.allocations = allocations.get('data') or []
+            self.open_minutes = {}
+            self.busy_minutes = {}
+            self.marked = {}
+
+            day = first_day
+            while day <= last_day:
+                self.open_minutes[day] = self._open_minutes(day)
+                self.busy_minutes[day] = numpy.zeros((len(self.resource_ids), MINUTES_PER_DAY), dtype=numpy.int16)
+                day += timedelta(days=1)
+
+            for appointment in appointments.get('data') or []:
+                self._add_appointment(appointment)
+
+
+    def add_appointment(self, appointment):
+        """Mark the time of a new or updated appointment as busy
+
+        The time of the appointment with the same id is freed first, so an appointment booked after
+        its reservation, or added twice, is only counted once.  A cancelled appointment is freed.
+
+        :param appointment: the appointment, as returned by the OnSched API
+        :type appointment: dict
+        """
+        with self.lock:
+            self._add_appointment(appointment)
+
+
+    def remove_appointment(self, appointment):
+        """Free the time of a cancelled or deleted appointment
+
+        Appointments which are not counted are ignored.
+
+        :param appointment: the appointment (as returned by the OnSched API), or its id
+        :type appointment: dict or str
+        """
+        appointment_id = appointment.get('id') if isinstance(appointment, dict) else appointment
+
+        with self.lock:
+            self._remove_appointment(appointment_id)
+
+
+    def availability(self, start_date, end_date, resource_id=''):
+        """Compute the open slots between start_date and end_date from the loaded data
+
+        :param start_date: the first date of the search
+        :type start_date: date
+        :param end_date: the last date of the search
+        :type end_date: date
+        :param resource_id: limit the search to a resource
+        :type resource_id: str
+
+        :return: the available times, shaped like the response of OnSchedService.availability
+        :rtype: dict
+
+        :exception KeyError: raised if a date of the search was not loaded
+        :exception TypeError: raised if date inputs are in incorrect format
+        """
+        first_day = self.onsched._as_date(start_date)
+        last_day = self.onsched._as_date(end_date)
+        interval = self.interval or self.duration
+
+        available_times = []
+        with self.lock:
+            day = first_day
+            while day <= last_day:
+                free = self.open_minutes[day] & (self.busy_minutes[day] == 0)
+
+                # a slot starting at minute t is free when its duration of minutes from t is free
+                free_before = numpy.zeros((free.shape[0], MINUTES_PER_DAY + 1), dtype=numpy.int32)
+                numpy.cumsum(free, axis=1, out=free_before[:, 1:])
+                starts = numpy.arange(0, MINUTES_PER_DAY - self.duration + 1, interval)
+                slots = (free_before[:, starts + self.duration] - free_before[:, starts]) == self.duration
+
+                midnight = datetime.combine(day, time())
+                for row, column in zip(*numpy.nonzero(slots)):
+                    if resource_id and self.resource_ids[row] != str(resource_id):
+                        continue
+                    slot_start = midnight + timedelta(minutes=int(starts[column]))
+                    available_times.append({ 'startDateTime': slot_start.isoformat(),
+                                             'endDateTime': (slot_start + timedelta(minutes=self.duration)).isoformat(),
+                                             'resourceId': self.resource_ids[row] })
+                day += timedelta(days=1)
+
+        available_times.sort(key=lambda time_slot: (time_slot['startDateTime'], time_slot['resourceId']))
+
+        return { 'serviceId': self.service_id,
+                 'startDate': first_day.isoformat(),
+                 'endDate': last_day.isoformat(),
+                 'availableTimes': available_times }
+
+
+    def verify(self, start_date, end_date, resource_id=''):
+        """Compare the slots computed locally with the slots returned by the availability endpoint
+
+        Slots are compared by their start time (to the minute, without timezone offset) and resource.
+
+        :param start_date: the first date of the comparison
+        :type start_date: date
+        :param end_date: the last date of the comparison
+        :type end_date: date
+        :param resource_id: limit the comparison to a resource
+        :type resource_id: str
+
+        :return: 'missing' slots returned by the API but not computed locally, and 'extra' slots computed
+                 locally but not returned by the API, each a sorted list of (startDateTime, resourceId)
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        remote = self.onsched.availability(self.service_id,
+                                           start_date,
+                                           end_date,
+                                           location_id=self.location_id,
+                                           resource_id=resource_id,
+                                           resource_ids=None if resource_id else self.resource_ids,
+                                           duration=self.duration)
+        local = self.availability(start_date, end_date, resource_id=resource_id)
+
+        remote_slots = self._slot_keys(remote)
+        local_slots = self._slot_keys(local)
+
+        return { 'missing': sorted(remote_slots - local_slots), 'extra': sorted(local_slots - remote_slots) }
+
+
+    #####################
+    # Private methods
+    #####################
+    def _open_minutes(self, day):
+        """Build the minutes of a day during which each resource offers the service
+
+        The allocations of the service covering the day replace the business hours.  An allocation with
+        a resourceId only opens the minutes of that resource.
+
+        :param day: the day
+        :type day: date
+
+        :return: one row of minutes per resource, True when open
+        :rtype: numpy.ndarray
+        """
+        open_minutes = numpy.zeros((len(self.resource_ids), MINUTES_PER_DAY), dtype=bool)
+
+        allocations = [allocation for allocation in self.allocations
+                       if allocation.get('startDate', '')[:10] <= day.isoformat() <= allocation.get('endDate', '9999')[:10]]
+        if not allocations:
+            hours = self.business_hours.get(WEEKDAYS[day.weekday()]) or {}
+            start = self._minute_of_day(hours.get('startTime', 0))
+            end = self._minute_of_day(hours.get('endTime', 0))
+            open_minutes[:, start:end] = True
+            return open_minutes
+
+        for allocation in allocations:
+            if allocation.get('allDay') in (True, 'true'):
+                start, end = 0, MINUTES_PER_DAY
+            else:
+                start = self._minute_of_day(allocation.get('startTime', 0))
+                end = self._minute_of_day(allocation.get('endTime', 0))
+
+            resource_id = str(allocation.get('resourceId') or '')
+            if not resource_id:
+                open_minutes[:, start:end] = True
+            elif resource_id in self._resource_rows:
+                open_minutes[self._resource_rows[resource_id], start:end] = True
+
+        return open_minutes
+
+
+    def _add_appointment(self, appointment):
+        """Count an appointment, replacing the appointment with the same id, the lock being held
+
+        Appointments without an id are counted, but can't be removed.
+        """
+        appointment_id = appointment.get('id')
+        self._remove_appointment(appointment_id)
+
+        if self._mark_appointment(appointment, 1) and appointment_id is not None:
+            self.marked[str(appointment_id)] = appointment
+
+
+    def _remove_appointment(self, appointment_id):
+        """Free the time of a counted appointment, the lock being held"""
+        if appointment_id is not None and str(appointment_id) in self.marked:
+            self._mark_appointment(self.marked.pop(str(appointment_id)), -1)
+
+
+    def _mark_appointment(self, appointment, count):
+        """Add count to the busy minutes of an appointment, on each loaded day it covers
+
+        Cancelled appointments and appointments of other resources are ignored.
+
+        :param appointment: the appointment, as returned by the OnSched API
+        :type appointment: dict
+        :param count: 1 to mark the appointment busy, -1 to free it
+        :type count: int
+
+        :return: False if the appointment was ignored
+        :rtype: bool
+        """
+        row = self._resource_rows.get(str(appointment.get('resourceId') or ''))
+        if row is None or appointment.get('status') == 'CN':
+            return False
+
+        start = parse_date_time(appointment['startDateTime'])
+        end = parse_date_time(appointment['endDateTime'])
+
+        day = start.date()
+        while day <= end.date():
+            if day in self.busy_minutes:
+                midnight = datetime.combine(day, time())
+                first_minute = max(0, int((start - midnight).total_seconds() // 60))
+                last_minute = min(MINUTES_PER_DAY, int(-(-(end - midnight).total_seconds() // 60)))
+                self.busy_minutes[day][row, first_minute:last_minute] += count
+            day += timedelta(days=1)
+
+        return True
+
+
+    def _minute_of_day(self, military_time):
+        """Convert a military time (e.g. 2230) to minutes after midnight
+
+        :return: the minute of the day
+        :rtype: int
+        """
+        military_time = int(military_time)
+        return min(MINUTES_PER_DAY, (military_time // 100) * 60 + military_time % 100)
+
+
+    def _slot_keys(self, availability):
+        """Key the available times of an availability response by start minute and resource
+
+        The start is parsed, so the non zero-padded times of the API (e.g. 2026-10-01T8:00:00-5:00) match
+        the times computed locally.
+
+        :return: the (startDateTime, resourceId) keys, the start as an ISO string to the minute
+        :rtype: set
+        """
+        return { (parse_date_time(time_slot['startDateTime']).replace(second=0, microsecond=0).isoformat(timespec='minutes'),
+                  str(time_slot.get('resourceId', '')))
+                 for time_slot in availability.get('availableTimes') or [] }
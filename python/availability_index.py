@@ -0,0 +1,278 @@
+from datetime import *
+from array import array
+import bisect
+
+try:
+    from .onsched_service import parse_date_time
+except ImportError:
+    from onsched_service import parse_date_time
+
+
+MINUTES_PER_DAY = 24 * 60
+EPOCH = datetime(1970, 1, 1)
+
+
+class SlotBitmapIndex:
+    def __init__(self, granularity=15):
+        """Creates a SlotBitmapIndex instance.
+
+        The index holds the free time of each resource as one bitset per day, one bit per slot of
+        granularity minutes (bit 0 is the slot starting at midnight).  Common free time of many resources
+        is then an AND of their bitsets, and any free time an OR, instead of loops over availability responses.
+
+        :param granularity: minutes per slot, a divisor of a day
+        :type granularity: int
+
+        :exception ValueError: raised if granularity does not divide a day
+        """
+        if granularity <= 0 or MINUTES_PER_DAY % granularity:
+            raise ValueError('granularity must divide a day')
+
+        self.granularity = granularity
+        self.slots_per_day = MINUTES_PER_DAY // granularity
+        self.bitsets = {}
+
+
+    def add_availability(self, availability):
+        """Mark the available times of an availability response as free
+
+        Times are indexed in the local time of the response.  A time slot marks the slots of the
+        index it fully covers.
+
+        :param availability: the response of OnSchedService.availability (or a merged response)
+        :type availability: dict
+        """
+        for time_slot in availability.get('availableTimes') or []:
+            self.add_time(time_slot.get('resourceId', ''),
+                          parse_date_time(time_slot['startDateTime']),
+                          parse_date_time(time_slot['endDateTime']))
+
+
+    def add_time(self, resource_id, start_date_time, end_date_time):
+        """Mark the time between start_date_time and end_date_time as free for a resource
+
+        Only the slots fully covered by the time are marked.
+
+        :param resource_id: the resource id
+        :type resource_id: str
+        :param start_date_time: the start of the free time
+        :type start_date_time: datetime
+        :param end_date_time: the end of the free time
+        :type end_date_time: datetime
+        """
+        resource_id = str(resource_id)
+        day = start_date_time.date()
+        while datetime.combine(day, time()) < end_date_time:
+            midnight = datetime.combine(day, time())
+            slot_seconds = self.granularity * 60
+            first_slot = max(0, int(-(-(start_date_time - midnight).total_seconds() // slot_seconds)))
+            end_slot = min(self.slots_per_day, int((end_date_time - midnight).total_seconds() // slot_seconds))
+
+            if end_slot > first_slot:
+                key = (resource_id, day)
+                self.bitsets[key] = self.bitsets.get(key, 0) | (((1 << (end_slot - first_slot)) - 1) << first_slot)
+            day += timedelta(days=1)
+
+
+    def free(self, resource_id, day):
+        """Get the bitset of the free slots of a resource on a day
+
+        :return: the bitset, 0 when nothing is free
+        :rtype: int
+        """
+        return self.bitsets.get((str(resource_id), day), 0)
+
+
+    def common(self, resource_ids, day):
+        """Get the bitset of the slots during which all the resources are free on a day
+
+        :return: the AND of the bitsets of the resources
+        :rtype: int
+        """
+        bitset = (1 << self.slots_per_day) - 1
+        for resource_id in resource_ids:
+            bitset &= self.free(resource_id, day)
+            if not bitset:
+                break
+
+        return bitset
+
+
+    def any_free(self, resource_ids, day):
+        """Get the bitset of the slots during which at least one of the resources is free on a day
+
+        :return: the OR of the bitsets of the resources
+        :rtype: int
+        """
+        bitset = 0
+        for resource_id in resource_ids:
+            bitset |= self.free(resource_id, day)
+
+        return bitset
+
+
+    def count_free(self, resource_ids, day):
+        """Count the slots during which all the resources are free on a day
+
+        :param resource_ids: a resource id, or a list of resource ids which must all be free
+        :type resource_ids: str or list
+
+        :return: the number of free slots
+        :rtype: int
+        """
+        if isinstance(resource_ids, (str, int)):
+            resource_ids = [resource_ids]
+
+        return bin(self.common(resource_ids, day)).count('1')
+
+
+    def first_common_slot(self, resource_ids, after, slots=1):
+        """Find the first time at or after a time at which all the resources are free together
+
+        :param resource_ids: List of resource ids which must all be free
+        :type resource_ids: list
+        :param after: the earliest time accepted
+        :type after: datetime
+        :param slots: the number of consecutive slots which must be free
+        :type slots: int
+
+        :return: the start of the first common free time, None when none is indexed
+        :rtype: datetime
+        """
+        days = sorted({day for resource_id, day in self.bitsets if day >= after.date()})
+
+        for day in days:
+            bitset = self.common(resource_ids, day)
+
+            # keep the bits starting a run of consecutive free slots
+            free = bitset
+            for shift in range(1, slots):
+                bitset &= free >> shift
+
+            if day == after.date():
+                slot_seconds = self.granularity * 60
+                first_slot = int(-(-(after - datetime.combine(day, time())).total_seconds() // slot_seconds))
+                bitset &= ~((1 << first_slot) - 1)
+
+            if bitset:
+                slot = (bitset & -bitset).bit_length() - 1
+                return datetime.combine(day, time()) + timedelta(minutes=slot * self.granularity)
+
+        return None
+
+
+class SlotTimeline:
+    def __init__(self, availability=None):
+        """Creates a SlotTimeline instance.
+
+        The timeline holds the available times of each resource sorted by start, as arrays of minutes, so
+        the booking path can look slots up by binary search instead of scanning the availability response.
+        Times are indexed in the local time of the response.
+
+        :param availability: an availability response to add to the timeline
+        :type availability: dict
+        """
+        self.starts = {}
+        self.ends = {}
+        self.latest_ends = {}
+        self.time_slots = {}
+
+        if availability:
+            self.add_availability(availability)
+
+
+    def add_availability(self, availability):
+        """Add the available times of an availability response to the timeline
+
+        :param availability: the response of OnSchedService.availability (or a merged response)
+        :type availability: dict
+        """
+        time_slots = {resource_id: list(resource_slots) for resource_id, resource_slots in self.time_slots.items()}
+        for time_slot in availability.get('availableTimes') or []:
+            time_slots.setdefault(str(time_slot.get('resourceId', '')), []).append(time_slot)
+
+        for resource_id, resource_slots in time_slots.items():
+            resource_slots.sort(key=lambda time_slot: _minute(time_slot['startDateTime']))
+
+            starts = array('i', (_minute(time_slot['startDateTime']) for time_slot in resource_slots))
+            ends = array('i', (_minute(time_slot['endDateTime']) for time_slot in resource_slots))
+
+            # latest_ends[i] is the latest end of the slots starting at or before slot i
+            latest_ends = array('i', ends)
+            for position in range(1, len(latest_ends)):
+                latest_ends[position] = max(latest_ends[position], latest_ends[position - 1])
+
+            self.starts[resource_id] = starts
+            self.ends[resource_id] = ends
+            self.latest_ends[resource_id] = latest_ends
+            self.time_slots[resource_id] = resource_slots
+
+
+    def next_available(self, resource_id, at):
+        """Find the first available time of a resource starting at or after a time
+
+        :param resource_id: the resource id
+        :type resource_id: str
+        :param at: the earliest start accepted
+        :type at: datetime
+
+        :return: the time slot, as found in the availability response, None when there is none
+        :rtype: dict
+        """
+        resource_id = str(resource_id)
+        starts = self.starts.get(resource_id, ())
+        position = bisect.bisect_left(starts, _minute(at))
+
+        return self.time_slots[resource_id][position] if position < len(starts) else None
+
+
+    def slots_between(self, resource_id, start_date_time, end_date_time):
+        """Get the available times of a resource starting between start_date_time and end_date_time
+
+        :param resource_id: the resource id
+        :type resource_id: str
+        :param start_date_time: the earliest start accepted
+        :type start_date_time: datetime
+        :param end_date_time: the end (excluded) of the starts accepted
+        :type end_date_time: datetime
+
+        :return: the time slots, as found in the availability response, sorted by start
+        :rtype: list
+        """
+        resource_id = str(resource_id)
+        starts = self.starts.get(resource_id, ())
+        first = bisect.bisect_left(starts, _minute(start_date_time))
+        last = bisect.bisect_left(starts, _minute(end_date_time), first)
+
+        return self.time_slots[resource_id][first:last] if last > first else []
+
+
+    def is_free(self, resource_id, start_date_time, end_date_time=None):
+        """Tell whether an available time of a resource covers the time between start_date_time and end_date_time
+
+        :param resource_id: the resource id
+        :type resource_id: str
+        :param start_date_time: the start of the time
+        :type start_date_time: datetime
+        :param end_date_time: the end of the time.  Defaults to the minute after start_date_time.
+        :type end_date_time: datetime
+
+        :return: True when a single available time covers the whole time
+        :rtype: bool
+        """
+        resource_id = str(resource_id)
+        start = _minute(start_date_time)
+        end = _minute(end_date_time) if end_date_time else start + 1
+
+        position = bisect.bisect_right(self.starts.get(resource_id, ()), start) - 1
+
+        return position >= 0 and self.latest_ends[resource_id][position] >= end
+
+
+def _minute(value):
+    """Get the number of minutes between the epoch and the local time of an OnSched date time
+
+    :return: the minutes since 1970-01-01T00:00 local time
+    :rtype: int
+    """
+    return int((parse_date_time(value) - EPOCH).total_seconds() // 60)
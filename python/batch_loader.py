@@ -0,0 +1,247 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import copy
+
+
+class BatchLoader:
+    def __init__(self, onsched, window=0.005, max_batch=100):
+        """Creates a BatchLoader instance.
+
+        The loader collects the ids asked for by load() within a short window, from any number of threads,
+        and fetches them together with fetch().  Each caller gets the result for its own id.
+
+        :param onsched: the client used to fetch the entities
+        :type onsched: OnSchedService
+        :param window: number of seconds the first id of a batch waits for other ids
+        :type window: float
+        :param max_batch: number of ids fetching a batch at once, without waiting for the window to end
+        :type max_batch: int
+        """
+        self.onsched = onsched
+        self.window = window
+        self.max_batch = max(1, max_batch)
+
+        self._batch = None
+        self._lock = threading.Lock()
+
+
+    def load(self, entity_id):
+        """Get the entity of an id, fetched with the other ids asked for within the window
+
+        :param entity_id: the id of the entity
+        :type entity_id: str
+
+        :return: the entity
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        return self.load_async(entity_id).result()
+
+
+    def load_many(self, entity_ids):
+        """Get the entities of many ids, fetched in as few batches as possible
+
+        :param entity_ids: the ids of the entities
+        :type entity_ids: list
+
+        :return: the entities, in the order of the ids
+        :rtype: list
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        futures = [self.load_async(entity_id) for entity_id in entity_ids]
+
+        return [future.result() for future in futures]
+
+
+    def load_async(self, entity_id):
+        """Ask for the entity of an id without waiting for it
+
+        :param entity_id: the id of the entity
+        :type entity_id: str
+
+        :return: a future of the entity, which can be cancelled until its batch is fetched
+        :rtype: Future
+        """
+        future = Future()
+
+        with self._lock:
+            if self._batch is None:
+                self._batch = []
+                timer = threading.Timer(self.window, self._dispatch, args=(self._batch,))
+                timer.daemon = True
+                timer.start()
+
+            batch = self._batch
+            batch.append((str(entity_id), future))
+            if len(batch) >= self.max_batch:
+                self._batch = None
+            else:
+                batch = None
+
+        if batch:
+            self._run(batch)
+
+        return future
+
+
+    def fetch(self, entity_ids):
+        """Fetch the entities of a batch of ids
+
+        Subclasses fetch the ids with a list call where they can.  An id missing from the result, or
+        mapped to an exception, fails the callers asking for it.
+
+        :param entity_ids: the distinct ids of the batch
+        :type entity_ids: list
+
+        :return: the entities (or the exceptions raised fetching them), by id
+        :rtype: dict
+        """
+        raise NotImplementedError
+
+
+    #####################
+    # Private methods
+    #####################
+    def _dispatch(self, batch):
+        """Fetch a batch when its window ends, unless it was fetched once full
+
+        :return: None
+        """
+        with self._lock:
+            if self._batch is not batch:
+                return
+            self._batch = None
+
+        self._run(batch)
+
+
+    def _run(self, batch):
+        """Fetch the ids of a batch and resolve the futures of its callers
+
+        The futures cancelled by their callers are dropped, the others can't be cancelled anymore.
+
+        :return: None
+        """
+        batch = [(entity_id, future) for entity_id, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        entity_ids = list(dict.fromkeys(entity_id for entity_id, future in batch))
+
+        try:
+            results = self.fetch(entity_ids)
+        except Exception as error:
+            for entity_id, future in batch:
+                future.set_exception(error)
+            return
+
+        served = set()
+        for entity_id, future in batch:
+            result = results.get(entity_id, KeyError(entity_id))
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                # callers asking for the same id each get their own copy
+                future.set_result(copy.deepcopy(result) if entity_id in served else result)
+                served.add(entity_id)
+
+
+    def _fetch_each(self, entity_ids, fetch_one):
+        """Fetch ids with concurrent individual calls, at most max_workers at a time
+
+        :param entity_ids: the ids
+        :type entity_ids: list
+        :param fetch_one: function fetching the entity of an id
+        :type fetch_one: function
+
+        :return: the entities (or the exceptions raised fetching them), by id
+        :rtype: dict
+        """
+        def fetch(entity_id):
+            try:
+                return fetch_one(entity_id)
+            except Exception as error:
+                return error
+
+        if not entity_ids:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(self.onsched.max_workers, len(entity_ids))) as executor:
+            return dict(zip(entity_ids, executor.map(fetch, entity_ids)))
+
+
+class LocationLoader(BatchLoader):
+    """Batch loader of locations
+
+    A batch of one id is fetched with location().  Larger batches are fetched with one locations() call,
+    and the ids it does not return with concurrent location() calls.
+    """
+    def fetch(self, entity_ids):
+        """Fetch the locations of a batch of ids
+
+        :param entity_ids: the distinct location ids of the batch
+        :type entity_ids: list
+
+        :return: the locations (or the exceptions raised fetching them), by id
+        :rtype: dict
+        """
+        results = {}
+        if len(entity_ids) > 1:
+            wanted = set(entity_ids)
+            results = { str(location['id']): location for location in self.onsched.locations().get('data') or []
+                        if str(location['id']) in wanted }
+
+        missing = [entity_id for entity_id in entity_ids if entity_id not in results]
+        results.update(self._fetch_each(missing, self.onsched.location))
+
+        return results
+
+
+class ServiceAllocationLoader(BatchLoader):
+    def __init__(self, onsched, service_id=None, window=0.005, max_batch=100):
+        """Creates a ServiceAllocationLoader instance.
+
+        A batch of one id is fetched with service_allocation().  When the allocations belong to a known
+        service, larger batches are fetched with one service_allocations(service_id) call, and the ids it
+        does not return with concurrent service_allocation() calls.  Otherwise, the ids are fetched with
+        concurrent service_allocation() calls.
+
+        :param onsched: the client used to fetch the allocations
+        :type onsched: OnSchedService
+        :param service_id: the service of the allocations, if known
+        :type service_id: str
+        :param window: number of seconds the first id of a batch waits for other ids
+        :type window: float
+        :param max_batch: number of ids fetching a batch at once, without waiting for the window to end
+        :type max_batch: int
+        """
+        super().__init__(onsched, window=window, max_batch=max_batch)
+        self.service_id = service_id
+
+
+    def fetch(self, entity_ids):
+        """Fetch the service allocations of a batch of ids
+
+        :param entity_ids: the distinct service allocation ids of the batch
+        :type entity_ids: list
+
+        :return: the service allocations (or the exceptions raised fetching them), by id
+        :rtype: dict
+        """
+        results = {}
+        if len(entity_ids) > 1 and self.service_id is not None:
+            wanted = set(entity_ids)
+            allocations = self.onsched.service_allocations(self.service_id).get('data') or []
+            results = { str(allocation['id']): allocation for allocation in allocations
+                        if str(allocation['id']) in wanted }
+
+        missing = [entity_id for entity_id in entity_ids if entity_id not in results]
+        results.update(self._fetch_each(missing, self.onsched.service_allocation))
+
+        return results
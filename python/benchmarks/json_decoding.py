@@ -0,0 +1,88 @@
+"""Measure the CPU time spent decoding an appointments page, before and after decoding from bytes
+
+Run from the python directory:
+
+    $ python benchmarks/json_decoding.py [pages]
+"""
+import sys
+import os
+import json
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from requests.models import Response
+from requests.utils import get_encoding_from_headers
+import onsched_service
+
+
+def appointments_page(limit=100):
+    """Build the raw body of a page of appointments, as returned by GET /consumer/v1/appointments"""
+    appointments = []
+    for index in range(limit):
+        appointments.append({
+            'id': str(1000000 + index),
+            'object': 'appointment',
+            'locationId': 'e4d61bd8-cdf3-4fc9-887e-2320dce062e0',
+            'businessId': 'c3e2b1a4-9f1e-4f55-9d3e-6f0d2b7a8c11',
+            'serviceId': '5',
+            'serviceName': 'Initial Consultation',
+            'resourceId': str(100 + index % 12),
+            'resourceName': f'Resource {index % 12}',
+            'customerId': f'cus-{index:06d}',
+            'startDateTime': '2026-10-21T10:00:00-04:00',
+            'endDateTime': '2026-10-21T10:30:00-04:00',
+            'duration': 30,
+            'status': 'BK',
+            'email': f'customer{index}@example.com',
+            'name': f'Customer {index} Ünïcödé',
+            'phone': '7195555555',
+            'notes': 'Returning customer, prefers the morning. ' * 3,
+            'appointmentBookingFields': [{ 'name': 'reason', 'value': 'follow up' }],
+            'customerBookingFields': [{ 'name': 'insurance', 'value': 'none' }],
+        })
+
+    page = { 'object': 'list', 'url': '/consumer/v1/appointments', 'hasMore': True,
+             'count': limit, 'total': 25000, 'data': appointments }
+
+    return json.dumps(page).encode('utf-8')
+
+
+def response(content, content_type):
+    """Build a response holding content, with the encoding requests derives from the Content-Type"""
+    page_response = Response()
+    page_response.status_code = 200
+    if content_type:
+        page_response.headers['Content-Type'] = content_type
+    page_response.encoding = get_encoding_from_headers(page_response.headers)
+    page_response._content = content
+
+    return page_response
+
+
+def cpu_per_page(decode, content, content_type, pages):
+    """Measure the CPU milliseconds per page of decode, a fresh response being decoded each time"""
+    responses = [response(content, content_type) for page in range(pages)]
+
+    started_at = time.process_time()
+    for page_response in responses:
+        decode(page_response)
+
+    return (time.process_time() - started_at) * 1000 / pages
+
+
+if __name__ == '__main__':
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    content = appointments_page()
+
+    decoders = [('json.loads(response.text)', lambda page_response: json.loads(page_response.text)),
+                ('json.loads(response.content)', lambda page_response: json.loads(page_response.content))]
+    if onsched_service.orjson is not None:
+        decoders.append(('decode_json (orjson)', lambda page_response: onsched_service.decode_json(page_response.content)))
+
+    print(f'{len(content)} bytes per page, {pages} pages')
+    # without a Content-Type, response.text detects the charset of the body
+    for content_type in ('application/json; charset=utf-8', None):
+        print(f'\nContent-Type: {content_type or "none"}')
+        for name, decode in decoders:
+            print(f'  {name:32} {cpu_per_page(decode, content, content_type, pages):8.3f} ms CPU per page')
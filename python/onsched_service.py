@@ -1,18 +1,116 @@
 from oauthlib.oauth2 import BackendApplicationClient
 from requests_oauthlib import OAuth2Session
+from requests.adapters import HTTPAdapter
+import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from datetime import *
+from email.utils import parsedate_to_datetime
 import urllib.parse
+import inspect
+import threading
+import tempfile
+import hashlib
+import random
+import uuid
+import re
+import struct
+import stat
+import copy
 import json
+import time
+import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def decode_json(content):
+    """Decode a JSON response body from its raw bytes
+
+    Parsing the bytes skips the decoding of the body into a str, and the charset detection it may
+    need.  orjson is used when installed, the json module otherwise.
+
+    :param content: the raw response body
+    :type content: bytes
+
+    :return: the decoded data
+
+    :exception ValueError: raised if content is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+
+    return json.loads(content)
+
+
+DATE_TIME_PATTERN = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})'
+                               r'(?:[T ](\d{1,2}):(\d{1,2})(?::(\d{1,2})(?:\.(\d{1,6})\d*)?)?)?'
+                               r'\s*(?:(Z)|([+-])(\d{1,2})(?::?(\d{2}))?)?')
+
+
+def parse_date_time(value, utc=False):
+    """Parse an OnSched date time, e.g. 2016-10-30T9:00:00-5:00
+
+    Single digit fields and timezone offsets (as sent by the API) are accepted.  The date time is
+    returned without timezone: its local time by default, its UTC time when utc is True.  A date time
+    without timezone is returned as is.
+
+    :param value: the date time
+    :type value: str or datetime
+    :param utc: convert date times with a timezone to UTC instead of keeping their local time
+    :type utc: bool
+
+    :return: the date time, without timezone
+    :rtype: datetime
+
+    :exception ValueError: raised if value is not a date time
+    """
+    if isinstance(value, datetime):
+        date_time = value
+    else:
+        match = DATE_TIME_PATTERN.fullmatch(str(value).strip())
+        if match is None:
+            raise ValueError(f'invalid date time: {value!r}')
+
+        year, month, day, hour, minute, second, fraction, zulu, sign, offset_hours, offset_minutes = match.groups()
+        tzinfo = None
+        if zulu:
+            tzinfo = timezone.utc
+        elif sign:
+            offset = timedelta(hours=int(offset_hours), minutes=int(offset_minutes or 0))
+            tzinfo = timezone(-offset if sign == '-' else offset)
+
+        date_time = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                             int((fraction or '0').ljust(6, '0')), tzinfo=tzinfo)
+
+    if utc and date_time.tzinfo is not None:
+        date_time = date_time.astimezone(timezone.utc)
+
+    return date_time.replace(tzinfo=None)
+
+
+class OnSchedBase:
+    """Configuration, URL and payload builders shared by the OnSched clients"""
 
-class OnSchedService:
     SANDBOX_TOKEN_URL = 'https://sandbox-identity.onsched.com/connect/token'
     SANDBOX_API_URL_BASE = 'https://sandbox-api.onsched.com'
     PROD_TOKEN_URL = 'https://identity.onsched.com/connect/token'
     PROD_API_URL_BASE = 'https://api.onsched.com'
-
-    def __init__(self, client_id, client_secret, scope='OnSchedAPI', environment='sandbox'):
-        """Creates an OnSchedService instance.
+    PAGE_LIMIT = 100
+
+    def __init__(self,
+                 client_id,
+                 client_secret,
+                 scope='OnSchedAPI',
+                 environment='sandbox',
+                 max_workers=8,
+                 setup_scope=None,
+                 json_decoder=None):
+        """Sets up the client configuration for the chosen environment.
 
         :param client_id: client id provided by OnSched
         :type client_id: str
@@ -22,10 +120,17 @@ class OnSchedService:
         :type scope: str
         :param environment: app environment ('sandbox' for sandbox endpoints, 'live' for production endpoints)
         :type environment: str
+        :param max_workers: maximum number of pages fetched concurrently by the list endpoints (1 fetches serially)
+        :type max_workers: int
+        :param setup_scope: client scope used for the setup API. Defaults to scope
+        :type setup_scope: str
+        :param json_decoder: function decoding the raw bytes of the JSON responses. Defaults to decode_json
+        :type json_decoder: function
         """
         self.client_id = client_id
         self.client_secret = client_secret
         self.scope = scope
+        self.setup_scope = setup_scope or scope
         self.token_url = f'{self.SANDBOX_TOKEN_URL}'
         self.consumer_api = f'{self.SANDBOX_API_URL_BASE}/consumer/v1'
         self.setup_api = f'{self.SANDBOX_API_URL_BASE}/setup/v1'
@@ -35,60 +140,291 @@ class OnSchedService:
             self.consumer_api = f'{self.PROD_API_URL_BASE}/consumer/v1'
             self.setup_api = f'{self.PROD_API_URL_BASE}/setup/v1'
 
-        self.session = None
-        self.admin_session = None
-        self._set_session()
-        self._set_setup_session()
+        self.max_workers = max(1, max_workers)
+        self.json_decoder = json_decoder or decode_json
 
 
-    def locations(self):
-        """Get a complete list of locations
+    #####################
+    # Private methods
+    #####################
+    def _get_resources_data(self,
+                            email='',
+                            description='',
+                            location_id='',
+                            group_id='',
+                            timezone_id='',
+                            addressline1='',
+                            addressline2='',
+                            city='',
+                            state='',
+                            country='',
+                            postal_code='',
+                            contact_preferred_phone_type='',
+                            contact_home_phone='',
+                            contact_mobile_phone='',
+                            contact_business_phone='',
+                            contact_business_phone_ext='',
+                            contact_skype_username='',
+                            effective_date=None,
+                            notification_type=0,
+                            display_color='',
+                            google_calendar_id='',
+                            outlook_calendar_id='',
+                            ignore_business_hours=False,
+                            gender='',
+                            hourly=0,
+                            calendar_availability=0,
+                            sort_key=0,
+                            bio_link=''):
+        """Gather resource data into a dictionary
 
-        :return: location data dictionary
+        :param name: the resource name
+        :type name: str
+        :param location_id: the location id for the resource
+        :type location_id: str
+        :param email: an email address for the resource
+        :type email: str
+        :param description: a description of the resource
+        :type description: str
+        :param group_id: the resource group id
+        :type group_id: str
+        :param timezone_id: the timezone id for the resource. defaults to the business timezone if empty
+        :type timezone_id: str
+        :param addressline1: the address of the resource
+        :type addressline1: str
+        :param addressline2: the address of the resource
+        :type addressline2: str
+        :param city: the city of the resource
+        :type city: str
+        :param state: the state/province of the resource
+        :type state: str
+        :param country: the country of the resource
+        :type country: str
+        :param postal_code: the postal code for the resource
+        :type postal_code: str
+        :param contact_preferred_phone_type: type of contact preferred (mobile|business|home|skype)
+        :type contact_preferred_phone_type: str
+        :param contact_home_phone: the resource's home phone number
+        :type contact_home_phone: str
+        :param contact_mobile_phone: the resource's mobile phone number
+        :type contact_mobile_phone: str
+        :param contact_business_phone: the resource's business phone number
+        :type contact_business_phone: str
+        :param contact_business_phone_ext: the resource's business phone extension
+        :type contact_business_phone_ext: str
+        :param contact_skype_username: the resource's skype username
+        :type contact_skype_username: str
+        :param effective_date: the datetime that this resource will become available in the system
+        :type effective_date: datetime
+        :param notification_type: the notification type (0: default, 1: email, 2: SMS, 3: email + SMS)
+        :type notification_type: int
+        :param display_color: the color for the resource, which will control the calendar color in the portal
+        :type display_color: str
+        :param google_calendar_id: the resource's google calendar
+        :type google_calendar_id: str
+        :param outlook_calendar_id: the resource's outlook calendar
+        :type outlook_calendar_id: str
+        :param ignore_business_hours: is the resource available outside normal business hours?
+        :type ignore_business_hours: bool
+        :param gender: the resource gender (for people)
+        :type gender: str
+        :param hourly: hourly pay rate for the resource
+        :type hourly: int
+        :param calendar_availability: which calendar system the resources uses
+                                      (0: OnSched Cal, 1: Google Cal, 2: Outlook Cal)
+        :type calendar_availability: int
+        :param sort_key: a numeric value that can be used for sorting the resources list
+        :type sort_key: int
+        :param bio_link: a URL for additional resource information
+        :type bio_link: str
+
+        :return: A resource object dictionary
+        :rtype: dict
 
         :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
         :exception Timeout: raised if the request times out
         :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if datetime inputs are in incorrect format
         """
-        locations_url = f'{self.consumer_api}/locations?'
+        payload = {}
 
-        return self._fetch_data(url=locations_url)
+        if email:
+            payload['email'] = email
+        if description:
+            payload['description'] = description
+        if location_id:
+            payload['locationId'] = location_id
+        if group_id:
+            payload['groupId'] = group_id
+        if timezone_id:
+            payload['timezoneId'] = timezone_id
+        # set the address if submitted
+        address = {}
+        if addressline1 or addressline2 or city or state or postal_code or country:
+            address['addressline1'] = addressline1
+            address['addressline2'] = addressline2
+            address['city'] = city
+            address['state'] = state
+            address['postalCode'] = postal_code
+            address['country'] = country
 
+        # set the contact information if present
+        contact = {}
+        if contact_preferred_phone_type or contact_home_phone \
+                or contact_mobile_phone or contact_business_phone \
+                or contact_business_phone_ext or contact_skype_username:
 
-    def location(self, location_id):
-        """Get a single location
+            contact['PreferredPhoneType'] = contact_preferred_phone_type
 
-        :param location_id: the specific location id to be searched
-        :type location_id: str
+            if contact_home_phone:
+                contact['homePhone'] = contact_home_phone
+            if contact_mobile_phone:
+                contact['mobilePhone'] = contact_mobile_phone
+            if contact_business_phone:
+                contact['businessPhone'] = contact_business_phone
+            if contact_business_phone_ext:
+                contact['businessPhoneExt'] = contact_business_phone_ext
+            if contact_skype_username:
+                contact['skypeUsername'] = contact_skype_username
 
-        :return: a single location data
-        :rtype: dict
+        # set the options that are present
+        options = {}
+        if effective_date or notification_type or display_color \
+                or google_calendar_id or outlook_calendar_id \
+                or ignore_business_hours or gender or hourly \
+                or calendar_availability or sort_key or bio_link:
+            if effective_date:
+                if type(effective_date) is datetime:
+                    options['effectiveDate'] = effective_date.isoformat()
+                elif type(effective_date) is str:
+                    options['effectiveDate'] = effective_date
+                else:
+                    raise TypeError
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+            if notification_type:
+                options['notificationType'] = notification_type
+            if display_color:
+                options['displayColor'] = display_color
+            if google_calendar_id:
+                options['googleCalendarId'] = google_calendar_id
+            if outlook_calendar_id:
+                options['outlookCalendarId'] = outlook_calendar_id
+            if ignore_business_hours:
+                options['ignoreBusinessHours'] = 'true'
+            if gender:
+                options['gender'] = gender
+            if hourly:
+                options['hourly'] = hourly
+            if calendar_availability:
+                options['calendarAvailability'] = calendar_availability
+            if sort_key:
+                options['sortKey'] = sort_key
+            if bio_link:
+                options['bioLink'] = bio_link
+
+        if address:
+            payload['address'] = address
+        if contact:
+            payload['contact'] = contact
+        if options:
+            payload['options'] = options
+
+        return payload
+
+
+    def _as_date(self, value):
+        """Get the date of a date, datetime or ISO 8601 string
+
+        :param value: the date, datetime or ISO 8601 date/datetime string
+        :type value: date
+
+        :return: the date
+        :rtype: date
+
+        :exception TypeError: raised if value is in an incorrect format
+        :exception ValueError: raised if value is a string which is not ISO 8601 formatted
         """
+        if type(value) is datetime:
+            return value.date()
+        elif type(value) is date:
+            return value
+        elif type(value) is str:
+            return date.fromisoformat(value[:10])
+        else:
+            raise TypeError
 
-        location_url = f'{self.consumer_api}/locations/{location_id}?'
 
-        return self._fetch_data(url=location_url)
+    def _spec_key(self, spec):
+        """Build a hashable key identifying an availability spec
 
+        Dates are keyed by their ISO format, so a date and its ISO string are the same spec, and lists
+        of resource ids are keyed as tuples.
 
-    def services(self, location_id='', service_group='', default_service=False):
-        """Get a complete list of services based on location_id
+        :param spec: keyword arguments of availability
+        :type spec: dict
 
-        :param location_id: the location id for which the services will be returned
-        :type location_id: str
-        :param service_group: filter the search by service group id
-        :type service_group: str
-        :param default_service: filter the search by service group id
-        :type default_service: bool
+        :return: the key of the spec
+        :rtype: tuple
+        """
+        key = []
+        for name, value in sorted(spec.items()):
+            if name in ('start_date', 'end_date'):
+                value = self._as_date(value).isoformat()
+            elif isinstance(value, (list, tuple, set)):
+                value = tuple(str(item) for item in value)
+            elif name != 'first_day_available':
+                value = str(value)
+            key.append((name, value))
 
-        :return: services data dictionary
+        return tuple(key)
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+
+    def _merge_availability(self, responses, start_date, end_date):
+        """Merge the responses of availability queries covering parts of a span into one response
+
+        The first response provides the service and location information.  The available times are
+        merged in chronological order, and the available days are merged by date, a day being available
+        when it is available in any response.
+
+        :param responses: the availability responses
+        :type responses: list
+        :param start_date: the first date of the span
+        :type start_date: date
+        :param end_date: the last date of the span
+        :type end_date: date
+
+        :return: the merged availability response
+        :rtype: dict
+        """
+        if not responses:
+            return {}
+
+        result = dict(responses[0])
+        result['startDate'] = start_date.isoformat()
+        result['endDate'] = end_date.isoformat()
+
+        if any('availableTimes' in response for response in responses):
+            available_times = [time_slot for response in responses for time_slot in response.get('availableTimes') or []]
+            available_times.sort(key=lambda time_slot: (time_slot.get('startDateTime', ''), str(time_slot.get('resourceId', ''))))
+            result['availableTimes'] = available_times
+
+        if any('availableDays' in response for response in responses):
+            available_days = {}
+            for response in responses:
+                for day in response.get('availableDays') or []:
+                    day_key = day.get('date')
+                    if day_key not in available_days or (day.get('available') and not available_days[day_key].get('available')):
+                        available_days[day_key] = day
+            result['availableDays'] = sorted(available_days.values(), key=lambda day: str(day.get('date', '')))
+
+        return result
+
+
+    def _services_url(self, location_id='', service_group='', default_service=False):
+        """Build the URL for the services list endpoint
+
+        :return: complete API URL without the paging parameters
+        :rtype: str
         """
         services_url = f'{self.consumer_api}/services?'
 
@@ -104,29 +440,14 @@ class OnSchedService:
 
         services_url += params
 
-        return self._fetch_data(url=services_url)
+        return services_url
 
 
-    def customers(self, location_id='', group_id='', email='', lastname='', deleted=False):
-        """Return a list of customers based on a location
+    def _customers_url(self, location_id='', group_id='', email='', lastname='', deleted=False):
+        """Build the URL for the customers list endpoint
 
-        :param location_id: the location id for the search
-        :type location_id: str
-        :param group_id: the group id for the search
-        :type group_id: str
-        :param email: the email of the customer to search
-        :type email: str
-        :param lastname: the lastname of the customer
-        :type lastname: str
-        :param deleted: search for deleted customers
-        :type deleted: bool
-
-        :return: a list of customers matching the criteria
-        :rtype: dict
-
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :return: complete API URL without the paging parameters
+        :rtype: str
         """
         customers_url = f'{self.consumer_api}/customers?'
 
@@ -146,79 +467,125 @@ class OnSchedService:
 
         customers_url += params
 
-        return self._fetch_data(url=customers_url)
+        return customers_url
 
 
-    def availability(self,
-                     service_id,
-                     start_date,
-                     end_date,
-                     start_time=0,
-                     end_time=0,
-                     location_id='',
-                     resource_id='',
-                     resource_group_id='',
-                     resource_ids=None,
-                     duration=0,
-                     tz_offset=0,
-                     day_availability=0,
-                     first_day_available=False):
-        """Get Availability information for a given service between start_date and end_date
+    def _appointments_url(self,
+                          location_id='',
+                          email='',
+                          lastname='',
+                          service_id='',
+                          service_allocation_id='',
+                          resource_id='',
+                          customer_id='',
+                          start_date=None,
+                          end_date=None,
+                          status='',
+                          booked_by=''):
+        """Build the URL for the appointments list endpoint
 
-        Choose your search criteria carefully. Availability is an expensive call.
-        If you search availability for all resources then you should only do so for a single date.
-        If you decide to search availability for multiple dates you should only do so for a specific
-        resource by specifying the optional resourceId parameter.
+        :return: complete API URL without the paging parameters
+        :rtype: str
 
-        firstDayAvailable only works with day availability. If set to true it will look for the first day
-        available within the range specified by the dayAvailability parameter. The two parameters together can
-        be a clever way to display availability for a week or month. Tip - pass in the beginning of the week or month,
-        and available times are displayed for the first available date if exists.
+        :exception TypeError: raised if date_time inputs are in incorrect format
+        """
+        appointments_url = f'{self.consumer_api}/appointments?'
 
-        You should only specify the duration parameter if you let your customers choose the duration of the
-        appointment. e.g. from a list.
+        params_map = {}
+        if location_id:
+            params_map['locationId'] = location_id
+        if email:
+            params_map['email'] = email
+        if lastname:
+            params_map['lastname'] = lastname
+        if service_id:
+            params_map['serviceId'] = service_id
+        if service_allocation_id:
+            params_map['serviceAllocationId'] = service_allocation_id
+        if resource_id:
+            params_map['resourceId'] = resource_id
+        if customer_id:
+            params_map['customerId'] = customer_id
+        if status:
+            params_map['status'] = status
+        if booked_by:
+            params_map['bookedBy'] = booked_by
+        if start_date:
+            if type(start_date) is datetime or type(start_date) is date:
+                params_map['startDate'] = start_date.isoformat()
+            elif type(start_date) is str:
+                params_map['startDate'] = start_date
+            else:
+                raise TypeError
+        if end_date:
+            if type(end_date) is datetime or type(end_date) is date:
+                params_map['endDate'] = end_date.isoformat()
+            elif type(end_date) is str:
+                params_map['endDate'] = end_date
+            else:
+                raise TypeError
 
-        The tz parameter allows you to select a suitable timezone for the customer to book in. Your app should be
-        timezone aware if you use this option. The requested timezone is specified as an offset(plus or minus)
-        from GMT time.
+        params = urllib.parse.urlencode(params_map)
 
-        :param service_id: service id for availability search
-        :type service_id: str
-        :param start_date: start date for availability search
-        :type start_date: date
-        :param end_date: end date for availability search
-        :type end_date: date
-        :param start_time: start time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm. You will
-                           only see availability within the boundary of your business start and end times.
-                           Defaults to Business Hours Start.
-        :type start_time: int
-        :param end_time: end time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm. You will
-                         only see availability within the boundary of your business start and end times.
-                         Defaults to Business Hours End.
-        :type end_time: int
-        :param location_id: the id of the business location. Defaults to first business location.
-        :type location_id: str
-        :param resource_id: resource id for availability search.
-        :type resource_id: str
-        :param resource_group_id: resource group id for availability search
-        :type resource_group_id: str
-        :param resource_ids: List of resource id strings for availability search
-        :type resource_ids: list
-        :param duration: duration of the service in minutes if different than the default
-        :type duration: int
-        :param tzOffset: request timezone offset to view availability
-        :type tz_offset: int
-        :param day_availability: Return day availability for number of days specified from start_date.
-        :type day_availability: int
-        :param first_day_available: Return available times for the first available day
-        :type first_day_available: bool
+        appointments_url += params
 
-        :return: Returns a list of times available as well as information about the resource and service
-        :rtype: dict
+        return appointments_url
+
+
+    def _service_allocations_url(self, service_id, start_date=None, end_date=None, location_id=''):
+        """Build the URL for the service allocations list endpoint
+
+        :return: complete API URL without the paging parameters
+        :rtype: str
+
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        service_allocations_url = f'{self.consumer_api}/services/{service_id}/allocations?'
+
+        params_map = {}
+        if location_id:
+            params_map['locationId'] = location_id
+        if start_date:
+            if type(start_date) is date or type(start_date) is datetime:
+                params_map['startDate']= start_date.isoformat()
+            elif type(start_date) is str:
+                params_map['startDate']= start_date
+            else:
+                raise TypeError
+        if end_date:
+            if type(end_date) is date or type(end_date) is datetime:
+                params_map['endDate']= end_date.isoformat()
+            elif type(end_date) is str:
+                params_map['endDate']= end_date
+            else:
+                raise TypeError
+
+        params = urllib.parse.urlencode(params_map)
+
+        service_allocations_url += params
+
+        return service_allocations_url
+
+
+    def _availability_url(self,
+                          service_id,
+                          start_date,
+                          end_date,
+                          start_time=0,
+                          end_time=0,
+                          location_id='',
+                          resource_id='',
+                          resource_group_id='',
+                          resource_ids=None,
+                          duration=0,
+                          tz_offset=0,
+                          day_availability=0,
+                          first_day_available=False):
+        """Build the URL for the availability endpoint
+
+        :return: complete API URL
+        :rtype: str
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
         :exception TypeError: raised if date inputs are in incorrect format
         """
         if type(start_date) is date:
@@ -248,7 +615,7 @@ class OnSchedService:
         if resource_group_id:
             params_map['resourceGroupId'] = resource_group_id
         if resource_ids:
-            params_map['resourceIds'] = resource_ids.join(',')
+            params_map['resourceIds'] = ','.join(resource_ids)
         if duration:
             params_map['duration'] = duration
         if tz_offset:
@@ -262,1263 +629,3798 @@ class OnSchedService:
 
         availability_url += params
 
-        return self._fetch_data(url=availability_url)
+        return availability_url
 
 
-    def appointments(self,
-                     location_id='',
-                     email='',
-                     lastname='',
-                     service_id='',
-                     service_allocation_id='',
-                     resource_id='',
-                     customer_id='',
-                     start_date=None,
-                     end_date=None,
-                     status='',
-                     booked_by=''):
-        """List all appointments
-
-        :param location_id: filter appointments by location
-        :type location_id: str
-        :param email: filter appointments by customer email
-        :type email: str
-        :param lastname: filter appointments by customer lastname
-        :type lastname: str
-        :param service_id: filter appointments by service_id
-        :type service_id: str
-        :param service_allocation_id: filter appointments by service_allocation_id
-        :type service_allocation_id: str
-        :param resource_id: filter appointments by resource_id
-        :type resource_id: str
-        :param customer_id: filter appointments by customer_id
-        :type customer_id: str
-        :param start_date: filter appointments by on/after start date
-        :type start_date: datetime
-        :param end_date: filter appointments by on/before end date
-        :type end_date: datetime
-        :param status: filter appointments by booking status. valid values are IN, BK, CN, RE, RS
-        :type status: str
-        :param booked_by: filter appointments by the user email that made the booking
-        :type booked_by: str
+    def _appointment_payload(self,
+                             service_id,
+                             start_date_time,
+                             end_date_time,
+                             resource_id,
+                             location_id='',
+                             customer_id='',
+                             service_allocation_id='',
+                             booked_by=''):
+        """Gather the data of a new appointment into a dictionary
 
-        :return: Returns a dictionary containing a list of appointments filtered
-                 by the parameters specified
+        :return: the appointment payload
         :rtype: dict
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
         :exception TypeError: raised if date_time inputs are in incorrect format
         """
-        appointments_url = f'{self.consumer_api}/appointments?'
+        payload = { 'serviceId': service_id }
+
+        if type(start_date_time) is datetime:
+            payload['startDateTime'] = start_date_time.isoformat()
+        elif type(start_date_time) is str:
+            payload['startDateTime'] = start_date_time
+        else:
+            raise TypeError
+
+        if type(end_date_time) is datetime:
+            payload['endDateTime'] = end_date_time.isoformat()
+        elif type(end_date_time) is str:
+            payload['endDateTime'] = end_date_time
+        else:
+            raise TypeError
 
-        params_map = {}
-        if location_id:
-            params_map['locationId'] = location_id
-        if email:
-            params_map['email'] = email
-        if lastname:
-            params_map['lastname'] = lastname
-        if service_id:
-            params_map['serviceId'] = service_id
-        if service_allocation_id:
-            params_map['serviceAllocationId'] = service_allocation_id
-        if resource_id:
-            params_map['resourceId'] = resource_id
         if customer_id:
-            params_map['customerId'] = customer_id
-        if status:
-            params_map['status'] = status
+            payload['customerId'] = customer_id
         if booked_by:
-            params_map['bookedBy'] = booked_by
-        if start_date:
-            if type(start_date) is datetime or type(start_date) is date:
-                params_map['startDate'] = start_date.isoformat()
-            elif type(start_date) is str:
-                params_map['startDate'] = start_date
-            else:
-                raise TypeError
-        if end_date:
-            if type(end_date) is datetime or type(end_date) is date:
-                params_map['endDate'] = end_date.isoformat()
-            elif type(end_date) is str:
-                params_map['endDate'] = end_date
-            else:
-                raise TypeError
-
-        params = urllib.parse.urlencode(params_map)
+            payload['bookedBy'] = booked_by
+        if resource_id:
+            payload['resourceId'] = resource_id
+        if location_id:
+            payload['locationId'] = location_id
+        if service_allocation_id:
+            payload['serviceAllocationId'] = service_allocation_id
 
-        appointments_url += params
+        return payload
 
-        return self._fetch_data(url=appointments_url)
 
+    def _booking_payload(self,
+                         email='',
+                         name='',
+                         phone='',
+                         phone_type='',
+                         phone_ext='',
+                         customer_message='',
+                         notes='',
+                         appointment_booking_fields=None,
+                         customer_booking_fields=None):
+        """Gather the booking details of an appointment into a dictionary
 
-    def create_appointment(self,
-                           service_id,
-                           start_date_time,
-                           end_date_time,
-                           resource_id,
-                           location_id='',
-                           customer_id='',
-                           service_allocation_id='',
-                           booked_by=''):
-        """Create a new appointment
+        :return: the booking payload
+        :rtype: dict
+        """
+        payload = {}
+        if email:
+            payload['email'] = email
+        if name:
+            payload['name'] = name
+        if phone:
+            payload['phone'] = phone
+        if phone_type:
+            payload['phoneType'] = phone_type
+        if phone_ext:
+            payload['phoneExt'] = phone_ext
+        if customer_message:
+            payload['customerMessage'] = customer_message
+        if notes:
+            payload['notes'] = notes
+        if appointment_booking_fields:
+            payload['appointmentBookingFields'] = appointment_booking_fields
+        if customer_booking_fields:
+            payload['customerBookingFields'] = customer_booking_fields
 
-        This end point creates a new appointment in an Initial "IN" status.
+        return payload
 
-        A valid serviceId is required. Use GET consumer/v1/services to retrieve a list of your services.
 
-        A valid resourceId is required if your calendar is a resource based calendar. Use consumer/v1/resources to retrieve a list of your resources.
+    def _service_payload(self,
+                         name,
+                         description,
+                         duration,
+                         location_id='',
+                         service_group_id='',
+                         public=False,
+                         default_service=False,
+                         duration_select=False,
+                         duration_interval=0,
+                         duration_min=0,
+                         duration_max=0,
+                         padding=0,
+                         consumer_padding=False,
+                         fee_amount=0,
+                         fee_taxable=False,
+                         cancellation_fee_amount=0,
+                         cancellation_fee_taxable=False,
+                         nonrefundable=False):
+        """Gather the data of a new service into a dictionary
+
+        :return: the service payload
+        :rtype: dict
+        """
+        # if any of the option items are set, build the option dictionary
+        options={}
+        if default_service or duration_select or duration_interval \
+            or duration_min or duration_max or padding or consumer_padding:
+            options['durationInterval'] = duration_interval
+            options['durationMin'] = duration_min
+            options['durationMax'] = duration_max
+            options['padding'] = padding
+            options['durationSelect'] = 'true' if duration_select else 'false'
+            options['durationService'] = 'true' if default_service else 'false'
+            options['consumerPadding'] = 'true' if consumer_padding else 'false'
 
-        StartDateTime and EndDateTime are required. Use the ISO 8601 format for DateTime Timezone. e.g. 2016-10-30T9:00:00-5:00
+        # if any of the fee items are set, build the fee dictionary
+        fee = {}
+        if fee_amount or fee_taxable or cancellation_fee_amount or cancellation_fee_taxable or nonrefundable:
+            fee['feeAmount'] = fee_amount
+            fee['cancellationFeeAmount'] = cancellation_fee_amount
+            fee['feeTaxable'] = 'true' if fee_taxable else 'false'
+            fee['cancellationFeeTaxable'] = 'true' if cancellation_fee_taxable else 'false'
+            fee['nonRefundable'] = 'true' if nonrefundable else 'false'
 
-        :param service_id: the service id for the booking
-        :type service_id: str
-        :param start_date_time: the start time of the appointment
-        :type start_date_time: datetime
-        :param end_date_time: the end time of the appointment
-        :type end_date_time: datetime
-        :param location_id: the location id for the booking
-        :type location_id: str
-        :param resource_id: the resource id for the booking
-        :type resource_id: str
-        :param customer_id: the customer id if available
-        :type customer_id: str
-        :param service_allocation_id: the service allocation for the appointment
-        :type service_allocation_id: str
-        :param booked_by: the person booking the appointment
-        :type booked_by: str
+        payload = { 'name': name, 'description': description }
 
-        :return: Returns a dictionary containing the appointment reservations, including appointment id
+        if location_id:
+            payload['locationId'] = location_id
+        if duration:
+            payload['duration'] = duration
+        if service_group_id:
+            payload['serviceGroupId'] = service_group_id
+        if public:
+            payload['public'] = 'true'
+        if options:
+            payload['options'] = options
+        if fee:
+            payload['fee'] = fee
+
+        return payload
+
+
+    def _service_allocation_payload(self,
+                                    start_date,
+                                    end_date,
+                                    start_time,
+                                    end_time,
+                                    location_id='',
+                                    resource_id='',
+                                    reason='',
+                                    all_day=False):
+        """Gather the data of a new service allocation into a dictionary
+
+        :return: the service allocation payload
         :rtype: dict
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
-        :exception TypeError: raised if date_time inputs are in incorrect format
+        :exception TypeError: raised if datetime inputs are in incorrect format
         """
-        appointment_url = f'{self.consumer_api}/appointments'
-
-        payload = { 'serviceId': service_id }
+        payload = {}
 
-        if type(start_date_time) is datetime:
-            payload['startDateTime'] = start_date_time.isoformat()
-        elif type(start_date_time) is str:
-            payload['startDateTime'] = start_date_time
+        if type(start_date) is date:
+            payload['startDate'] = start_date.isoformat()
+        elif type(start_date) is str:
+            payload['startDate'] = start_date
         else:
             raise TypeError
 
-        if type(end_date_time) is datetime:
-            payload['endDateTime'] = end_date_time.isoformat()
-        elif type(end_date_time) is str:
-            payload['endDateTime'] = end_date_time
+        if type(end_date) is date:
+            payload['endDate'] = end_date.isoformat()
+        elif type(end_date) is str:
+            payload['endDate'] = end_date
         else:
             raise TypeError
 
-        if customer_id:
-            payload['customerId'] = customer_id
-        if booked_by:
-            payload['bookedBy'] = booked_by
-        if resource_id:
-            payload['resourceId'] = resource_id
         if location_id:
             payload['locationId'] = location_id
-        if service_allocation_id:
-            payload['serviceAllocationId'] = service_allocation_id
+        if resource_id:
+            payload['resourceId'] = resource_id
+        if start_time:
+            payload['startTime'] = start_time
+        if end_time:
+            payload['endTime'] = end_time
+        if reason:
+            payload['reason'] = reason
+        if all_day:
+            payload['allDay'] = 'true'
 
-        return self._post_data(url=appointment_url, data=payload)
+        return payload
 
 
-    def book_appointment(self,
-                         appointment_id,
-                         email='',
-                         name='',
-                         phone='',
-                         phone_type='',
-                         phone_ext='',
-                         customer_message='',
-                         notes='',
-                         appointment_booking_fields=None,
-                         customer_booking_fields=None):
-        """Finalize a booking
+class OnSchedService(OnSchedBase):
+    def __init__(self,
+                 client_id,
+                 client_secret,
+                 scope='OnSchedAPI',
+                 environment='sandbox',
+                 max_workers=8,
+                 setup_scope=None,
+                 pool_connections=10,
+                 pool_maxsize=10,
+                 token_store=None,
+                 response_cache=None,
+                 availability_cache=None,
+                 appointment_index=None,
+                 scheduler=None,
+                 throttle_retries=5,
+                 retries=2,
+                 backoff=0.5,
+                 max_backoff=30,
+                 idempotent_posts=False,
+                 circuit_breaker=None,
+                 timeout=30,
+                 hedge=False,
+                 coalesce=True,
+                 json_decoder=None):
+        """Creates an OnSchedService instance.
 
-        Completes a new booking. Only appointments in the "IN" initial status can be booked,
-        by saving all the relevant details of the booking.
+        No request is made until the first API call, when the tokens are fetched from the OAuth server.
+        The consumer and setup sessions share a single token when their scopes match.
 
-        A valid appointment id is required. Use the appointment_id returned from create_appointment
+        The client can be shared between threads.  Only one token request per scope is in flight at
+        any time, the other threads wait for it and reuse its token.  Size pool_maxsize after the
+        number of threads sharing the client, so they don't wait on a pooled connection.
 
-        :param appointment_id: the id on the appointment object returned created by create_appointment
-        :type appointment_id: str
-        :param email: the customer's email address
-        :type email: str
-        :param name: the customer's name
-        :type name: str
-        :param phone: the customer's phone number
-        :type phone: str
-        :param phone_type: the type of phone, eg one of ('mobile','home','office')
-        :type phone_type: str
-        :param phone_ext: customers phone extension if available
-        :type phone_ext: str
-        :param customer_message: any custom message the customer wishes to leave about the appointment
-        :type customer_message: str
-        :param notes:
-        :type notes: str
-        :param appointment_booking_fields: custom booking fields dictionary in the form of
-                                           [ { name: string, value: string }, { name: string, value: string }, ... ]
-        :type appointment_booking_fields: dict
-        :param customer_booking_fields: custom customer field dictionary in the form of
-                                        [ { name: string, value: string }, { name: string, value: string }, ... ]
-        :type customer_booking_fields: dict
+        Pass a token_store (FileTokenStore or SharedMemoryTokenStore) to share the tokens between
+        the processes of a host, so a fleet of workers fetches one token instead of one per process.
 
-        :return: Returns a dictionary of the appointment
+        Pass a response_cache (ResponseCache) to cache the reference data returned by locations, location,
+        services and service_allocation.  The cached entries are dropped when the matching setup calls are
+        made through this client.
+
+        Pass an availability_cache (ResponseCache) to cache the availability responses for a short time.
+        The responses affected by create_appointment, book_appointment and cancel_appointment calls made
+        through this client are dropped, so the cache never shows a slot taken by one of these calls.
+
+        Pass an appointment_index (AppointmentIndex) to have create_appointment check its resource for
+        overlapping appointments before any request is made.  The index is kept current with the
+        appointments created, booked and cancelled through this client.
+
+        Every request is sent through a scheduler (RequestScheduler), which limits the requests in flight
+        and, optionally, their rate.  A request throttled with a 429 status pauses the scheduler for the
+        Retry-After delay, lowers the requests allowed in flight, and is sent again up to throttle_retries
+        times.  Share a scheduler between clients to apply a single limit to all of them.
+
+        Requests failing on a connection error, a timeout or a 500, 502, 503 or 504 status are sent again
+        up to retries times, after a random delay of up to backoff * 2 ** attempt seconds (capped by
+        max_backoff).  Paginated requests are retried page by page, so a failure resumes at the failing
+        offset.  POST, PUT and DELETE requests (e.g. creating, booking or cancelling an appointment) carry
+        an Idempotency-Key header, the same for every attempt, but are only sent again when the failure
+        shows they were not processed (a connect timeout or a 503 status), unless idempotent_posts is True
+        because the API deduplicates them on their key.
+
+        Pass a circuit_breaker (CircuitBreaker) to fail fast with CircuitOpenError on an endpoint which
+        keeps failing, instead of waiting on its requests.
+
+        Each request times out after timeout seconds.  Use deadline() to bound the time of a whole call,
+        its pages and retries included.  Set hedge to send a second GET request when the first one has not
+        answered within the 95th percentile of the latencies observed for its endpoint, and use the first
+        response to arrive.
+
+        With coalesce set, identical GET calls made while one is in flight (same URL and session) wait
+        for its response instead of sending their own requests.  See coalescing_stats().
+
+        :param client_id: client id provided by OnSched
+        :type client_id: str
+        :param client_secret: client secret provided by OnSched
+        :type client_secret: str
+        :param scope: client scope provided by OnSched
+        :type scope: str
+        :param environment: app environment ('sandbox' for sandbox endpoints, 'live' for production endpoints)
+        :type environment: str
+        :param max_workers: maximum number of pages fetched concurrently by the list endpoints (1 fetches serially)
+        :type max_workers: int
+        :param setup_scope: client scope used for the setup API. Defaults to scope
+        :type setup_scope: str
+        :param pool_connections: number of connection pools cached by each session
+        :type pool_connections: int
+        :param pool_maxsize: maximum number of connections kept in each connection pool
+        :type pool_maxsize: int
+        :param token_store: store in which the tokens are shared with other processes
+        :type token_store: TokenStore
+        :param response_cache: cache of the reference data responses
+        :type response_cache: ResponseCache
+        :param availability_cache: cache of the availability responses
+        :type availability_cache: ResponseCache
+        :param appointment_index: index of the appointments checked for conflicts
+        :type appointment_index: AppointmentIndex
+        :param scheduler: scheduler of the requests.  Defaults to a scheduler allowing the larger of pool_maxsize and
+                          max_workers requests in flight
+        :type scheduler: RequestScheduler
+        :param throttle_retries: number of times a request throttled with a 429 status is sent again
+        :type throttle_retries: int
+        :param retries: number of times a request failing on a transient error is sent again
+        :type retries: int
+        :param backoff: base delay of the retries, in seconds
+        :type backoff: float
+        :param max_backoff: maximum delay of a retry, in seconds
+        :type max_backoff: float
+        :param idempotent_posts: retry POST, PUT and DELETE requests like GET requests, relying on their Idempotency-Key
+        :type idempotent_posts: bool
+        :param circuit_breaker: circuit breaker of the endpoints
+        :type circuit_breaker: CircuitBreaker
+        :param timeout: number of seconds a request may take, or a (connect, read) tuple.  None waits forever
+        :type timeout: float
+        :param hedge: hedge the GET requests at the 95th percentile of their latency
+        :type hedge: bool
+        :param coalesce: share the response of a GET call with the identical calls made while it is in flight
+        :type coalesce: bool
+        :param json_decoder: function decoding the raw bytes of the JSON responses. Defaults to decode_json
+        :type json_decoder: function
+        """
+        super().__init__(client_id=client_id,
+                         client_secret=client_secret,
+                         scope=scope,
+                         environment=environment,
+                         max_workers=max_workers,
+                         setup_scope=setup_scope,
+                         json_decoder=json_decoder)
+
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.token_store = token_store
+        self.response_cache = response_cache
+        self.availability_cache = availability_cache
+        self.appointment_index = appointment_index
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=max(pool_maxsize, self.max_workers))
+        self.throttle_retries = throttle_retries
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idempotent_posts = idempotent_posts
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout
+        self.hedge = hedge
+        # number of GET requests sent a second time by hedging
+        self.hedged_requests = 0
+
+        # the deadline of the calls made by each thread, see deadline()
+        self._local = threading.local()
+        self._latencies = {}
+        self._latencies_lock = threading.Lock()
+        self._hedge_executor = None
+
+        self.coalesce = coalesce
+        # GET calls in flight, by session and URL
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self._fetches = 0
+        self._coalesced = 0
+
+        # the sessions and their tokens are set up on first use
+        self.session = None
+        self.admin_session = None
+        # the sessions using the same scope share a lock, as they share the token
+        self._token_locks = { scope: threading.Lock() for scope in (self.scope, self.setup_scope) }
+        # number of times the token of an existing session has been renewed
+        self.token_refreshes = { 'consumer': 0, 'setup': 0 }
+
+        self._renewer = None
+        self._renewer_stop = threading.Event()
+
+
+    def start_token_renewer(self, margin=60, retry_interval=5):
+        """Start renewing the consumer and setup tokens in a background thread
+
+        The tokens are renewed margin seconds before they expire, so the API calls never wait on
+        the OAuth server.  Should a renewal fail, it is retried every retry_interval seconds, and the
+        API calls still renew an expired token themselves.
+
+        :param margin: number of seconds before expires_at at which the tokens are renewed
+        :type margin: int
+        :param retry_interval: number of seconds to wait before retrying a failed renewal
+        :type retry_interval: int
+
+        :return: None
+        """
+        if self._renewer and self._renewer.is_alive():
+            return
+
+        self._renewer_stop.clear()
+        self._renewer = threading.Thread(target=self._renew_tokens,
+                                         args=(margin, retry_interval),
+                                         name='onsched-token-renewer',
+                                         daemon=True)
+        self._renewer.start()
+
+
+    def stop_token_renewer(self):
+        """Stop the background token renewal started by start_token_renewer
+
+        :return: None
+        """
+        self._renewer_stop.set()
+
+        if self._renewer:
+            self._renewer.join()
+            self._renewer = None
+
+
+    @contextmanager
+    def deadline(self, seconds):
+        """Bound the time of the calls made by the current thread within the context
+
+        Every request made within the context, the pages, retries and concurrent queries of a call included,
+        times out when the deadline is reached.  Nested deadlines can only shorten the deadline.
+
+        with onsched.deadline(2.5):
+            availability = onsched.availability(5, start_date, end_date)
+
+        :param seconds: number of seconds the calls may take
+        :type seconds: float
+
+        :exception DeadlineExceeded: raised by the calls if the deadline is reached
+        """
+        previous = getattr(self._local, 'deadline', None)
+        deadline = time.monotonic() + seconds
+        self._local.deadline = deadline if previous is None else min(previous, deadline)
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+
+    def coalescing_stats(self):
+        """Get the number of GET calls sent and of GET calls coalesced with an identical call in flight
+
+        :return: the 'fetches' sent and the 'coalesced' calls which waited for another call's response
         :rtype: dict
+        """
+        with self._in_flight_lock:
+            return { 'fetches': self._fetches, 'coalesced': self._coalesced }
+
+
+    def locations(self):
+        """Get a complete list of locations
+
+        :return: location data dictionary
 
         :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
         :exception Timeout: raised if the request times out
         :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
         """
-        appointment_url = f'{self.consumer_api}/appointments/{appointment_id}/book'
-
-        payload = {}
-        if email:
-            payload['email'] = email
-        if name:
-            payload['name'] = name
-        if phone:
-            payload['phone'] = phone
-        if phone_type:
-            payload['phoneType'] = phone_type
-        if phone_ext:
-            payload['phoneExt'] = phone_ext
-        if customer_message:
-            payload['customerMessage'] = customer_message
-        if notes:
-            payload['notes'] = notes
-        if appointment_booking_fields:
-            payload['appointmentBookingFields'] = appointment_booking_fields
-        if customer_booking_fields:
-            payload['customerBookingFields'] = customer_booking_fields
+        locations_url = f'{self.consumer_api}/locations?'
 
-        return self._update_data(url=appointment_url, data=payload)
+        return self._fetch_cached_data(url=locations_url, endpoint='locations')
 
 
-    def cancel_appointment(self, appointment_id):
-        """Cancel an appointment which has been booked with book_appointment
+    def iter_locations(self, prefetch=False):
+        """Iterate over the complete list of locations, one page at a time
 
-        :param appointment_id: the appointment id to be cancelled
-        :type appointment_id: str
+        :param prefetch: fetch the next page while the current page is being processed
+        :type prefetch: bool
 
-        :return: returns the booking that has been cancelled with the status updated to CN
-        :rtype: dict
+        :return: generator of location data dictionaries
+        :rtype: generator
 
         :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
         :exception Timeout: raised if the request times out
         :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
         """
-        cancellation_url = f'{self.consumer_api}/appointments/{appointment_id}/cancel'
+        locations_url = f'{self.consumer_api}/locations?'
 
-        return self._update_data(url=cancellation_url, data={})
+        return self._iter_data(url=locations_url, prefetch=prefetch)
 
 
-    # Setup API actions
-    def create_resource(self,
-                        name,
-                        email='',
-                        description='',
-                        location_id='',
-                        group_id='',
-                        timezone_id='',
-                        addressline1='',
-                        addressline2='',
-                        city='',
-                        state='',
-                        country='',
-                        postal_code='',
-                        contact_preferred_phone_type='',
-                        contact_home_phone='',
-                        contact_mobile_phone='',
-                        contact_business_phone='',
-                        contact_business_phone_ext='',
-                        contact_skype_username='',
-                        effective_date=None,
-                        notification_type=0,
-                        display_color='',
-                        google_calendar_id='',
-                        outlook_calendar_id='',
-                        ignore_business_hours=False,
-                        gender='',
-                        hourly=0,
-                        calendar_availability=0,
-                        sort_key=0,
-                        bio_link=''):
-        """Create a resource
+    def location(self, location_id):
+        """Get a single location
 
-        :param name: the resource name
-        :type name: str
-        :param location_id: the location id for the resource
+        :param location_id: the specific location id to be searched
         :type location_id: str
-        :param email: an email address for the resource
+
+        :return: a single location data
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+
+        location_url = f'{self.consumer_api}/locations/{location_id}?'
+
+        return self._fetch_cached_data(url=location_url, endpoint='location')
+
+
+    def services(self, location_id='', service_group='', default_service=False):
+        """Get a complete list of services based on location_id
+
+        :param location_id: the location id for which the services will be returned
+        :type location_id: str
+        :param service_group: filter the search by service group id
+        :type service_group: str
+        :param default_service: filter the search by service group id
+        :type default_service: bool
+
+        :return: services data dictionary
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        services_url = self._services_url(location_id=location_id,
+                                          service_group=service_group,
+                                          default_service=default_service)
+
+        return self._fetch_cached_data(url=services_url, endpoint='services')
+
+
+    def iter_services(self, location_id='', service_group='', default_service=False, prefetch=False):
+        """Iterate over the complete list of services based on location_id, one page at a time
+
+        :param location_id: the location id for which the services will be returned
+        :type location_id: str
+        :param service_group: filter the search by service group id
+        :type service_group: str
+        :param default_service: filter the search by service group id
+        :type default_service: bool
+        :param prefetch: fetch the next page while the current page is being processed
+        :type prefetch: bool
+
+        :return: generator of service data dictionaries
+        :rtype: generator
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        services_url = self._services_url(location_id=location_id,
+                                          service_group=service_group,
+                                          default_service=default_service)
+
+        return self._iter_data(url=services_url, prefetch=prefetch)
+
+
+    def customers(self, location_id='', group_id='', email='', lastname='', deleted=False):
+        """Return a list of customers based on a location
+
+        :param location_id: the location id for the search
+        :type location_id: str
+        :param group_id: the group id for the search
+        :type group_id: str
+        :param email: the email of the customer to search
         :type email: str
-        :param description: a description of the resource
-        :type description: str
-        :param group_id: the resource group id
+        :param lastname: the lastname of the customer
+        :type lastname: str
+        :param deleted: search for deleted customers
+        :type deleted: bool
+
+        :return: a list of customers matching the criteria
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        customers_url = self._customers_url(location_id=location_id,
+                                            group_id=group_id,
+                                            email=email,
+                                            lastname=lastname,
+                                            deleted=deleted)
+
+        return self._fetch_data(url=customers_url)
+
+
+    def iter_customers(self, location_id='', group_id='', email='', lastname='', deleted=False, prefetch=False):
+        """Iterate over the customers based on a location, one page at a time
+
+        :param location_id: the location id for the search
+        :type location_id: str
+        :param group_id: the group id for the search
         :type group_id: str
-        :param timezone_id: the timezone id for the resource. defaults to the business timezone if empty
-        :type timezone_id: str
-        :param addressline1: the address of the resource
-        :type addressline1: str
-        :param addressline2: the address of the resource
-        :type addressline2: str
-        :param city: the city of the resource
-        :type city: str
-        :param state: the state/province of the resource
-        :type state: str
-        :param country: the country of the resource
-        :type country: str
-        :param postal_code: the postal code for the resource
-        :type postal_code: str
-        :param contact_preferred_phone_type: type of contact preferred (mobile|business|home|skype)
-        :type contact_preferred_phone_type: str
-        :param contact_home_phone: the resource's home phone number
-        :type contact_home_phone: str
-        :param contact_mobile_phone: the resource's mobile phone number
-        :type contact_mobile_phone: str
-        :param contact_business_phone: the resource's business phone number
-        :type contact_business_phone: str
-        :param contact_business_phone_ext: the resource's business phone extension
-        :type contact_business_phone_ext: str
-        :param contact_skype_username: the resource's skype username
-        :type contact_skype_username: str
-        :param effective_date: the datetime that this resource will become available in the system
-        :type effective_date: datetime
-        :param notification_type: the notification type (0: default, 1: email, 2: SMS, 3: email + SMS)
-        :type notification_type: int
-        :param display_color: the color for the resource, which will control the calendar color in the portal
-        :type display_color: str
-        :param google_calendar_id: the resource's google calendar
-        :type google_calendar_id: str
-        :param outlook_calendar_id: the resource's outlook calendar
-        :type outlook_calendar_id: str
-        :param ignore_business_hours: is the resource available outside normal business hours?
-        :type ignore_business_hours: bool
-        :param gender: the resource gender (for people)
-        :type gender: str
-        :param hourly: hourly pay rate for the resource
-        :type hourly: int
-        :param calendar_availability: which calendar system the resources uses
-                                      (0: OnSched Cal, 1: Google Cal, 2: Outlook Cal)
-        :type calendar_availability: int
-        :param sort_key: a numeric value that can be used for sorting the resources list
-        :type sort_key: int
-        :param bio_link: a URL for additional resource information
-        :type bio_link: str
-        :return: A resource object dictionary
+        :param email: the email of the customer to search
+        :type email: str
+        :param lastname: the lastname of the customer
+        :type lastname: str
+        :param deleted: search for deleted customers
+        :type deleted: bool
+        :param prefetch: fetch the next page while the current page is being processed
+        :type prefetch: bool
+
+        :return: generator of customer data dictionaries
+        :rtype: generator
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        customers_url = self._customers_url(location_id=location_id,
+                                            group_id=group_id,
+                                            email=email,
+                                            lastname=lastname,
+                                            deleted=deleted)
+
+        return self._iter_data(url=customers_url, prefetch=prefetch)
+
+
+    def availability(self,
+                     service_id,
+                     start_date,
+                     end_date,
+                     start_time=0,
+                     end_time=0,
+                     location_id='',
+                     resource_id='',
+                     resource_group_id='',
+                     resource_ids=None,
+                     duration=0,
+                     tz_offset=0,
+                     day_availability=0,
+                     first_day_available=False):
+        """Get Availability information for a given service between start_date and end_date
+
+        Choose your search criteria carefully. Availability is an expensive call.
+        If you search availability for all resources then you should only do so for a single date.
+        If you decide to search availability for multiple dates you should only do so for a specific
+        resource by specifying the optional resourceId parameter.
+
+        firstDayAvailable only works with day availability. If set to true it will look for the first day
+        available within the range specified by the dayAvailability parameter. The two parameters together can
+        be a clever way to display availability for a week or month. Tip - pass in the beginning of the week or month,
+        and available times are displayed for the first available date if exists.
+
+        You should only specify the duration parameter if you let your customers choose the duration of the
+        appointment. e.g. from a list.
+
+        The tz parameter allows you to select a suitable timezone for the customer to book in. Your app should be
+        timezone aware if you use this option. The requested timezone is specified as an offset(plus or minus)
+        from GMT time.
+
+        :param service_id: service id for availability search
+        :type service_id: str
+        :param start_date: start date for availability search
+        :type start_date: date
+        :param end_date: end date for availability search
+        :type end_date: date
+        :param start_time: start time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm. You will
+                           only see availability within the boundary of your business start and end times.
+                           Defaults to Business Hours Start.
+        :type start_time: int
+        :param end_time: end time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm. You will
+                         only see availability within the boundary of your business start and end times.
+                         Defaults to Business Hours End.
+        :type end_time: int
+        :param location_id: the id of the business location. Defaults to first business location.
+        :type location_id: str
+        :param resource_id: resource id for availability search.
+        :type resource_id: str
+        :param resource_group_id: resource group id for availability search
+        :type resource_group_id: str
+        :param resource_ids: List of resource id strings for availability search
+        :type resource_ids: list
+        :param duration: duration of the service in minutes if different than the default
+        :type duration: int
+        :param tzOffset: request timezone offset to view availability
+        :type tz_offset: int
+        :param day_availability: Return day availability for number of days specified from start_date.
+        :type day_availability: int
+        :param first_day_available: Return available times for the first available day
+        :type first_day_available: bool
+
+        :return: Returns a list of times available as well as information about the resource and service
         :rtype: dict
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
-        :exception TypeError: raised if datetime inputs are in incorrect format
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if date inputs are in incorrect format
+        """
+        availability_url = self._availability_url(service_id=service_id,
+                                                  start_date=start_date,
+                                                  end_date=end_date,
+                                                  start_time=start_time,
+                                                  end_time=end_time,
+                                                  location_id=location_id,
+                                                  resource_id=resource_id,
+                                                  resource_group_id=resource_group_id,
+                                                  resource_ids=resource_ids,
+                                                  duration=duration,
+                                                  tz_offset=tz_offset,
+                                                  day_availability=day_availability,
+                                                  first_day_available=first_day_available)
+
+        if self.availability_cache is None:
+            return self._fetch_data(url=availability_url)
+
+        # describe the span and resources covered, so bookings only drop the responses they affect
+        first_day = self._as_date(start_date)
+        last_day = max(self._as_date(end_date), first_day + timedelta(days=day_availability))
+
+        resources = set(resource_ids or [])
+        if resource_id:
+            resources.add(resource_id)
+        if resource_group_id:
+            # the members of the group are unknown, so treat the response as covering all the resources
+            resources = set()
+
+        info = {
+            'service_id': str(service_id),
+            'resource_ids': { str(resource) for resource in resources },
+            'start_date': first_day,
+            'end_date': last_day,
+        }
+
+        return self._fetch_cached_data(url=availability_url,
+                                       endpoint='availability',
+                                       cache=self.availability_cache,
+                                       info=info)
+
+
+    def availability_range(self,
+                           service_id,
+                           start_date,
+                           end_date,
+                           resource_ids=None,
+                           days_per_query=1,
+                           start_time=0,
+                           end_time=0,
+                           location_id='',
+                           resource_id='',
+                           resource_group_id='',
+                           duration=0,
+                           tz_offset=0):
+        """Get Availability information for a given service over a long span of dates
+
+        Multi-date availability across many resources is slow when asked in one call.  Instead, the span
+        is split into queries of days_per_query days, and resource_ids into one query per resource.  The
+        queries are run concurrently, at most max_workers at a time, and their results are merged into a
+        response shaped like the response of a single availability call.
+
+        :param service_id: service id for availability search
+        :type service_id: str
+        :param start_date: start date for availability search
+        :type start_date: date
+        :param end_date: end date for availability search
+        :type end_date: date
+        :param resource_ids: List of resource id strings, each searched with its own queries
+        :type resource_ids: list
+        :param days_per_query: number of days covered by each query
+        :type days_per_query: int
+        :param start_time: start time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm
+        :type start_time: int
+        :param end_time: end time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm
+        :type end_time: int
+        :param location_id: the id of the business location. Defaults to first business location.
+        :type location_id: str
+        :param resource_id: resource id for availability search, when resource_ids is not used
+        :type resource_id: str
+        :param resource_group_id: resource group id for availability search
+        :type resource_group_id: str
+        :param duration: duration of the service in minutes if different than the default
+        :type duration: int
+        :param tz_offset: request timezone offset to view availability
+        :type tz_offset: int
+
+        :return: Returns a list of times available as well as information about the resource and service
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if date inputs are in incorrect format
+        """
+        first_day = self._as_date(start_date)
+        last_day = self._as_date(end_date)
+        days_per_query = max(1, days_per_query)
+
+        queries = []
+        query_start = first_day
+        while query_start <= last_day:
+            query_end = min(query_start + timedelta(days=days_per_query - 1), last_day)
+
+            for query_resource_id in (resource_ids or [resource_id]):
+                queries.append({ 'start_date': query_start, 'end_date': query_end, 'resource_id': query_resource_id })
+
+            query_start = query_end + timedelta(days=1)
+
+        def run_query(query):
+            return self.availability(service_id=service_id,
+                                     start_time=start_time,
+                                     end_time=end_time,
+                                     location_id=location_id,
+                                     resource_group_id=resource_group_id,
+                                     duration=duration,
+                                     tz_offset=tz_offset,
+                                     **query)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(queries) or 1)) as executor:
+            responses = list(executor.map(self._with_deadline(run_query), queries))
+
+        return self._merge_availability(responses, first_day, last_day)
+
+
+    def batch_availability(self, specs):
+        """Get Availability information for many services, date windows and resource filters at once
+
+        Each spec is a dict of the keyword arguments of availability, e.g.
+        { 'service_id': 5, 'start_date': start_date, 'end_date': end_date, 'resource_id': '1' }.
+        The specs are run concurrently, at most max_workers at a time, over the connections and token
+        of this client.  Identical specs are only requested once.  A failing spec does not fail the batch:
+        its entry holds the exception instead of the response.
+
+        :param specs: availability specs, either a list of dicts or a dict of dicts keyed by any hashable
+        :type specs: list or dict
+
+        :return: for each spec, a dict holding the 'spec', the 'data' returned by availability (None on
+                 failure) and the 'error' raised (None on success).  A list in the order of the specs
+                 when specs is a list, a dict with the keys of specs when specs is a dict.
+        :rtype: list or dict
+        """
+        keyed_specs = specs if isinstance(specs, dict) else dict(enumerate(specs))
+
+        # a spec which can't be keyed (e.g. a missing date) is not run, it fails with the error raised
+        spec_keys = {}
+        unique_specs = {}
+        for key, spec in keyed_specs.items():
+            try:
+                spec_keys[key] = self._spec_key(spec)
+            except Exception as error:
+                spec_keys[key] = error
+                continue
+            unique_specs.setdefault(spec_keys[key], spec)
+
+        def run_spec(spec):
+            try:
+                return self.availability(**spec), None
+            except Exception as error:
+                return None, error
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique_specs) or 1)) as executor:
+            outcomes = dict(zip(unique_specs, executor.map(self._with_deadline(run_spec), unique_specs.values())))
+
+        results = {}
+        for key, spec in keyed_specs.items():
+            if isinstance(spec_keys[key], Exception):
+                data, error = None, spec_keys[key]
+            else:
+                data, error = outcomes[spec_keys[key]]
+            results[key] = { 'spec': spec, 'data': copy.deepcopy(data), 'error': error }
+
+        return results if isinstance(specs, dict) else list(results.values())
+
+
+    def appointments(self,
+                     location_id='',
+                     email='',
+                     lastname='',
+                     service_id='',
+                     service_allocation_id='',
+                     resource_id='',
+                     customer_id='',
+                     start_date=None,
+                     end_date=None,
+                     status='',
+                     booked_by=''):
+        """List all appointments
+
+        :param location_id: filter appointments by location
+        :type location_id: str
+        :param email: filter appointments by customer email
+        :type email: str
+        :param lastname: filter appointments by customer lastname
+        :type lastname: str
+        :param service_id: filter appointments by service_id
+        :type service_id: str
+        :param service_allocation_id: filter appointments by service_allocation_id
+        :type service_allocation_id: str
+        :param resource_id: filter appointments by resource_id
+        :type resource_id: str
+        :param customer_id: filter appointments by customer_id
+        :type customer_id: str
+        :param start_date: filter appointments by on/after start date
+        :type start_date: datetime
+        :param end_date: filter appointments by on/before end date
+        :type end_date: datetime
+        :param status: filter appointments by booking status. valid values are IN, BK, CN, RE, RS
+        :type status: str
+        :param booked_by: filter appointments by the user email that made the booking
+        :type booked_by: str
+
+        :return: Returns a dictionary containing a list of appointments filtered
+                 by the parameters specified
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if date_time inputs are in incorrect format
+        """
+        appointments_url = self._appointments_url(location_id=location_id,
+                                                  email=email,
+                                                  lastname=lastname,
+                                                  service_id=service_id,
+                                                  service_allocation_id=service_allocation_id,
+                                                  resource_id=resource_id,
+                                                  customer_id=customer_id,
+                                                  start_date=start_date,
+                                                  end_date=end_date,
+                                                  status=status,
+                                                  booked_by=booked_by)
+
+        return self._fetch_data(url=appointments_url)
+
+
+    def iter_appointments(self,
+                          location_id='',
+                          email='',
+                          lastname='',
+                          service_id='',
+                          service_allocation_id='',
+                          resource_id='',
+                          customer_id='',
+                          start_date=None,
+                          end_date=None,
+                          status='',
+                          booked_by='',
+                          prefetch=False):
+        """Iterate over all appointments, one page at a time
+
+        :param location_id: filter appointments by location
+        :type location_id: str
+        :param email: filter appointments by customer email
+        :type email: str
+        :param lastname: filter appointments by customer lastname
+        :type lastname: str
+        :param service_id: filter appointments by service_id
+        :type service_id: str
+        :param service_allocation_id: filter appointments by service_allocation_id
+        :type service_allocation_id: str
+        :param resource_id: filter appointments by resource_id
+        :type resource_id: str
+        :param customer_id: filter appointments by customer_id
+        :type customer_id: str
+        :param start_date: filter appointments by on/after start date
+        :type start_date: datetime
+        :param end_date: filter appointments by on/before end date
+        :type end_date: datetime
+        :param status: filter appointments by booking status. valid values are IN, BK, CN, RE, RS
+        :type status: str
+        :param booked_by: filter appointments by the user email that made the booking
+        :type booked_by: str
+        :param prefetch: fetch the next page while the current page is being processed
+        :type prefetch: bool
+
+        :return: generator of appointment data dictionaries
+        :rtype: generator
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if date_time inputs are in incorrect format
+        """
+        appointments_url = self._appointments_url(location_id=location_id,
+                                                  email=email,
+                                                  lastname=lastname,
+                                                  service_id=service_id,
+                                                  service_allocation_id=service_allocation_id,
+                                                  resource_id=resource_id,
+                                                  customer_id=customer_id,
+                                                  start_date=start_date,
+                                                  end_date=end_date,
+                                                  status=status,
+                                                  booked_by=booked_by)
+
+        return self._iter_data(url=appointments_url, prefetch=prefetch)
+
+
+    def create_appointment(self,
+                           service_id,
+                           start_date_time,
+                           end_date_time,
+                           resource_id,
+                           location_id='',
+                           customer_id='',
+                           service_allocation_id='',
+                           booked_by=''):
+        """Create a new appointment
+
+        This end point creates a new appointment in an Initial "IN" status.
+
+        A valid serviceId is required. Use GET consumer/v1/services to retrieve a list of your services.
+
+        A valid resourceId is required if your calendar is a resource based calendar. Use consumer/v1/resources to retrieve a list of your resources.
+
+        StartDateTime and EndDateTime are required. Use the ISO 8601 format for DateTime Timezone. e.g. 2016-10-30T9:00:00-5:00
+
+        :param service_id: the service id for the booking
+        :type service_id: str
+        :param start_date_time: the start time of the appointment
+        :type start_date_time: datetime
+        :param end_date_time: the end time of the appointment
+        :type end_date_time: datetime
+        :param location_id: the location id for the booking
+        :type location_id: str
+        :param resource_id: the resource id for the booking
+        :type resource_id: str
+        :param customer_id: the customer id if available
+        :type customer_id: str
+        :param service_allocation_id: the service allocation for the appointment
+        :type service_allocation_id: str
+        :param booked_by: the person booking the appointment
+        :type booked_by: str
+
+        :return: Returns a dictionary containing the appointment reservations, including appointment id
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if date_time inputs are in incorrect format
+        :exception AppointmentConflictError: raised before any request if an appointment_index is set and
+                                             the resource holds an overlapping appointment
+        """
+        payload = self._appointment_payload(service_id=service_id,
+                                            start_date_time=start_date_time,
+                                            end_date_time=end_date_time,
+                                            resource_id=resource_id,
+                                            location_id=location_id,
+                                            customer_id=customer_id,
+                                            service_allocation_id=service_allocation_id,
+                                            booked_by=booked_by)
+
+        return self._create(payload)
+
+
+    def book_appointment(self,
+                         appointment_id,
+                         email='',
+                         name='',
+                         phone='',
+                         phone_type='',
+                         phone_ext='',
+                         customer_message='',
+                         notes='',
+                         appointment_booking_fields=None,
+                         customer_booking_fields=None):
+        """Finalize a booking
+
+        Completes a new booking. Only appointments in the "IN" initial status can be booked,
+        by saving all the relevant details of the booking.
+
+        A valid appointment id is required. Use the appointment_id returned from create_appointment
+
+        :param appointment_id: the id on the appointment object returned created by create_appointment
+        :type appointment_id: str
+        :param email: the customer's email address
+        :type email: str
+        :param name: the customer's name
+        :type name: str
+        :param phone: the customer's phone number
+        :type phone: str
+        :param phone_type: the type of phone, eg one of ('mobile','home','office')
+        :type phone_type: str
+        :param phone_ext: customers phone extension if available
+        :type phone_ext: str
+        :param customer_message: any custom message the customer wishes to leave about the appointment
+        :type customer_message: str
+        :param notes:
+        :type notes: str
+        :param appointment_booking_fields: custom booking fields dictionary in the form of
+                                           [ { name: string, value: string }, { name: string, value: string }, ... ]
+        :type appointment_booking_fields: dict
+        :param customer_booking_fields: custom customer field dictionary in the form of
+                                        [ { name: string, value: string }, { name: string, value: string }, ... ]
+        :type customer_booking_fields: dict
+
+        :return: Returns a dictionary of the appointment
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        payload = self._booking_payload(email=email,
+                                        name=name,
+                                        phone=phone,
+                                        phone_type=phone_type,
+                                        phone_ext=phone_ext,
+                                        customer_message=customer_message,
+                                        notes=notes,
+                                        appointment_booking_fields=appointment_booking_fields,
+                                        customer_booking_fields=customer_booking_fields)
+
+        return self._book(appointment_id, payload)
+
+
+    def reserve_and_book(self,
+                         service_id,
+                         start_date_time,
+                         end_date_time,
+                         resource_id,
+                         location_id='',
+                         customer_id='',
+                         service_allocation_id='',
+                         booked_by='',
+                         **booking):
+        """Reserve a time slot and book it in one call
+
+        The booking payload is prepared before the reservation is made, so invalid booking details fail
+        before anything is created.  The booking is sent as soon as the reservation returns its id, over
+        the same session and token.  If the booking is rejected, the reservation is cancelled before the
+        error is raised, so no appointment is left in the initial "IN" status.  A booking whose response is
+        lost (e.g. a read timeout) may have been processed, so its appointment is left as it is.
+
+        :param service_id: see create_appointment
+        :type service_id: str
+        :param start_date_time: see create_appointment
+        :type start_date_time: datetime
+        :param end_date_time: see create_appointment
+        :type end_date_time: datetime
+        :param resource_id: see create_appointment
+        :type resource_id: str
+        :param location_id: see create_appointment
+        :type location_id: str
+        :param customer_id: see create_appointment
+        :type customer_id: str
+        :param service_allocation_id: see create_appointment
+        :type service_allocation_id: str
+        :param booked_by: see create_appointment
+        :type booked_by: str
+        :param booking: keyword arguments of book_appointment (email, name, phone, ...)
+        :type booking: dict
+
+        :return: Returns a dictionary of the booked appointment
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if date_time inputs are in incorrect format, or booking holds an unknown argument
+        :exception AppointmentConflictError: raised before any request if an appointment_index is set and
+                                             the resource holds an overlapping appointment
+        """
+        payload = self._booking_payload(**booking)
+
+        appointment = self.create_appointment(service_id=service_id,
+                                              start_date_time=start_date_time,
+                                              end_date_time=end_date_time,
+                                              resource_id=resource_id,
+                                              location_id=location_id,
+                                              customer_id=customer_id,
+                                              service_allocation_id=service_allocation_id,
+                                              booked_by=booked_by)
+
+        try:
+            return self._book(appointment['id'], payload)
+        except Exception as error:
+            self._release(appointment['id'], error)
+            raise
+
+
+    def cancel_appointment(self, appointment_id):
+        """Cancel an appointment which has been booked with book_appointment
+
+        :param appointment_id: the appointment id to be cancelled
+        :type appointment_id: str
+
+        :return: returns the booking that has been cancelled with the status updated to CN
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        cancellation_url = f'{self.consumer_api}/appointments/{appointment_id}/cancel'
+
+        appointment = self._update_data(url=cancellation_url, data={})
+        self._invalidate_availability(appointment)
+        if self.appointment_index is not None:
+            self.appointment_index.remove(appointment_id)
+
+        return appointment
+
+
+    def bulk_create_appointments(self, appointments, book=True, rate=0, max_in_flight=0, report=None):
+        """Create, and book, many appointments concurrently
+
+        The appointments are read from the iterable as workers free up, so it can be a generator or a
+        csv.DictReader over a file of any size.  Each appointment is created then booked by a worker of
+        the pool (max_workers workers), so the bookings of some rows overlap the creations of others.
+
+        Each appointment is a dict of the keyword arguments of create_appointment, plus any keyword
+        arguments of book_appointment (e.g. email, name) used to book it.  The booking arguments are
+        checked before the appointment is created, and an appointment whose booking is rejected is
+        cancelled, so a failed row leaves no appointment in the "IN" status (see reserve_and_book).
+
+        A result is yielded for each appointment, in the order in which they complete:
+        { 'row': index of the appointment in the iterable, 'appointment': the created appointment,
+          'booking': the booked appointment, 'stage': 'create', 'book' or 'done', 'error': the exception
+          raised by the stage, None on success }
+
+        :param appointments: the appointments to create
+        :type appointments: iterable
+        :param book: book the appointments once created
+        :type book: bool
+        :param rate: maximum number of requests per second, 0 for no limit
+        :type rate: float
+        :param max_in_flight: maximum number of appointments read but not yet completed. Defaults to twice max_workers
+        :type max_in_flight: int
+        :param report: report updated with the count and throughput of the completed appointments
+        :type report: BulkReport
+
+        :return: generator of the results of the appointments
+        :rtype: generator
+        """
+        create_parameters = set(inspect.signature(self.create_appointment).parameters)
+        limiter = RateLimiter(rate) if rate else None
+        max_in_flight = max_in_flight or 2 * self.max_workers
+
+        def create_and_book(row, appointment):
+            result = { 'row': row, 'appointment': None, 'booking': None, 'stage': 'create', 'error': None }
+            try:
+                if book:
+                    payload = self._booking_payload(**{ key: value for key, value in appointment.items()
+                                                        if key not in create_parameters })
+                if limiter:
+                    limiter.acquire()
+                result['appointment'] = self.create_appointment(**{ key: value for key, value in appointment.items()
+                                                                    if key in create_parameters })
+                if book:
+                    result['stage'] = 'book'
+                    if limiter:
+                        limiter.acquire()
+                    result['booking'] = self._book(result['appointment']['id'], payload)
+                result['stage'] = 'done'
+            except Exception as error:
+                result['error'] = error
+                if result['stage'] == 'book':
+                    self._release(result['appointment']['id'], error)
+
+            return result
+
+        yield from self._run_bulk(create_and_book, appointments, max_in_flight, report)
+
+
+    def bulk_cancel_appointments(self, rate=0, retries=None, report=None, **filters):
+        """Cancel all the appointments matching a filter, concurrently
+
+        The matching appointments are listed first, then cancelled by a pool of max_workers workers.
+        Cancellations failing on a transient error are retried as any request of the client, see __init__.
+
+        A result is yielded for each appointment, in the order in which they complete:
+        { 'row': index of the appointment, 'appointment': the matching appointment, 'cancelled': the
+          cancelled appointment, 'stage': 'cancel' or 'done', 'error': the exception raised, None on success }
+
+        :param rate: maximum number of requests per second, 0 for no limit
+        :type rate: float
+        :param retries: number of times a request failing on a transient error is sent again. Defaults to
+                        the retries of the client.
+        :type retries: int
+        :param report: report updated with the count and throughput of the completed appointments
+        :type report: BulkReport
+        :param filters: keyword arguments of appointments (e.g. resource_id, start_date, end_date, status)
+        :type filters: dict
+
+        :return: generator of the results of the appointments
+        :rtype: generator
+
+        :exception HTTPError: raised if listing the appointments returned an unsuccessful status code
+        :exception Timeout: raised if listing the appointments times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        limiter = RateLimiter(rate) if rate else None
+
+        def cancel(row, appointment):
+            result = { 'row': row, 'appointment': appointment, 'cancelled': None, 'stage': 'cancel', 'error': None }
+            try:
+                if limiter:
+                    limiter.acquire()
+                with self._retrying(retries):
+                    result['cancelled'] = self.cancel_appointment(appointment['id'])
+                result['stage'] = 'done'
+            except Exception as error:
+                result['error'] = error
+
+            return result
+
+        yield from self._run_bulk(cancel, self.appointments(**filters)['data'], 2 * self.max_workers, report)
+
+
+    def bulk_reschedule_appointments(self, reschedule, rate=0, retries=None, report=None, **filters):
+        """Move all the appointments matching a filter, concurrently
+
+        The matching appointments are listed first, then moved by a pool of max_workers workers.  An
+        appointment is moved by booking a new appointment for the same service and customer, then cancelling
+        the original appointment, so the customer never goes without an appointment.  The new appointment
+        keeps the service, times, resource, location, customer, service allocation and bookedBy of the
+        original, and its booking details (email, name, phone, phoneType, phoneExt, customerMessage, notes
+        and booking fields).  Other data of the original appointment is not carried over.  Requests failing on a
+        transient error are retried as any request of the client (see __init__), so the creation of the new
+        appointment is only retried when it can't have been made.
+
+        A result is yielded for each appointment, in the order in which they complete:
+        { 'row': index of the appointment, 'appointment': the matching appointment, 'rescheduled': the new booked
+          appointment, 'cancelled': the cancelled original appointment, 'stage': 'create', 'book', 'cancel' or
+          'done', 'error': the exception raised, None on success }
+
+        :param reschedule: function called with each matching appointment, returning the keyword arguments of
+                           create_appointment or book_appointment to change (e.g. start_date_time, end_date_time,
+                           resource_id, notes), or None to leave the appointment as it is
+        :type reschedule: function
+        :param rate: maximum number of requests per second, 0 for no limit
+        :type rate: float
+        :param retries: number of times a request failing on a transient error is sent again. Defaults to
+                        the retries of the client.
+        :type retries: int
+        :param report: report updated with the count and throughput of the completed appointments
+        :type report: BulkReport
+        :param filters: keyword arguments of appointments (e.g. resource_id, start_date, end_date, status)
+        :type filters: dict
+
+        :return: generator of the results of the appointments
+        :rtype: generator
+
+        :exception HTTPError: raised if listing the appointments returned an unsuccessful status code
+        :exception Timeout: raised if listing the appointments times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        limiter = RateLimiter(rate) if rate else None
+        create_parameters = set(inspect.signature(self._appointment_payload).parameters)
+
+        def move(row, appointment):
+            result = { 'row': row, 'appointment': appointment, 'rescheduled': None, 'cancelled': None,
+                       'stage': 'create', 'error': None }
+            try:
+                changes = reschedule(appointment)
+                if changes is None:
+                    result['stage'] = 'done'
+                    return result
+
+                details = { 'service_id': appointment.get('serviceId', ''),
+                            'start_date_time': appointment.get('startDateTime'),
+                            'end_date_time': appointment.get('endDateTime'),
+                            'resource_id': appointment.get('resourceId', ''),
+                            'location_id': appointment.get('locationId', ''),
+                            'customer_id': appointment.get('customerId', ''),
+                            'service_allocation_id': appointment.get('serviceAllocationId', ''),
+                            'booked_by': appointment.get('bookedBy', '') }
+                booking = { 'email': appointment.get('email', ''),
+                            'name': appointment.get('name', ''),
+                            'phone': appointment.get('phone', ''),
+                            'phone_type': appointment.get('phoneType', ''),
+                            'phone_ext': appointment.get('phoneExt', ''),
+                            'customer_message': appointment.get('customerMessage', ''),
+                            'notes': appointment.get('notes', ''),
+                            'appointment_booking_fields': appointment.get('appointmentBookingFields'),
+                            'customer_booking_fields': appointment.get('customerBookingFields') }
+                for key, value in changes.items():
+                    (details if key in create_parameters else booking)[key] = value
+
+                payload = self._appointment_payload(**details)
+                booking = self._booking_payload(**booking)
+
+                with self._retrying(retries):
+                    if limiter:
+                        limiter.acquire()
+                    # the new appointment may overlap the original appointment it replaces
+                    created = self._create(payload, exclude=appointment['id'])
+                    result['stage'] = 'book'
+                    try:
+                        if limiter:
+                            limiter.acquire()
+                        result['rescheduled'] = self._book(created['id'], booking)
+                    except Exception as error:
+                        self._release(created['id'], error)
+                        raise
+
+                    result['stage'] = 'cancel'
+                    if limiter:
+                        limiter.acquire()
+                    result['cancelled'] = self.cancel_appointment(appointment['id'])
+                result['stage'] = 'done'
+            except Exception as error:
+                result['error'] = error
+
+            return result
+
+        yield from self._run_bulk(move, self.appointments(**filters)['data'], 2 * self.max_workers, report)
+
+
+    # Setup API actions
+    def create_resource(self,
+                        name,
+                        email='',
+                        description='',
+                        location_id='',
+                        group_id='',
+                        timezone_id='',
+                        addressline1='',
+                        addressline2='',
+                        city='',
+                        state='',
+                        country='',
+                        postal_code='',
+                        contact_preferred_phone_type='',
+                        contact_home_phone='',
+                        contact_mobile_phone='',
+                        contact_business_phone='',
+                        contact_business_phone_ext='',
+                        contact_skype_username='',
+                        effective_date=None,
+                        notification_type=0,
+                        display_color='',
+                        google_calendar_id='',
+                        outlook_calendar_id='',
+                        ignore_business_hours=False,
+                        gender='',
+                        hourly=0,
+                        calendar_availability=0,
+                        sort_key=0,
+                        bio_link=''):
+        """Create a resource
+
+        :param name: the resource name
+        :type name: str
+        :param location_id: the location id for the resource
+        :type location_id: str
+        :param email: an email address for the resource
+        :type email: str
+        :param description: a description of the resource
+        :type description: str
+        :param group_id: the resource group id
+        :type group_id: str
+        :param timezone_id: the timezone id for the resource. defaults to the business timezone if empty
+        :type timezone_id: str
+        :param addressline1: the address of the resource
+        :type addressline1: str
+        :param addressline2: the address of the resource
+        :type addressline2: str
+        :param city: the city of the resource
+        :type city: str
+        :param state: the state/province of the resource
+        :type state: str
+        :param country: the country of the resource
+        :type country: str
+        :param postal_code: the postal code for the resource
+        :type postal_code: str
+        :param contact_preferred_phone_type: type of contact preferred (mobile|business|home|skype)
+        :type contact_preferred_phone_type: str
+        :param contact_home_phone: the resource's home phone number
+        :type contact_home_phone: str
+        :param contact_mobile_phone: the resource's mobile phone number
+        :type contact_mobile_phone: str
+        :param contact_business_phone: the resource's business phone number
+        :type contact_business_phone: str
+        :param contact_business_phone_ext: the resource's business phone extension
+        :type contact_business_phone_ext: str
+        :param contact_skype_username: the resource's skype username
+        :type contact_skype_username: str
+        :param effective_date: the datetime that this resource will become available in the system
+        :type effective_date: datetime
+        :param notification_type: the notification type (0: default, 1: email, 2: SMS, 3: email + SMS)
+        :type notification_type: int
+        :param display_color: the color for the resource, which will control the calendar color in the portal
+        :type display_color: str
+        :param google_calendar_id: the resource's google calendar
+        :type google_calendar_id: str
+        :param outlook_calendar_id: the resource's outlook calendar
+        :type outlook_calendar_id: str
+        :param ignore_business_hours: is the resource available outside normal business hours?
+        :type ignore_business_hours: bool
+        :param gender: the resource gender (for people)
+        :type gender: str
+        :param hourly: hourly pay rate for the resource
+        :type hourly: int
+        :param calendar_availability: which calendar system the resources uses
+                                      (0: OnSched Cal, 1: Google Cal, 2: Outlook Cal)
+        :type calendar_availability: int
+        :param sort_key: a numeric value that can be used for sorting the resources list
+        :type sort_key: int
+        :param bio_link: a URL for additional resource information
+        :type bio_link: str
+        :return: A resource object dictionary
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        create_resource_url = f'{self.setup_api}/resources'
+
+        payload = { 'name': name }
+
+        payload.update(self._get_resources_data(email=email,
+                                                description=description,
+                                                location_id=location_id,
+                                                group_id=group_id,
+                                                timezone_id=timezone_id,
+                                                addressline1=addressline1,
+                                                addressline2=addressline2,
+                                                city=city,
+                                                state=state,
+                                                country=country,
+                                                postal_code=postal_code,
+                                                contact_preferred_phone_type=contact_preferred_phone_type,
+                                                contact_home_phone=contact_home_phone,
+                                                contact_mobile_phone=contact_mobile_phone,
+                                                contact_business_phone=contact_business_phone,
+                                                contact_business_phone_ext=contact_business_phone_ext,
+                                                contact_skype_username=contact_skype_username,
+                                                effective_date=effective_date,
+                                                notification_type=notification_type,
+                                                display_color=display_color,
+                                                google_calendar_id=google_calendar_id,
+                                                outlook_calendar_id=outlook_calendar_id,
+                                                ignore_business_hours=ignore_business_hours,
+                                                gender=gender,
+                                                hourly=hourly,
+                                                calendar_availability=calendar_availability,
+                                                sort_key=sort_key,
+                                                bio_link=bio_link)
+                       )
+
+        resource = self._post_setup_data(url=create_resource_url, data=payload)
+        self._invalidate_cache('locations', 'location', 'services', 'service_allocation')
+
+        return resource
+
+
+    def update_resource(self,
+                        resource_id,
+                        name='',
+                        email='',
+                        description='',
+                        location_id='',
+                        group_id='',
+                        timezone_id='',
+                        addressline1='',
+                        addressline2='',
+                        city='',
+                        state='',
+                        country='',
+                        postal_code='',
+                        contact_preferred_phone_type='',
+                        contact_home_phone='',
+                        contact_mobile_phone='',
+                        contact_business_phone='',
+                        contact_business_phone_ext='',
+                        contact_skype_username='',
+                        effective_date=None,
+                        notification_type=0,
+                        display_color='',
+                        google_calendar_id='',
+                        outlook_calendar_id='',
+                        ignore_business_hours=False,
+                        gender='',
+                        hourly=0,
+                        calendar_availability=0,
+                        sort_key=0,
+                        bio_link=''):
+        """Update a resource
+
+        :param resource_id: the resource id to be updated
+        :type resource_id: str
+        :param name: the resource name
+        :type name: str
+        :param location_id: the location id for the resource
+        :type location_id: str
+        :param email: an email address for the resource
+        :type email: str
+        :param description: a description of the resource
+        :type description: str
+        :param group_id: the resource group id
+        :type group_id: str
+        :param timezone_id: the timezone id for the resource. defaults to the business timezone if empty
+        :type timezone_id: str
+        :param addressline1: the address of the resource
+        :type addressline1: str
+        :param addressline2: the address of the resource
+        :type addressline2: str
+        :param city: the city of the resource
+        :type city: str
+        :param state: the state/province of the resource
+        :type state: str
+        :param country: the country of the resource
+        :type country: str
+        :param postal_code: the postal code for the resource
+        :type postal_code: str
+        :param contact_preferred_phone_type: type of contact preferred (mobile|business|home|skype)
+        :type contact_preferred_phone_type: str
+        :param contact_home_phone: the resource's home phone number
+        :type contact_home_phone: str
+        :param contact_mobile_phone: the resource's mobile phone number
+        :type contact_mobile_phone: str
+        :param contact_business_phone: the resource's business phone number
+        :type contact_business_phone: str
+        :param contact_business_phone_ext: the resource's business phone extension
+        :type contact_business_phone_ext: str
+        :param contact_skype_username: the resource's skype username
+        :type contact_skype_username: str
+        :param effective_date: the datetime that this resource will become available in the system
+        :type effective_date: datetime
+        :param notification_type: the notification type (0: default, 1: email, 2: SMS, 3: email + SMS)
+        :type notification_type: int
+        :param display_color: the color for the resource, which will control the calendar color in the portal
+        :type display_color: str
+        :param google_calendar_id: the resource's google calendar
+        :type google_calendar_id: str
+        :param outlook_calendar_id: the resource's outlook calendar
+        :type outlook_calendar_id: str
+        :param ignore_business_hours: is the resource available outside normal business hours?
+        :type ignore_business_hours: bool
+        :param gender: the resource gender (for people)
+        :type gender: str
+        :param hourly: hourly pay rate for the resource
+        :type hourly: int
+        :param calendar_availability: which calendar system the resources uses
+                                      (0: OnSched Cal, 1: Google Cal, 2: Outlook Cal)
+        :type calendar_availability: int
+        :param sort_key: a numeric value that can be used for sorting the resources list
+        :type sort_key: int
+        :param bio_link: a URL for additional resource information
+        :type bio_link: str
+
+        :return: A resource object dictionary
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        update_resource_url = f'{self.setup_api}/resources/{resource_id}'
+
+        payload = {}
+
+        if name:
+            payload['name'] = name
+
+        payload.update(self._get_resources_data(email=email,
+                                                description=description,
+                                                location_id=location_id,
+                                                group_id=group_id,
+                                                timezone_id=timezone_id,
+                                                addressline1=addressline1,
+                                                addressline2=addressline2,
+                                                city=city,
+                                                state=state,
+                                                country=country,
+                                                postal_code=postal_code,
+                                                contact_preferred_phone_type=contact_preferred_phone_type,
+                                                contact_home_phone=contact_home_phone,
+                                                contact_mobile_phone=contact_mobile_phone,
+                                                contact_business_phone=contact_business_phone,
+                                                contact_business_phone_ext=contact_business_phone_ext,
+                                                contact_skype_username=contact_skype_username,
+                                                effective_date=effective_date,
+                                                notification_type=notification_type,
+                                                display_color=display_color,
+                                                google_calendar_id=google_calendar_id,
+                                                outlook_calendar_id=outlook_calendar_id,
+                                                ignore_business_hours=ignore_business_hours,
+                                                gender=gender,
+                                                hourly=hourly,
+                                                calendar_availability=calendar_availability,
+                                                sort_key=sort_key,
+                                                bio_link=bio_link)
+                       )
+
+        resource = self._update_setup_data(url=update_resource_url, data=payload)
+        self._invalidate_cache('locations', 'location', 'services', 'service_allocation')
+
+        return resource
+
+
+    def delete_resource(self, resource_id):
+        """Delete a resource
+
+        :param resource_id: the id of the resource to be deleted
+        :type resource_id: str
+        :return: the resource object that has been deleted
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        delete_resource_url = f'{self.setup_api}/resources/{resource_id}'
+
+        resource = self._delete_setup_data(url=delete_resource_url)
+        self._invalidate_cache('locations', 'location', 'services', 'service_allocation')
+
+        return resource
+
+
+    def create_service(self,
+                       name,
+                       description,
+                       duration,
+                       location_id='',
+                       service_group_id='',
+                       public=False,
+                       default_service=False,
+                       duration_select=False,
+                       duration_interval=0,
+                       duration_min=0,
+                       duration_max=0,
+                       padding=0,
+                       consumer_padding=False,
+                       fee_amount=0,
+                       fee_taxable=False,
+                       cancellation_fee_amount=0,
+                       cancellation_fee_taxable=False,
+                       nonrefundable=False):
+        """Create a new service
+
+        :param name: the name of the service
+        :type name: str
+        :param description: a description of the service
+        :type description: str
+        :param duration: the default duration of the service
+        :type duration: int
+        :param location_id: the location id for the service
+        :type location_id: str
+        :param service_group_id: the service group id for the service
+        :type service_group_id: str
+        :param public: is this service available for booking?
+        :type public: bool
+        :param default_service: is this the default service?
+        :type default_service: bool
+        :param duration_select: is the duration selectable?
+        :type duration_select: bool
+        :param duration_interval: if duration is selectable, set time intervals
+        :type duration_interval: int
+        :param duration_min: minimum duration for selectable durations
+        :type duration_min: int
+        :param duration_max: maximum duration for selectable durations
+        :type duration_max: int
+        :param padding: padding between bookings in minutes
+        :type padding: int
+        :param consumer_padding: can the customer add padding?
+        :type consumer_padding: bool
+        :param fee_amount: cost of the service
+        :type fee_amount: int
+        :param fee_taxable: is this fee taxable
+        :type fee_taxable: bool
+        :param cancellation_fee_amount: cost of cancellation
+        :type cancellation_fee_amount: int
+        :param cancellation_fee_taxable: is the cancellation fee taxable?
+        :type cancellation_fee_taxable: bool
+        :param nonrefundable: is the service cost refundable
+        :type nonrefundable: bool
+
+        :return: a new service object
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        service_url = f'{self.setup_api}/services'
+
+        payload = self._service_payload(name=name,
+                                        description=description,
+                                        duration=duration,
+                                        location_id=location_id,
+                                        service_group_id=service_group_id,
+                                        public=public,
+                                        default_service=default_service,
+                                        duration_select=duration_select,
+                                        duration_interval=duration_interval,
+                                        duration_min=duration_min,
+                                        duration_max=duration_max,
+                                        padding=padding,
+                                        consumer_padding=consumer_padding,
+                                        fee_amount=fee_amount,
+                                        fee_taxable=fee_taxable,
+                                        cancellation_fee_amount=cancellation_fee_amount,
+                                        cancellation_fee_taxable=cancellation_fee_taxable,
+                                        nonrefundable=nonrefundable)
+
+        service = self._post_data(service_url, payload)
+        self._invalidate_cache('services')
+
+        return service
+
+
+    def delete_service(self, service_id):
+        """Delete a service
+
+        :param service_id: the id of the service to be deleted
+        :type service_id: str
+
+        :return: the service object that has been deleted
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        delete_service_url = f'{self.setup_api}/services/{service_id}'
+
+        service = self._delete_setup_data(url=delete_service_url)
+        self._invalidate_cache('services', 'service_allocation')
+
+        return service
+
+
+    def service_allocations(self, service_id, start_date=None, end_date=None, location_id=''):
+        """Get the service allocations for a given service
+
+        :param service_id: the service id for the event.  Passing a '0' in for service_id
+                           will return allocations for all services
+        :param start_date: date object for starting date of search
+        :type start_date: date
+        :param end_date: date object for ending date of search
+        :type end_date: date
+        :param location_id: filter results by location id
+        :type location_id: str
+
+        :return: service allocations data dictionary
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        service_allocations_url = self._service_allocations_url(service_id=service_id,
+                                                                start_date=start_date,
+                                                                end_date=end_date,
+                                                                location_id=location_id)
+
+        return self._fetch_setup_data(url=service_allocations_url)
+
+
+    def iter_service_allocations(self, service_id, start_date=None, end_date=None, location_id='', prefetch=False):
+        """Iterate over the service allocations for a given service, one page at a time
+
+        :param service_id: the service id for the event.  Passing a '0' in for service_id
+                           will return allocations for all services
+        :param start_date: date object for starting date of search
+        :type start_date: date
+        :param end_date: date object for ending date of search
+        :type end_date: date
+        :param location_id: filter results by location id
+        :type location_id: str
+        :param prefetch: fetch the next page while the current page is being processed
+        :type prefetch: bool
+
+        :return: generator of service allocation data dictionaries
+        :rtype: generator
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        service_allocations_url = self._service_allocations_url(service_id=service_id,
+                                                                start_date=start_date,
+                                                                end_date=end_date,
+                                                                location_id=location_id)
+
+        return self._iter_data(url=service_allocations_url, setup=True, prefetch=prefetch)
+
+
+    def service_allocation(self, service_allocation_id):
+        """Get a single service allocation
+
+        :param service_allocation_id: the id of the service allocation
+        :type service_allocation_id: str
+
+        :return: single service allocation data
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        service_allocation_url = f'{self.consumer_api}/services/allocations/{service_allocation_id}?'
+
+        return self._fetch_cached_data(url=service_allocation_url, endpoint='service_allocation')
+
+
+    def create_service_allocation(self,
+                                  service_id,
+                                  start_date,
+                                  end_date,
+                                  start_time,
+                                  end_time,
+                                  location_id='',
+                                  resource_id='',
+                                  reason='',
+                                  all_day=False):
+        """Create a new service allocation
+
+        :param service_id: the service id for this allocation
+        :type service_id: str
+        :param start_date: the starting date of the event
+        :type start_date: date
+        :param end_date: The ending date of the event
+        :type end_date: date
+        :param start_time: start time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm. You will
+                           only see availability within the boundary of your business start and end times.
+                           Defaults to Business Hours Start.
+        :type start_time: int
+        :param end_time: end time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm. You will
+                         only see availability within the boundary of your business start and end times.
+                         Defaults to Business Hours Start.
+        :param location_id: the location id for the event
+        :type location_id: str
+        :param resource_id: the resource id associated with the service allocation
+        :type resource_id: str
+        :type end_time: int
+        :param reason: The purpose of the event
+        :type reason: str
+        :param all_day: is event an all day event?
+        :type all_day: bool
+
+        :return: a serviceAllocation object containing the data of the new allocation
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception TypeError: raised if datetime inputs are in incorrect format
+        """
+        create_service_allocation_url = f'{self.setup_api}/services/{service_id}/allocations'
+
+        payload = self._service_allocation_payload(start_date=start_date,
+                                                   end_date=end_date,
+                                                   start_time=start_time,
+                                                   end_time=end_time,
+                                                   location_id=location_id,
+                                                   resource_id=resource_id,
+                                                   reason=reason,
+                                                   all_day=all_day)
+
+        allocation = self._post_setup_data(url=create_service_allocation_url, data=payload)
+        self._invalidate_cache('service_allocation')
+
+        return allocation
+
+
+    #####################
+    # Private methods
+    #####################
+    def _iter_data(self, url, setup=False, prefetch=False):
+        """Perform a paginated GET request on the given URL, yielding the records one page at a time
+
+        Only the current page (and the next page, when prefetching) is held in memory.
+
+        :param url: complete API URL
+        :type url: str
+        :param setup: use the setup API session instead of the consumer API session
+        :type setup: bool
+        :param prefetch: fetch the next page while the current page is being processed
+        :type prefetch: bool
+
+        :return: generator of the records found in the 'data' of each page
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        next_page = None
+        offset = 0
+        has_more = True
+
+        try:
+            while has_more:
+                if next_page:
+                    formatted_response = next_page.result()
+                else:
+                    formatted_response = self._fetch_page(self._verified_session(setup), url, offset)
+
+                has_more = formatted_response.get('hasMore', False)
+                offset += self.PAGE_LIMIT
+
+                # start fetching the next page before handing out the current one
+                next_page = None
+                if has_more and executor:
+                    next_page = executor.submit(self._with_deadline(self._fetch_page),
+                                                self._verified_session(setup),
+                                                url,
+                                                offset)
+
+                yield from formatted_response.get('data', [])
+        finally:
+            if executor:
+                if next_page:
+                    next_page.cancel()
+                executor.shutdown(wait=False)
+
+
+    def _verified_session(self, setup=False):
+        """Return the consumer or setup session after verifying it is setup
+
+        :param setup: return the setup API session instead of the consumer API session
+        :type setup: bool
+
+        :return: the session with a valid token
+        :rtype: OAuth2Session
+        """
+        if setup:
+            self._set_setup_session()
+            return self.admin_session
+
+        self._set_session()
+        return self.session
+
+
+    def _fetch_data(self, url, generation=None):
+        """Perform a GET request on the given URL
+
+        :param url: complete API URL
+        :param generation: the cache generation of the call, only identical calls of the same generation are coalesced
+        :type generation: int
+
+        :return: API response formatted as a data dictionary
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        self._set_session()  # verify the session is setup
+
+        return self._fetch_coalesced(self.session, url, generation)
+
+
+    def _fetch_cached_data(self, url, endpoint, cache=None, info=None):
+        """Perform a GET request on the given URL, answering from the response cache when possible
+
+        :param url: complete API URL
+        :type url: str
+        :param endpoint: the endpoint name, which selects the TTL of the cached response
+        :type endpoint: str
+        :param cache: the cache to use. Defaults to response_cache
+        :type cache: ResponseCache
+        :param info: data describing the response, used to select the responses to invalidate
+        :type info: dict
+
+        :return: API response formatted as a data dictionary
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        cache = cache or self.response_cache
+
+        if cache is None:
+            return self._fetch_data(url=url)
+
+        cached = cache.get(url)
+        if cached is not None:
+            # hand out copies, so the callers can't modify the cached response
+            return copy.deepcopy(cached)
+
+        # a response fetched while the cache was invalidated may predate the change, so it is not
+        # cached, and calls made after an invalidation don't join fetches started before it
+        generation = cache.generation
+        result = self._fetch_data(url=url, generation=generation)
+        cache.set(url, copy.deepcopy(result), endpoint=endpoint, info=info, generation=generation)
+
+        return result
+
+
+    def _invalidate_cache(self, *endpoints):
+        """Drop the cached responses of the endpoints after a call modifying their data
+
+        :param endpoints: the endpoint names
+        :type endpoints: str
+
+        :return: None
+        """
+        if self.response_cache is not None:
+            self.response_cache.invalidate(*endpoints)
+
+
+    def _invalidate_availability(self, appointment):
+        """Drop the cached availability responses affected by an appointment
+
+        Responses overlapping the days of the appointment are dropped if they cover its resource or,
+        for appointments without a resource, its service.  If the appointment lacks the data needed
+        to tell, all the availability responses are dropped.
+
+        :param appointment: the appointment data, as returned by the API
+        :type appointment: dict
+
+        :return: None
+        """
+        if self.availability_cache is None:
+            return
+
+        try:
+            first_day = self._as_date(appointment['startDateTime'])
+            last_day = self._as_date(appointment.get('endDateTime') or appointment['startDateTime'])
+        except (KeyError, TypeError, ValueError):
+            self.availability_cache.invalidate('availability')
+            return
+
+        service_id = str(appointment.get('serviceId', ''))
+        resource_id = str(appointment.get('resourceId') or '')
+
+        def is_affected(info):
+            if info['end_date'] < first_day or info['start_date'] > last_day:
+                return False
+            if resource_id:
+                return not info['resource_ids'] or resource_id in info['resource_ids']
+
+            return info['service_id'] == service_id
+
+        self.availability_cache.invalidate('availability', match=is_affected)
+
+
+    def _run_bulk(self, task, items, max_in_flight, report=None):
+        """Run a task on each item of an iterable on a pool of max_workers workers
+
+        Items are read from the iterable as tasks complete, so at most max_in_flight items are held at once.
+
+        :param task: function called with the index and the item, returning a result dict holding an 'error'
+        :type task: function
+        :param items: the items
+        :type items: iterable
+        :param max_in_flight: maximum number of items read but not yet completed
+        :type max_in_flight: int
+        :param report: report updated as the tasks complete
+        :type report: BulkReport
+
+        :return: generator of the results, in the order in which they complete
+        :rtype: generator
+        """
+        items = enumerate(items)
+        in_flight = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                for row, item in items:
+                    in_flight.add(executor.submit(task, row, item))
+                    if len(in_flight) >= max_in_flight:
+                        break
+
+                if not in_flight:
+                    return
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if report is not None:
+                        report.add(result)
+                    yield result
+
+
+    def _create(self, payload, exclude=None):
+        """Create an appointment with a prepared appointment payload
+
+        :param payload: the appointment payload
+        :type payload: dict
+        :param exclude: the id of an appointment the new appointment may overlap, e.g. the appointment it replaces
+        :type exclude: str
+
+        :return: Returns a dictionary containing the appointment reservations, including appointment id
+        :rtype: dict
+
+        :exception AppointmentConflictError: raised before any request if an appointment_index is set and
+                                             the resource holds an overlapping appointment
+        """
+        appointment_url = f'{self.consumer_api}/appointments'
+
+        if self.appointment_index is not None:
+            self.appointment_index.check(payload.get('resourceId', ''),
+                                         payload['startDateTime'],
+                                         payload['endDateTime'],
+                                         exclude=exclude)
+
+        appointment = self._post_data(url=appointment_url, data=payload)
+        self._invalidate_availability(dict(payload, **appointment))
+        self._index_appointment(dict(payload, **appointment))
+
+        return appointment
+
+
+    def _book(self, appointment_id, payload):
+        """Book an appointment with a prepared booking payload
+
+        :param appointment_id: the id of the appointment in the "IN" status
+        :type appointment_id: str
+        :param payload: the booking payload
+        :type payload: dict
+
+        :return: Returns a dictionary of the appointment
+        :rtype: dict
+        """
+        appointment_url = f'{self.consumer_api}/appointments/{appointment_id}/book'
+
+        appointment = self._update_data(url=appointment_url, data=payload)
+        self._invalidate_availability(appointment)
+        self._index_appointment(appointment)
+
+        return appointment
+
+
+    def _release(self, appointment_id, error):
+        """Cancel a reserved appointment whose booking failed, unless the booking may have been processed
+
+        The appointment is only cancelled when the error shows the booking was not processed: a status
+        other than 500, 502 and 504, a connect timeout or an open circuit.  Errors of the cancellation are
+        ignored, so the error of the booking is the one raised to the caller.
+
+        :param appointment_id: the id of the appointment
+        :type appointment_id: str
+        :param error: the exception raised by the booking
+        :type error: Exception
+
+        :return: None
+        """
+        if isinstance(error, requests.HTTPError):
+            status = getattr(error.response, 'status_code', None)
+            if status is None or status in (500, 502, 504):
+                return
+        elif not isinstance(error, (requests.ConnectTimeout, CircuitOpenError)):
+            return
+
+        try:
+            self.cancel_appointment(appointment_id)
+        except Exception:
+            pass
+
+
+    def _index_appointment(self, appointment):
+        """Add an appointment created or booked through the client to the appointment index
+
+        :param appointment: the appointment data, as returned by the API
+        :type appointment: dict
+
+        :return: None
+        """
+        if self.appointment_index is not None:
+            self.appointment_index.add(appointment)
+
+
+    def _post_data(self, url, data):
+        """Perform a POST request on the given URL
+
+        :param url: complete API URL
+        :type: str
+        :param data: a dictionary of data to post to the API.  the data is submitted as JSON
+        :type: dict
+
+        :return: API response formatted as a data dictionary
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        self._set_session()  # verify the session is setup
+
+        return self._send(self.session, 'POST', url, json=data)
+
+
+    def _update_data(self, url, data):
+        """Perform a PUT request on the given URL
+
+        :param url: complete API URL
+        :param data: a dictionary of data to send to the update (PUT/PATCH) endpoint.  the data is submitted as JSON
+
+        :return: API response formatted as a data dictionary
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        self._set_session()  # verify the session is setup
+
+        return self._send(self.session, 'PUT', url, json=data)
+
+
+    def _fetch_setup_data(self, url):
+        """Perform a GET request on the given URL
+
+        :param url: complete API URL
+
+        :return: API response formatted as a data dictionary
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        self._set_setup_session()  # verify the session is setup
+
+        return self._fetch_coalesced(self.admin_session, url)
+
+
+    def _fetch_coalesced(self, session, url, generation=None):
+        """Fetch the pages of a URL, sharing the response with the identical calls made while it is in flight
+
+        The first call for a session and URL fetches the pages, the calls made before it completes wait for
+        it and get a copy of its response, or its exception.  The deadline of the first call only applies
+        to it: when it is exceeded, the waiting calls fetch the pages again.
+
+        :param session: the OAuth session used for the requests
+        :type session: OAuth2Session
+        :param url: complete API URL
+        :type url: str
+        :param generation: the cache generation of the call, only identical calls of the same generation are coalesced
+        :type generation: int
+
+        :return: the merged pages of the API response, see _fetch_pages
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        if not self.coalesce:
+            return self._fetch_pages(session, url)
+
+        key = (id(session), url, generation)
+        with self._in_flight_lock:
+            call = self._in_flight.get(key)
+            if call is None:
+                call = { 'done': threading.Event(), 'result': None, 'error': None, 'waiters': 0 }
+                self._in_flight[key] = call
+                self._fetches += 1
+                leader = True
+            else:
+                call['waiters'] += 1
+                self._coalesced += 1
+                leader = False
+
+        if not leader:
+            deadline = getattr(self._local, 'deadline', None)
+            if not call['done'].wait(None if deadline is None else max(0, deadline - time.monotonic())):
+                raise DeadlineExceeded(f'deadline exceeded waiting for {url}')
+            if isinstance(call['error'], DeadlineExceeded):
+                return self._fetch_coalesced(session, url, generation)
+            if call['error'] is not None:
+                raise call['error']
+
+            return copy.deepcopy(call['result'])
+
+        try:
+            call['result'] = self._fetch_pages(session, url)
+        except Exception as error:
+            call['error'] = error
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+            call['done'].set()
+
+        # the waiters copy the result, so the caller gets a copy of its own
+        return copy.deepcopy(call['result']) if call['waiters'] else call['result']
+
+
+    def _fetch_pages(self, session, url):
+        """Perform a paginated GET request on the given URL and merge the pages
+
+        The first page is fetched on its own to learn the total number of records.  The
+        remaining pages are then fetched concurrently, at most max_workers at a time, and
+        merged in offset order.
+
+        :param session: the OAuth session used for the requests
+        :type session: OAuth2Session
+        :param url: complete API URL
+        :type url: str
+
+        :return: the final page of the API response, with data replaced by the merged data of all pages
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        offset = 0
+        has_more = False
+        data = None
+
+        formatted_response = self._fetch_page(session, url, offset)
+
+        if 'hasMore' in formatted_response:
+            has_more = formatted_response['hasMore']
+        if 'data' in formatted_response:
+            data = formatted_response['data']
+
+        # once the total is known, fetch the remaining pages concurrently
+        if has_more and 'total' in formatted_response and self.max_workers > 1:
+            offsets = range(self.PAGE_LIMIT, formatted_response['total'], self.PAGE_LIMIT)
+
+            if offsets:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(offsets))) as executor:
+                    fetch_page = self._with_deadline(self._fetch_page)
+                    pages = executor.map(lambda page_offset: fetch_page(session, url, page_offset), offsets)
+
+                    # map yields the pages in offset order
+                    for offset, formatted_response in zip(offsets, pages):
+                        data += formatted_response['data']
+
+                has_more = formatted_response['hasMore']
+
+        # loop over any remaining data until 'hasMore' is False
+        while has_more:
+            offset += self.PAGE_LIMIT
+            formatted_response = self._fetch_page(session, url, offset)
+
+            data += formatted_response['data']
+            # update has_more
+            has_more = formatted_response['hasMore']
+
+        # use the final response
+        result = formatted_response
+        # if data exists, replace data with the accumulated result
+        if data:
+            result['count'] = result['total']
+            result['data'] = data
+
+        return result
+
+
+    def _fetch_page(self, session, url, offset):
+        """Perform a GET request for a single page of the given URL
+
+        :param session: the OAuth session used for the request
+        :type session: OAuth2Session
+        :param url: complete API URL
+        :type url: str
+        :param offset: the offset of the first record of the page
+        :type offset: int
+
+        :return: API response formatted as a data dictionary
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        return self._send(session, 'GET', url + f'&limit={self.PAGE_LIMIT}&offset={offset}')
+
+
+    def _send(self, session, method, url, **kwargs):
+        """Send a request through the scheduler and decode its JSON response
+
+        A response with a 429 status pauses the scheduler for its Retry-After delay (or an exponential
+        backoff without one), and the request is sent again up to throttle_retries times.  Requests
+        failing on a transient error are sent again up to retries times (see __init__ and _retrying).
+
+        :param session: the OAuth session used for the request
+        :type session: OAuth2Session
+        :param method: the HTTP method
+        :type method: str
+        :param url: complete API URL
+        :type url: str
+        :param kwargs: keyword arguments of the request (e.g. json)
+        :type kwargs: dict
+
+        :return: API response formatted as a data dictionary
+        :rtype: dict
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :exception CircuitOpenError: raised without sending the request if the circuit of the endpoint is open
+        """
+        endpoint = self._endpoint(method, url)
+        # a request changing data may have been processed when its response failed, only GET requests
+        # are sent again whatever the failure
+        idempotent = method == 'GET' or self.idempotent_posts
+        if method != 'GET':
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **{ 'Idempotency-Key': uuid.uuid4().hex })
+
+        retries = getattr(self._local, 'retries', None)
+        if retries is None:
+            retries = self.retries
+
+        throttled = 0
+        failed = 0
+        while True:
+            trial = self.circuit_breaker.before(endpoint) if self.circuit_breaker is not None else False
+
+            try:
+                try:
+                    response = self._request(session, method, url, endpoint, **kwargs)
+                except DeadlineExceeded:
+                    raise
+                except (requests.ConnectionError, requests.Timeout) as error:
+                    self._record(endpoint, False)
+                    if failed >= retries or not (idempotent or isinstance(error, requests.ConnectTimeout)):
+                        raise
+                    failed = self._back_off(failed)
+                    continue
+                except requests.RequestException:
+                    self._record(endpoint, False)
+                    raise
+
+                if response.status_code == 429:
+                    self.scheduler.throttled(self._retry_after(response, throttled))
+                    if throttled >= self.throttle_retries:
+                        break
+                    throttled += 1
+                    continue
+
+                self.scheduler.succeeded()
+                if response.status_code not in (500, 502, 503, 504):
+                    self._record(endpoint, True)
+                    break
+
+                self._record(endpoint, False)
+                if failed >= retries or not (idempotent or response.status_code == 503):
+                    break
+                failed = self._back_off(failed)
+            finally:
+                # a trial request ending without a success or failure (a 429, a deadline or another
+                # error) lets the next request through as the trial
+                if trial:
+                    self.circuit_breaker.release(endpoint)
+
+        response.raise_for_status()
+
+        return self.json_decoder(response.content)
+
+
+    def _request(self, session, method, url, endpoint, **kwargs):
+        """Send a request once, within the timeout and deadline, hedging it if it is a GET and hedge is set
+
+        :param session: the OAuth session used for the request
+        :type session: OAuth2Session
+        :param method: the HTTP method
+        :type method: str
+        :param url: complete API URL
+        :type url: str
+        :param endpoint: the endpoint of the request, see _endpoint
+        :type endpoint: str
+        :param kwargs: keyword arguments of the request (e.g. json)
+        :type kwargs: dict
+
+        :return: the response
+        :rtype: Response
+
+        :exception DeadlineExceeded: raised without sending the request if the deadline is reached
+        """
+        hedge_after = self._latency_percentile(endpoint, 0.95) if self.hedge and method == 'GET' else None
+        if hedge_after is None:
+            return self._timed_request(session, method, url, endpoint, **kwargs)
+
+        with self._latencies_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=2 * max(self.pool_maxsize, self.max_workers))
+            executor = self._hedge_executor
+
+        timed_request = self._with_deadline(self._timed_request)
+        requests_in_flight = { executor.submit(timed_request, session, method, url, endpoint, **kwargs) }
+
+        done, pending = wait(requests_in_flight, timeout=hedge_after)
+        if not done:
+            with self._latencies_lock:
+                self.hedged_requests += 1
+            requests_in_flight.add(executor.submit(timed_request, session, method, url, endpoint, **kwargs))
+
+        # use the first response, or the first error if both requests fail
+        error = None
+        while requests_in_flight:
+            done, requests_in_flight = wait(requests_in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = error or future.exception()
+
+        raise error
+
+
+    def _timed_request(self, session, method, url, endpoint, **kwargs):
+        """Send a request once within the timeout and deadline, recording its latency
+
+        :return: the response
+        :rtype: Response
+
+        :exception DeadlineExceeded: raised without sending the request if the deadline is reached, waiting
+                                     for the scheduler included
+        """
+        timeout = self.timeout
+        deadline = getattr(self._local, 'deadline', None)
+
+        with self.scheduler.slot(None if deadline is None else max(0.0, deadline - time.monotonic())):
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded(f'deadline exceeded before {endpoint}')
+                if timeout is None:
+                    timeout = remaining
+                elif isinstance(timeout, tuple):
+                    timeout = tuple(min(part, remaining) for part in timeout)
+                else:
+                    timeout = min(timeout, remaining)
+
+            started_at = time.monotonic()
+            response = session.request(method, url, timeout=timeout, **kwargs)
+
+        with self._latencies_lock:
+            self._latencies.setdefault(endpoint, deque(maxlen=200)).append(time.monotonic() - started_at)
+
+        return response
+
+
+    def _latency_percentile(self, endpoint, percentile):
+        """Get a percentile of the latencies of the last requests to an endpoint
+
+        :return: the latency in seconds, None before 20 requests have been observed
+        :rtype: float
+        """
+        with self._latencies_lock:
+            latencies = sorted(self._latencies.get(endpoint, ()))
+
+        if len(latencies) < 20:
+            return None
+
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile))]
+
+
+    def _with_deadline(self, function):
+        """Wrap a function run by another thread so its requests keep the deadline of the current thread
+
+        :param function: the function
+        :type function: function
+
+        :return: the wrapped function
+        :rtype: function
+        """
+        deadline = getattr(self._local, 'deadline', None)
+
+        def call(*args, **kwargs):
+            previous = getattr(self._local, 'deadline', None)
+            self._local.deadline = deadline
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._local.deadline = previous
+
+        return call
+
+
+    @contextmanager
+    def _retrying(self, retries):
+        """Set the number of retries of the requests made by the current thread within the context
+
+        :param retries: number of times a request failing on a transient error is sent again, None to
+                        keep the retries of the client
+        :type retries: int
+        """
+        previous = getattr(self._local, 'retries', None)
+        self._local.retries = previous if retries is None else retries
+        try:
+            yield
+        finally:
+            self._local.retries = previous
+
+
+    def _endpoint(self, method, url):
+        """Get the name of the endpoint of a request, its method and path with the ids and dates replaced
+
+        :param method: the HTTP method
+        :type method: str
+        :param url: complete API URL
+        :type url: str
+
+        :return: the endpoint, e.g. 'PUT /consumer/v1/appointments/{id}/book'
+        :rtype: str
+        """
+        path = urllib.parse.urlparse(url).path
+        segments = ['{id}' if re.fullmatch(r'\d+|[0-9a-fA-F-]{8,}', segment) else segment
+                    for segment in path.split('/')]
+
+        return f'{method} ' + '/'.join(segments)
+
+
+    def _record(self, endpoint, success):
+        """Record the outcome of a request in the circuit breaker, if any
+
+        :return: None
+        """
+        if self.circuit_breaker is not None:
+            if success:
+                self.circuit_breaker.succeeded(endpoint)
+            else:
+                self.circuit_breaker.failed(endpoint)
+
+
+    def _back_off(self, attempt):
+        """Wait before sending a failed request again, a random delay of up to backoff * 2 ** attempt seconds
+
+        :param attempt: the number of times the request has been sent again
+        :type attempt: int
+
+        :return: the number of the next attempt
+        :rtype: int
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            raise DeadlineExceeded('deadline exceeded while backing off')
+
+        time.sleep(delay)
+
+        return attempt + 1
+
+
+    def _retry_after(self, response, attempt):
+        """Get the number of seconds to wait before sending a throttled request again
+
+        :param response: the response with a 429 status
+        :type response: Response
+        :param attempt: the number of times the request has been sent again
+        :type attempt: int
+
+        :return: the Retry-After delay of the response, or an exponential backoff without one
+        :rtype: float
+        """
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+            try:
+                return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+        return min(60.0, 2 ** attempt)
+
+
+    def _post_setup_data(self, url, data):
+        """Perform a POST request on the given URL
+
+        :param url: complete API URL
+        :type: str
+        :param data: a dictionary of data to post to the API.  the data is submitted as JSON
+        :type: dict
+
+        :return: API response formatted as a data dictionary
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        self._set_setup_session()  # verify the session is setup
+
+        return self._send(self.admin_session, 'POST', url, json=data)
+
+
+    def _update_setup_data(self, url, data):
+        """Perform a PUT request on the given URL
+
+        :param url: complete API URL
+        :param data: a dictionary of data to send to the update (PUT/PATCH) endpoint.  the data is submitted as JSON
+
+        :return: API response formatted as a data dictionary
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        self._set_setup_session()  # verify the session is setup
+
+        return self._send(self.admin_session, 'PUT', url, json=data)
+
+
+    def _delete_setup_data(self, url):
+        """Perform a PUT request on the given URL
+
+        :param url: complete API URL
+        :param data: a dictionary of data to send to the update (PUT/PATCH) endpoint.  the data is submitted as JSON
+
+        :return: API response formatted as a data dictionary
+
+        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
+        :exception Timeout: raised if the request times out
+        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        """
+        self._set_setup_session()
+
+        return self._send(self.admin_session, 'DELETE', url)
+
+
+    def _renew_tokens(self, margin, retry_interval):
+        """Keep renewing the tokens margin seconds before they expire until the renewer is stopped
+
+        :param margin: number of seconds before expires_at at which the tokens are renewed
+        :type margin: int
+        :param retry_interval: number of seconds to wait before retrying a failed renewal
+        :type retry_interval: int
+
+        :return: None
+        """
+        while not self._renewer_stop.is_set():
+            try:
+                self._set_session(margin=margin)
+                self._set_setup_session(margin=margin)
+
+                unix_timestamp = datetime.now(timezone.utc).timestamp()
+                expires_at = min(self.session.token['expires_at'], self.admin_session.token['expires_at'])
+                wait = max(expires_at - margin - unix_timestamp, 1)
+            except Exception:
+                # the API calls renew expired tokens themselves, so just try again later
+                wait = retry_interval
+
+            self._renewer_stop.wait(wait)
+
+
+    def _set_session(self, margin=0):
+        """Setup session and token objects by querying the OAuth server
+
+        Once created, the session is kept for the lifetime of the client and only its token is
+        renewed, so the pooled keep-alive connections survive token refreshes.
+
+        :param margin: renew the token if it expires within margin seconds
+        :type margin: int
+
+        :return: None
+        """
+        # check if the token is already set up and
+        # if the access token is valid
+        if self._token_is_valid(self.session, margin):
+            return
+
+        with self._token_locks[self.scope]:
+            # another thread may have renewed the token while this one was waiting
+            if self._token_is_valid(self.session, margin):
+                return
+
+            # the first token of a session is not a refresh
+            counter = None if self.session is None else 'consumer'
+            if self.session is None:
+                self.session = self._new_session(self.scope)
+
+            self._fetch_token(self.session, self.scope, margin, counter)
+
+
+    def _set_setup_session(self, margin=0):
+        """Setup admin session and token objects for accessing the OnSchedule Setup API
+
+        Once created, the session is kept for the lifetime of the client and only its token is
+        renewed, so the pooled keep-alive connections survive token refreshes.
+
+        :param margin: renew the token if it expires within margin seconds
+        :type margin: int
+
+        :return: None
+        """
+        # check if the token is already set up and
+        # if the access token is valid
+        if self._token_is_valid(self.admin_session, margin):
+            return
+
+        with self._token_locks[self.setup_scope]:
+            # another thread may have renewed the token while this one was waiting
+            if self._token_is_valid(self.admin_session, margin):
+                return
+
+            # the first token of a session is not a refresh
+            counter = None if self.admin_session is None else 'setup'
+            if self.admin_session is None:
+                self.admin_session = self._new_session(self.setup_scope)
+
+            self._fetch_token(self.admin_session, self.setup_scope, margin, counter)
+
+
+    def _new_session(self, scope):
+        """Create a session for the scope with a connection pool sized by pool_connections and pool_maxsize
+
+        :param scope: the scope of the session
+        :type scope: str
+
+        :return: a new session without a token
+        :rtype: OAuth2Session
+        """
+        client = BackendApplicationClient(client_id=self.client_id, scope=scope)
+        session = OAuth2Session(client=client)
+
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount('https://', adapter)
+
+        return session
+
+
+    def _fetch_token(self, session, scope, margin=0, counter=None):
+        """Set a token on the session, querying the OAuth server only when neither the other session
+        nor the token store holds a valid token for the same scope
+
+        :param session: the session that needs a token
+        :type session: OAuth2Session
+        :param scope: the scope of the session
+        :type scope: str
+        :param margin: only reuse a token that is still valid for margin seconds
+        :type margin: int
+        :param counter: key of token_refreshes counting the tokens requested from the OAuth server for the session
+        :type counter: str
+
+        :return: None
+        """
+        for other_session, other_scope in ((self.session, self.scope), (self.admin_session, self.setup_scope)):
+            if other_session is not session and other_scope == scope and self._token_is_valid(other_session, margin):
+                session.token = other_session.token
+                return
+
+        if self.token_store is None:
+            session.token = self._request_token(scope, counter)
+            return
+
+        key = self.token_store.key(client_id=self.client_id, scope=scope, token_url=self.token_url)
+
+        token = self.token_store.get(key)
+        if not self._valid_token(token, margin):
+            # only one process requests the token, the others wait and read it from the store
+            with self.token_store.lock(key):
+                token = self.token_store.get(key)
+                if not self._valid_token(token, margin):
+                    token = self._request_token(scope, counter)
+                    self.token_store.set(key, token)
+
+        session.token = token
+
+
+    def _request_token(self, scope, counter=None):
+        """Request a new token for the scope from the OAuth server
+
+        :param scope: the scope of the token
+        :type scope: str
+        :param counter: key of token_refreshes to increment once the token is received
+        :type counter: str
+
+        :return: the new token
+        :rtype: dict
+        """
+        # the token is requested through a separate session, as OAuth2Session refuses to send
+        # any request, the token request included, while it holds an expired token
+        client = BackendApplicationClient(client_id=self.client_id, scope=scope)
+        token_session = OAuth2Session(client=client)
+
+        token = token_session.fetch_token(token_url=self.token_url,
+                                          client_id=self.client_id,
+                                          client_secret=self.client_secret)
+
+        # the caller holds the token lock of the scope
+        if counter is not None:
+            self.token_refreshes[counter] += 1
+
+        return token
+
+
+    def _token_is_valid(self, session, margin=0):
+        """Check whether the session has a token that does not expire within margin seconds
+
+        :param session: the session to check
+        :type session: OAuth2Session
+        :param margin: number of seconds the token must remain valid
+        :type margin: int
+
+        :return: True if the session token can be used
+        :rtype: bool
+        """
+        return bool(session) and self._valid_token(session.token, margin)
+
+
+    def _valid_token(self, token, margin=0):
+        """Check whether the token exists and does not expire within margin seconds
+
+        :param token: the token to check
+        :type token: dict
+        :param margin: number of seconds the token must remain valid
+        :type margin: int
+
+        :return: True if the token can be used
+        :rtype: bool
+        """
+        current_time = datetime.now(timezone.utc)
+        unix_timestamp = current_time.timestamp()
+
+        return bool(token) and token['expires_at'] - margin > unix_timestamp
+
+
+class TokenStore:
+    """Base class of the stores sharing OAuth tokens between the processes of a host
+
+    A store keeps one token per key.  Clients read the token with get, and only request a new one
+    from the OAuth server while holding lock, saving it with set before releasing the lock.
+
+    The files of the stores are private to the user: they are created in a 0700 directory and files
+    owned by other users are never trusted.
+    """
+    # directory of the lock files, defaults to a private directory of the user, see private_directory()
+    lock_dir = None
+
+    def key(self, client_id, scope, token_url):
+        """Build the key of the token for a client id, scope and token server
+
+        :param client_id: client id provided by OnSched
+        :type client_id: str
+        :param scope: the scope of the token
+        :type scope: str
+        :param token_url: the URL of the OAuth token endpoint
+        :type token_url: str
+
+        :return: the key of the token
+        :rtype: str
         """
-        create_resource_url = f'{self.setup_api}/resources'
+        return hashlib.sha256(f'{client_id}\n{scope}\n{token_url}'.encode('utf-8')).hexdigest()
 
-        payload = { 'name': name }
 
-        payload.update(self._get_resources_data(email=email,
-                                                description=description,
-                                                location_id=location_id,
-                                                group_id=group_id,
-                                                timezone_id=timezone_id,
-                                                addressline1=addressline1,
-                                                addressline2=addressline2,
-                                                city=city,
-                                                state=state,
-                                                country=country,
-                                                postal_code=postal_code,
-                                                contact_preferred_phone_type=contact_preferred_phone_type,
-                                                contact_home_phone=contact_home_phone,
-                                                contact_mobile_phone=contact_mobile_phone,
-                                                contact_business_phone=contact_business_phone,
-                                                contact_business_phone_ext=contact_business_phone_ext,
-                                                contact_skype_username=contact_skype_username,
-                                                effective_date=effective_date,
-                                                notification_type=notification_type,
-                                                display_color=display_color,
-                                                google_calendar_id=google_calendar_id,
-                                                outlook_calendar_id=outlook_calendar_id,
-                                                ignore_business_hours=ignore_business_hours,
-                                                gender=gender,
-                                                hourly=hourly,
-                                                calendar_availability=calendar_availability,
-                                                sort_key=sort_key,
-                                                bio_link=bio_link)
-                       )
+    def get(self, key):
+        """Get the stored token
 
-        return self._post_setup_data(url=create_resource_url, data=payload)
+        :param key: the key built by key()
+        :type key: str
 
+        :return: the token, or None if no token is stored
+        :rtype: dict
+        """
+        raise NotImplementedError
 
-    def update_resource(self,
-                        resource_id,
-                        name='',
-                        email='',
-                        description='',
-                        location_id='',
-                        group_id='',
-                        timezone_id='',
-                        addressline1='',
-                        addressline2='',
-                        city='',
-                        state='',
-                        country='',
-                        postal_code='',
-                        contact_preferred_phone_type='',
-                        contact_home_phone='',
-                        contact_mobile_phone='',
-                        contact_business_phone='',
-                        contact_business_phone_ext='',
-                        contact_skype_username='',
-                        effective_date=None,
-                        notification_type=0,
-                        display_color='',
-                        google_calendar_id='',
-                        outlook_calendar_id='',
-                        ignore_business_hours=False,
-                        gender='',
-                        hourly=0,
-                        calendar_availability=0,
-                        sort_key=0,
-                        bio_link=''):
-        """Update a resource
 
-        :param resource_id: the resource id to be updated
-        :type resource_id: str
-        :param name: the resource name
-        :type name: str
-        :param location_id: the location id for the resource
-        :type location_id: str
-        :param email: an email address for the resource
-        :type email: str
-        :param description: a description of the resource
-        :type description: str
-        :param group_id: the resource group id
-        :type group_id: str
-        :param timezone_id: the timezone id for the resource. defaults to the business timezone if empty
-        :type timezone_id: str
-        :param addressline1: the address of the resource
-        :type addressline1: str
-        :param addressline2: the address of the resource
-        :type addressline2: str
-        :param city: the city of the resource
-        :type city: str
-        :param state: the state/province of the resource
-        :type state: str
-        :param country: the country of the resource
-        :type country: str
-        :param postal_code: the postal code for the resource
-        :type postal_code: str
-        :param contact_preferred_phone_type: type of contact preferred (mobile|business|home|skype)
-        :type contact_preferred_phone_type: str
-        :param contact_home_phone: the resource's home phone number
-        :type contact_home_phone: str
-        :param contact_mobile_phone: the resource's mobile phone number
-        :type contact_mobile_phone: str
-        :param contact_business_phone: the resource's business phone number
-        :type contact_business_phone: str
-        :param contact_business_phone_ext: the resource's business phone extension
-        :type contact_business_phone_ext: str
-        :param contact_skype_username: the resource's skype username
-        :type contact_skype_username: str
-        :param effective_date: the datetime that this resource will become available in the system
-        :type effective_date: datetime
-        :param notification_type: the notification type (0: default, 1: email, 2: SMS, 3: email + SMS)
-        :type notification_type: int
-        :param display_color: the color for the resource, which will control the calendar color in the portal
-        :type display_color: str
-        :param google_calendar_id: the resource's google calendar
-        :type google_calendar_id: str
-        :param outlook_calendar_id: the resource's outlook calendar
-        :type outlook_calendar_id: str
-        :param ignore_business_hours: is the resource available outside normal business hours?
-        :type ignore_business_hours: bool
-        :param gender: the resource gender (for people)
-        :type gender: str
-        :param hourly: hourly pay rate for the resource
-        :type hourly: int
-        :param calendar_availability: which calendar system the resources uses
-                                      (0: OnSched Cal, 1: Google Cal, 2: Outlook Cal)
-        :type calendar_availability: int
-        :param sort_key: a numeric value that can be used for sorting the resources list
-        :type sort_key: int
-        :param bio_link: a URL for additional resource information
-        :type bio_link: str
+    def set(self, key, token):
+        """Store a token.  Must be called while holding lock(key)
 
-        :return: A resource object dictionary
-        :rtype: dict
+        :param key: the key built by key()
+        :type key: str
+        :param token: the token to store
+        :type token: dict
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
-        :exception TypeError: raised if datetime inputs are in incorrect format
+        :return: None
         """
-        update_resource_url = f'{self.setup_api}/resources/{resource_id}'
+        raise NotImplementedError
 
-        payload = {}
 
-        if name:
-            payload['name'] = name
+    @contextmanager
+    def lock(self, key):
+        """Hold an exclusive lock on the token, shared by all the processes of the host
 
-        payload.update(self._get_resources_data(email=email,
-                                                description=description,
-                                                location_id=location_id,
-                                                group_id=group_id,
-                                                timezone_id=timezone_id,
-                                                addressline1=addressline1,
-                                                addressline2=addressline2,
-                                                city=city,
-                                                state=state,
-                                                country=country,
-                                                postal_code=postal_code,
-                                                contact_preferred_phone_type=contact_preferred_phone_type,
-                                                contact_home_phone=contact_home_phone,
-                                                contact_mobile_phone=contact_mobile_phone,
-                                                contact_business_phone=contact_business_phone,
-                                                contact_business_phone_ext=contact_business_phone_ext,
-                                                contact_skype_username=contact_skype_username,
-                                                effective_date=effective_date,
-                                                notification_type=notification_type,
-                                                display_color=display_color,
-                                                google_calendar_id=google_calendar_id,
-                                                outlook_calendar_id=outlook_calendar_id,
-                                                ignore_business_hours=ignore_business_hours,
-                                                gender=gender,
-                                                hourly=hourly,
-                                                calendar_availability=calendar_availability,
-                                                sort_key=sort_key,
-                                                bio_link=bio_link)
-                       )
+        :param key: the key built by key()
+        :type key: str
+        """
+        # fcntl is only available on Unix, so it is only imported when a store is used
+        import fcntl
 
-        return self._update_setup_data(url=update_resource_url, data=payload)
+        lock_dir = self.lock_dir or self.private_directory()
+        lock_fd = os.open(os.path.join(lock_dir, f'onsched-{key}.lock'),
+                          os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
 
+        with os.fdopen(lock_fd, 'r+') as lock_file:
+            self._check_owner(os.fstat(lock_fd), lock_file.name)
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
-    def delete_resource(self, resource_id):
-        """Delete a resource
 
-        :param resource_id: the id of the resource to be deleted
-        :type resource_id: str
-        :return: the resource object that has been deleted
-        :rtype: dict
+    @staticmethod
+    def private_directory(directory=None):
+        """Get a directory only the current user can access, creating it if needed
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :param directory: the directory. Defaults to onsched-<uid> in the temporary directory
+        :type directory: str
+
+        :return: the path of the directory
+        :rtype: str
+
+        :exception PermissionError: raised if the directory is a symbolic link, belongs to another user
+                                    or can be accessed by other users
         """
-        delete_resource_url = f'{self.setup_api}/resources/{resource_id}'
+        directory = directory or os.path.join(tempfile.gettempdir(), f'onsched-{os.getuid()}')
 
-        return self._delete_setup_data(url=delete_resource_url)
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
 
+        status = os.lstat(directory)
+        if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o077:
+            raise PermissionError(f'{directory} must be a directory private to the current user')
 
-    def create_service(self,
-                       name,
-                       description,
-                       duration,
-                       location_id='',
-                       service_group_id='',
-                       public=False,
-                       default_service=False,
-                       duration_select=False,
-                       duration_interval=0,
-                       duration_min=0,
-                       duration_max=0,
-                       padding=0,
-                       consumer_padding=False,
-                       fee_amount=0,
-                       fee_taxable=False,
-                       cancellation_fee_amount=0,
-                       cancellation_fee_taxable=False,
-                       nonrefundable=False):
-        """Create a new service
+        return directory
 
-        :param name: the name of the service
+
+    #####################
+    # Private methods
+    #####################
+    def _check_owner(self, status, name):
+        """Check that a file or shared memory block belongs to the current user and no other user can write it
+
+        :param status: the status of the file, as returned by os.stat
+        :type status: os.stat_result
+        :param name: the name of the file, for the error message
         :type name: str
-        :param description: a description of the service
-        :type description: str
-        :param duration: the default duration of the service
-        :type duration: int
-        :param location_id: the location id for the service
-        :type location_id: str
-        :param service_group_id: the service group id for the service
-        :type service_group_id: str
-        :param public: is this service available for booking?
-        :type public: bool
-        :param default_service: is this the default service?
-        :type default_service: bool
-        :param duration_select: is the duration selectable?
-        :type duration_select: bool
-        :param duration_interval: if duration is selectable, set time intervals
-        :type duration_interval: int
-        :param duration_min: minimum duration for selectable durations
-        :type duration_min: int
-        :param duration_max: maximum duration for selectable durations
-        :type duration_max: int
-        :param padding: padding between bookings in minutes
-        :type padding: int
-        :param consumer_padding: can the customer add padding?
-        :type consumer_padding: bool
-        :param fee_amount: cost of the service
-        :type fee_amount: int
-        :param fee_taxable: is this fee taxable
-        :type fee_taxable: bool
-        :param cancellation_fee_amount: cost of cancellation
-        :type cancellation_fee_amount: int
-        :param cancellation_fee_taxable: is the cancellation fee taxable?
-        :type cancellation_fee_taxable: bool
-        :param nonrefundable: is the service cost refundable
-        :type nonrefundable: bool
 
-        :return: a new service object
-        :rtype: dict
+        :exception PermissionError: raised if the file can't be trusted
+        """
+        if status.st_uid != os.getuid() or status.st_mode & 0o022:
+            raise PermissionError(f'{name} belongs to another user or can be written by other users')
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+
+class FileTokenStore(TokenStore):
+    """Token store keeping each token in a JSON file of a directory"""
+    def __init__(self, directory=None):
+        """Creates a FileTokenStore instance.
+
+        :param directory: the directory of the token and lock files, created private to the user if missing.
+                          Defaults to the onsched-<uid> directory of the temporary directory
+        :type directory: str
+
+        :exception PermissionError: raised if the default directory is not private to the current user
         """
-        service_url = f'{self.setup_api}/services'
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            self.directory = directory
+        else:
+            self.directory = self.private_directory()
+        self.lock_dir = self.directory
 
-        # if any of the option items are set, build the option dictionary
-        options={}
-        if default_service or duration_select or duration_interval \
-            or duration_min or duration_max or padding or consumer_padding:
-            options['durationInterval'] = duration_interval
-            options['durationMin'] = duration_min
-            options['durationMax'] = duration_max
-            options['padding'] = padding
-            options['durationSelect'] = 'true' if duration_select else 'false'
-            options['durationService'] = 'true' if default_service else 'false'
-            options['consumerPadding'] = 'true' if consumer_padding else 'false'
 
-        # if any of the fee items are set, build the fee dictionary
-        fee = {}
-        if fee_amount or fee_taxable or cancellation_fee_amount or cancellation_fee_taxable or nonrefundable:
-            fee['feeAmount'] = fee_amount
-            fee['cancellationFeeAmount'] = cancellation_fee_amount
-            fee['feeTaxable'] = 'true' if fee_taxable else 'false'
-            fee['cancellationFeeTaxable'] = 'true' if cancellation_fee_taxable else 'false'
-            fee['nonRefundable'] = 'true' if nonrefundable else 'false'
+    def get(self, key):
+        try:
+            token_fd = os.open(self._path(key), os.O_RDONLY | os.O_NOFOLLOW)
+        except OSError:
+            return None
 
-        payload = { 'name': name, 'description': description }
+        with os.fdopen(token_fd) as token_file:
+            # a token written by another user could be injected, ignore it
+            try:
+                self._check_owner(os.fstat(token_fd), token_file.name)
+                return json.load(token_file)
+            except (PermissionError, ValueError):
+                return None
 
-        if location_id:
-            payload['locationId'] = location_id
-        if duration:
-            payload['duration'] = duration
-        if service_group_id:
-            payload['serviceGroupId'] = service_group_id
-        if public:
-            payload['public'] = 'true'
-        if options:
-            payload['options'] = options
-        if fee:
-            payload['fee']
 
-        return self._post_data(service_url, payload)
+    def set(self, key, token):
+        # write to a new temporary file first, so readers never see a partially written token.
+        # O_EXCL and O_NOFOLLOW refuse a file or symbolic link planted at the temporary path
+        path = self._path(key)
+        temporary_path = f'{path}.{uuid.uuid4().hex}.tmp'
 
+        token_fd = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+        try:
+            with os.fdopen(token_fd, 'w') as token_file:
+                json.dump(token, token_file)
 
-    def delete_service(self, service_id):
-        """Delete a service
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
 
-        :param service_id: the id of the service to be deleted
-        :type service_id: str
 
-        :return: the service object that has been deleted
-        :rtype: dict
+    def _path(self, key):
+        """Get the path of the token file of the key
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :param key: the key built by key()
+        :type key: str
+
+        :return: the path of the token file
+        :rtype: str
         """
-        delete_service_url = f'{self.setup_api}/services/{service_id}'
+        return os.path.join(self.directory, f'onsched-{key}.json')
 
-        return self._delete_setup_data(url=delete_service_url)
 
+class SharedMemoryTokenStore(TokenStore):
+    """Token store keeping each token in a named shared memory block
 
-    def service_allocations(self, service_id, start_date=None, end_date=None, location_id=''):
-        """Get the service allocations for a given service
+    The block starts with a version number, odd while the token is being written, and the length
+    of the token, so get never needs to take the lock.  The blocks outlive the processes and are
+    reused by the next processes using the same key.
 
-        :param service_id: the service id for the event.  Passing a '0' in for service_id
-                           will return allocations for all services
-        :param start_date: date object for starting date of search
-        :type start_date: date
-        :param end_date: date object for ending date of search
-        :type end_date: date
-        :param location_id: filter results by location id
-        :type location_id: str
+    Each block gets a random name, saved in a file next to the lock file of its key, so no other user
+    can create the block before the store does.
+    """
+    HEADER = struct.Struct('QI')
+    READ_ATTEMPTS = 10000
+    # directory where Linux exposes the shared memory blocks as files, to check the owner of the blocks
+    SHARED_MEMORY_DIRECTORY = '/dev/shm'
 
-        :return: service allocations data dictionary
-        :rtype: dict
+    def __init__(self, size=4096, lock_dir=None):
+        """Creates a SharedMemoryTokenStore instance.
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
-        :exception TypeError: raised if datetime inputs are in incorrect format
+        :param size: size in bytes of the shared memory block of each token
+        :type size: int
+        :param lock_dir: the directory of the lock files. Defaults to a private directory of the user
+        :type lock_dir: str
         """
-        service_allocations_url = f'{self.consumer_api}/services/{service_id}/allocations?'
+        self.size = size
+        self.lock_dir = lock_dir
+        self._blocks = {}
 
-        params_map = {}
-        if location_id:
-            params_map['locationId'] = location_id
-        if start_date:
-            if type(start_date) is date or type(start_date) is datetime:
-                params_map['startDate']= start_date.isoformat()
-            elif type(start_date) is str:
-                params_map['startDate']= start_date
-            else:
-                raise TypeError
-        if end_date:
-            if type(end_date) is date or type(end_date) is datetime:
-                params_map['endDate']= end_date.isoformat()
-            elif type(end_date) is str:
-                params_map['endDate']= end_date
-            else:
-                raise TypeError
 
-        params = urllib.parse.urlencode(params_map)
+    def get(self, key):
+        block = self._block(key)
 
-        service_allocations_url += params
+        # retry while the token is being written.  if the writer died mid-write, report no token,
+        # so the token is requested and written again under the lock
+        for _ in range(self.READ_ATTEMPTS):
+            version, length = self.HEADER.unpack_from(block.buf)
+            if version % 2:
+                continue
 
-        return self._fetch_setup_data(url=service_allocations_url)
+            data = bytes(block.buf[self.HEADER.size:self.HEADER.size + length])
 
+            if self.HEADER.unpack_from(block.buf)[0] == version:
+                return json.loads(data) if length else None
 
-    def service_allocation(self, service_allocation_id):
-        """Get a single service allocation
+        return None
 
-        :param service_allocation_id: the id of the service allocation
-        :type service_allocation_id: str
 
-        :return: single service allocation data
-        :rtype: dict
+    def set(self, key, token):
+        block = self._block(key)
+        data = json.dumps(token).encode('utf-8')
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
-        """
-        service_allocation_url = f'{self.consumer_api}/services/allocations/{service_allocation_id}?'
+        if self.HEADER.size + len(data) > self.size:
+            raise ValueError(f'token of {len(data)} bytes does not fit a {self.size} bytes block')
 
-        return self._fetch_data(url=service_allocation_url)
+        # round an odd version left by an interrupted write up to the next even version
+        version = self.HEADER.unpack_from(block.buf)[0]
+        version += version % 2
 
+        self.HEADER.pack_into(block.buf, 0, version + 1, 0)
+        block.buf[self.HEADER.size:self.HEADER.size + len(data)] = data
+        self.HEADER.pack_into(block.buf, 0, version + 2, len(data))
 
-    def create_service_allocation(self,
-                                  service_id,
-                                  start_date,
-                                  end_date,
-                                  start_time,
-                                  end_time,
-                                  location_id='',
-                                  resource_id='',
-                                  reason='',
-                                  all_day=False):
-        """Create a new service allocation
 
-        :param service_id: the service id for this allocation
-        :type service_id: str
-        :param start_date: the starting date of the event
-        :type start_date: date
-        :param end_date: The ending date of the event
-        :type end_date: date
-        :param start_time: start time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm. You will
-                           only see availability within the boundary of your business start and end times.
-                           Defaults to Business Hours Start.
-        :type start_time: int
-        :param end_time: end time specified as military times e.g. 800 = 8:00am, 2230 = 10:30pm. You will
-                         only see availability within the boundary of your business start and end times.
-                         Defaults to Business Hours Start.
-        :param location_id: the location id for the event
-        :type location_id: str
-        :param resource_id: the resource id associated with the service allocation
-        :type resource_id: str
-        :type end_time: int
-        :param reason: The purpose of the event
-        :type reason: str
-        :param all_day: is event an all day event?
-        :type all_day: bool
+    def _block(self, key):
+        """Attach to the shared memory block of the key, creating it if needed
 
-        :return: a serviceAllocation object containing the data of the new allocation
-        :rtype: dict
+        :param key: the key built by key()
+        :type key: str
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
-        :exception TypeError: raised if datetime inputs are in incorrect format
+        :return: the shared memory block
+        :rtype: SharedMemory
         """
-        create_service_allocation_url = f'{self.setup_api}/services/{service_id}/allocations'
+        if key in self._blocks:
+            return self._blocks[key]
 
-        payload = {}
+        from multiprocessing import resource_tracker, shared_memory
 
-        if type(start_date) is date:
-            payload['startDate'] = start_date.isoformat()
-        elif type(start_date) is str:
-            payload['startDate'] = start_date
-        else:
-            raise TypeError
+        with self.lock(key):
+            name = self._read_name(key)
 
-        if type(end_date) is date:
-            payload['endDate'] = end_date.isoformat()
-        elif type(end_date) is str:
-            payload['endDate'] = end_date
-        else:
-            raise TypeError
+            try:
+                block = shared_memory.SharedMemory(name=name) if name else None
+            except FileNotFoundError:
+                # the block was removed, e.g. by a reboot
+                block = None
 
-        if location_id:
-            payload['locationId'] = location_id
-        if resource_id:
-            payload['resourceId'] = resource_id
-        if start_time:
-            payload['startTime'] = start_time
-        if end_time:
-            payload['endTime'] = end_time
-        if reason:
-            payload['reason'] = reason
-        if all_day:
-            payload['allDay'] = 'true'
+            if block is None:
+                # a new block is zero filled, i.e. version 0 without a token.  its random name keeps
+                # it short enough for the platforms limiting the names to 31 characters
+                block = shared_memory.SharedMemory(name=f'onsched-{uuid.uuid4().hex[:16]}', create=True, size=self.size)
+                self._write_name(key, block.name)
+            else:
+                # a block created by another user under the saved name could inject a token, refuse it
+                try:
+                    self._check_block_owner(block)
+                except PermissionError:
+                    block.close()
+                    raise
 
-        return self._post_setup_data(url=create_service_allocation_url, data=payload)
+        # keep the block when this process exits, it is shared with the other processes.
+        # the tracker knows the block by its name with the leading slash of POSIX shared memory
+        resource_tracker.unregister(f'/{block.name}', 'shared_memory')
 
+        self._blocks[key] = block
 
-    #####################
-    # Private methods
-    #####################
-    def _get_resources_data(self,
-                            email='',
-                            description='',
-                            location_id='',
-                            group_id='',
-                            timezone_id='',
-                            addressline1='',
-                            addressline2='',
-                            city='',
-                            state='',
-                            country='',
-                            postal_code='',
-                            contact_preferred_phone_type='',
-                            contact_home_phone='',
-                            contact_mobile_phone='',
-                            contact_business_phone='',
-                            contact_business_phone_ext='',
-                            contact_skype_username='',
-                            effective_date=None,
-                            notification_type=0,
-                            display_color='',
-                            google_calendar_id='',
-                            outlook_calendar_id='',
-                            ignore_business_hours=False,
-                            gender='',
-                            hourly=0,
-                            calendar_availability=0,
-                            sort_key=0,
-                            bio_link=''):
-        """Gather resource data into a dictionary
+        return block
 
-        :param name: the resource name
-        :type name: str
-        :param location_id: the location id for the resource
-        :type location_id: str
-        :param email: an email address for the resource
-        :type email: str
-        :param description: a description of the resource
-        :type description: str
-        :param group_id: the resource group id
-        :type group_id: str
-        :param timezone_id: the timezone id for the resource. defaults to the business timezone if empty
-        :type timezone_id: str
-        :param addressline1: the address of the resource
-        :type addressline1: str
-        :param addressline2: the address of the resource
-        :type addressline2: str
-        :param city: the city of the resource
-        :type city: str
-        :param state: the state/province of the resource
-        :type state: str
-        :param country: the country of the resource
-        :type country: str
-        :param postal_code: the postal code for the resource
-        :type postal_code: str
-        :param contact_preferred_phone_type: type of contact preferred (mobile|business|home|skype)
-        :type contact_preferred_phone_type: str
-        :param contact_home_phone: the resource's home phone number
-        :type contact_home_phone: str
-        :param contact_mobile_phone: the resource's mobile phone number
-        :type contact_mobile_phone: str
-        :param contact_business_phone: the resource's business phone number
-        :type contact_business_phone: str
-        :param contact_business_phone_ext: the resource's business phone extension
-        :type contact_business_phone_ext: str
-        :param contact_skype_username: the resource's skype username
-        :type contact_skype_username: str
-        :param effective_date: the datetime that this resource will become available in the system
-        :type effective_date: datetime
-        :param notification_type: the notification type (0: default, 1: email, 2: SMS, 3: email + SMS)
-        :type notification_type: int
-        :param display_color: the color for the resource, which will control the calendar color in the portal
-        :type display_color: str
-        :param google_calendar_id: the resource's google calendar
-        :type google_calendar_id: str
-        :param outlook_calendar_id: the resource's outlook calendar
-        :type outlook_calendar_id: str
-        :param ignore_business_hours: is the resource available outside normal business hours?
-        :type ignore_business_hours: bool
-        :param gender: the resource gender (for people)
-        :type gender: str
-        :param hourly: hourly pay rate for the resource
-        :type hourly: int
-        :param calendar_availability: which calendar system the resources uses
-                                      (0: OnSched Cal, 1: Google Cal, 2: Outlook Cal)
-        :type calendar_availability: int
-        :param sort_key: a numeric value that can be used for sorting the resources list
-        :type sort_key: int
-        :param bio_link: a URL for additional resource information
-        :type bio_link: str
 
-        :return: A resource object dictionary
-        :rtype: dict
+    def _check_block_owner(self, block):
+        """Check that a shared memory block belongs to the current user, on the platforms exposing the blocks as files
+
+        :param block: the shared memory block
+        :type block: SharedMemory
+
+        :exception PermissionError: raised if the block can't be trusted
+        """
+        path = os.path.join(self.SHARED_MEMORY_DIRECTORY, block.name)
+
+        try:
+            status = os.stat(path)
+        except FileNotFoundError:
+            return
+
+        self._check_owner(status, path)
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
-        :exception TypeError: raised if datetime inputs are in incorrect format
-        """
-        payload = {}
 
-        if email:
-            payload['email'] = email
-        if description:
-            payload['description'] = description
-        if location_id:
-            payload['locationId'] = location_id
-        if group_id:
-            payload['groupId'] = group_id
-        if timezone_id:
-            payload['timezoneId'] = timezone_id
-        # set the address if submitted
-        address = {}
-        if addressline1 or addressline2 or city or state or postal_code or country:
-            address['addressline1'] = addressline1
-            address['addressline2'] = addressline2
-            address['city'] = city
-            address['state'] = state
-            address['postalCode'] = postal_code
-            address['country'] = country
+    def _read_name(self, key):
+        """Read the name of the shared memory block of the key.  Must be called while holding lock(key)
 
-        # set the contact information if present
-        contact = {}
-        if contact_preferred_phone_type or contact_home_phone \
-                or contact_mobile_phone or contact_business_phone \
-                or contact_business_phone_ext or contact_skype_username:
+        :param key: the key built by key()
+        :type key: str
 
-            contact['PreferredPhoneType'] = contact_preferred_phone_type
+        :return: the name of the block, or None if no block was created for the key
+        :rtype: str
+        """
+        try:
+            name_fd = os.open(self._name_path(key), os.O_RDONLY | os.O_NOFOLLOW)
+        except OSError:
+            return None
 
-            if contact_home_phone:
-                contact['homePhone'] = contact_home_phone
-            if contact_mobile_phone:
-                contact['mobilePhone'] = contact_mobile_phone
-            if contact_business_phone:
-                contact['businessPhone'] = contact_business_phone
-            if contact_business_phone_ext:
-                contact['businessPhoneExt'] = contact_business_phone_ext
-            if contact_skype_username:
-                contact['skypeUsername'] = contact_skype_username
+        with os.fdopen(name_fd) as name_file:
+            # a name written by another user could point at its own block
+            self._check_owner(os.fstat(name_fd), name_file.name)
+            return name_file.read().strip() or None
 
-        # set the options that are present
-        options = {}
-        if effective_date or notification_type or display_color \
-                or google_calendar_id or outlook_calendar_id \
-                or ignore_business_hours or gender or hourly \
-                or calendar_availability or sort_key or bio_link:
-            if effective_date:
-                if type(effective_date) is datetime:
-                    options['effectiveDate'] = effective_date.isoformat()
-                elif type(effective_date) is str:
-                    options['effectiveDate'] = effective_date
-                else:
-                    raise TypeError
 
-            if notification_type:
-                options['notificationType'] = notification_type
-            if display_color:
-                options['displayColor'] = display_color
-            if google_calendar_id:
-                options['googleCalendarId'] = google_calendar_id
-            if outlook_calendar_id:
-                options['outlookCalendarId'] = outlook_calendar_id
-            if ignore_business_hours:
-                options['ignoreBusinessHours'] = 'true'
-            if gender:
-                options['gender'] = gender
-            if hourly:
-                options['hourly'] = hourly
-            if calendar_availability:
-                options['calendarAvailability'] = calendar_availability
-            if sort_key:
-                options['sortKey'] = sort_key
-            if bio_link:
-                options['bioLink'] = bio_link
+    def _write_name(self, key, name):
+        """Save the name of the shared memory block of the key.  Must be called while holding lock(key)
 
-        if address:
-            payload['address'] = address
-        if contact:
-            payload['contact'] = contact
-        if options:
-            payload['options'] = options
+        :param key: the key built by key()
+        :type key: str
+        :param name: the name of the block
+        :type name: str
 
-        return payload
+        :return: None
+        """
+        # write to a new temporary file first, so an interrupted write never leaves a truncated name
+        path = self._name_path(key)
+        temporary_path = f'{path}.{uuid.uuid4().hex}.tmp'
 
+        name_fd = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+        try:
+            with os.fdopen(name_fd, 'w') as name_file:
+                name_file.write(name)
 
-    def _fetch_data(self, url):
-        """Perform a GET request on the given URL
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
 
-        :param url: complete API URL
 
-        :return: API response formatted as a data dictionary
+    def _name_path(self, key):
+        """Get the path of the file holding the name of the shared memory block of the key
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :param key: the key built by key()
+        :type key: str
+
+        :return: the path of the file, in the directory of the lock files
+        :rtype: str
         """
-        self._set_session()  # verify the session is setup
+        return os.path.join(self.lock_dir or self.private_directory(), f'onsched-{key}.shm')
+
+
+class ResponseCache:
+    """Thread safe in-memory cache of API responses, with per-endpoint TTLs and LRU eviction
+
+    Responses are keyed by their complete URL.  Once max_entries responses are cached, the least
+    recently used response is evicted.  The generation counts the invalidations, so a response fetched
+    across an invalidation is not cached.
+    """
+    DEFAULT_TTLS = {
+        'locations': 3600,
+        'location': 3600,
+        'services': 600,
+        'service_allocation': 300,
+        'availability': 30,
+    }
+
+    def __init__(self, max_entries=1024, ttl=300, ttls=None):
+        """Creates a ResponseCache instance.
+
+        :param max_entries: maximum number of cached responses
+        :type max_entries: int
+        :param ttl: number of seconds a response is kept when its endpoint has no TTL of its own
+        :type ttl: int
+        :param ttls: number of seconds the responses are kept, by endpoint name. Overrides DEFAULT_TTLS
+        :type ttls: dict
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
 
-        offset = 0
-        has_more = False
-        data = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
 
-        response = self.session.get(url + f'&limit=100&offset={offset}')
-        response.raise_for_status()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
 
-        formatted_response = json.loads(response.text)
 
-        if 'hasMore' in formatted_response:
-            has_more = formatted_response['hasMore']
-        if 'data' in formatted_response:
-            data = formatted_response['data']
+    def get(self, key):
+        """Get a cached response
 
-        # loop over the data until 'hasMore' is False
-        while has_more:
-            offset += 100
-            response = self.session.get(url + f'&limit=100&offset={offset}')
-            response.raise_for_status()
+        :param key: the complete URL of the response
+        :type key: str
 
-            formatted_response = json.loads(response.text)
+        :return: the cached response, or None if it is not cached or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
 
-            data += formatted_response['data']
-            # update has_more
-            has_more = formatted_response['hasMore']
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
 
-        # use the final response
-        result = formatted_response
-        # if data exists, replace data with the accumulated result
-        if data:
-            result['count'] = result['total']
-            result['data'] = data
+            self._entries.move_to_end(key)
+            self.hits += 1
 
-        return result
+            return entry[2]
 
 
-    def _post_data(self, url, data):
-        """Perform a POST request on the given URL
+    def set(self, key, value, endpoint='', info=None, generation=None):
+        """Cache a response
 
-        :param url: complete API URL
-        :type: str
-        :param data: a dictionary of data to post to the API.  the data is submitted as JSON
-        :type: dict
+        The response is not cached if the cache has been invalidated since generation was read.
 
-        :return: API response formatted as a data dictionary
+        :param key: the complete URL of the response
+        :type key: str
+        :param value: the response
+        :param endpoint: the endpoint name, which selects the TTL
+        :type endpoint: str
+        :param info: data describing the response, passed to the match function of invalidate
+        :type info: dict
+        :param generation: the generation read before the response was fetched
+        :type generation: int
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        :return: None
         """
-        self._set_session()  # verify the session is setup
+        expires_at = time.monotonic() + self.ttls.get(endpoint, self.ttl)
 
-        response = self.session.post(url, json=data)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
 
-        response.raise_for_status()
+            self._entries[key] = (expires_at, endpoint, value, info)
+            self._entries.move_to_end(key)
 
-        return json.loads(response.text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
 
 
-    def _update_data(self, url, data):
-        """Perform a PUT request on the given URL
+    def invalidate(self, *endpoints, match=None):
+        """Drop the cached responses of the endpoints
 
-        :param url: complete API URL
-        :param data: a dictionary of data to send to the update (PUT/PATCH) endpoint.  the data is submitted as JSON
+        :param endpoints: the endpoint names
+        :type endpoints: str
+        :param match: only drop the responses for which match(info) is true
+        :type match: callable
 
-        :return: API response formatted as a data dictionary
+        :return: None
+        """
+        with self._lock:
+            self.generation += 1
+            for key, entry in list(self._entries.items()):
+                if entry[1] in endpoints and (match is None or match(entry[3])):
+                    del self._entries[key]
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+
+    def clear(self):
+        """Drop all the cached responses
+
+        :return: None
         """
-        self._set_session()  # verify the session is setup
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
 
-        response = self.session.put(url, json=data)
 
-        response.raise_for_status()
+    def stats(self):
+        """Get the cache counters
 
-        return json.loads(response.text)
+        :return: the number of hits, misses, evictions and cached responses
+        :rtype: dict
+        """
+        with self._lock:
+            return { 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._entries) }
 
 
-    def _fetch_setup_data(self, url):
-        """Perform a GET request on the given URL
+class RateLimiter:
+    """Thread safe token bucket limiting the rate of requests
 
-        :param url: complete API URL
+    Tokens are added at rate per second, up to burst tokens.  acquire() takes a token, waiting for one
+    when the bucket is empty.
+    """
+    def __init__(self, rate, burst=1):
+        """Creates a RateLimiter instance.
 
-        :return: API response formatted as a data dictionary
+        :param rate: number of tokens added per second
+        :type rate: float
+        :param burst: maximum number of tokens held, the number of requests allowed at once after a pause
+        :type burst: int
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+
+    def acquire(self):
+        """Take a token, waiting until one is available
+
+        :return: the number of seconds waited
+        :rtype: float
         """
-        self._set_setup_session()  # verify the session is setup
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            # the token is taken right away, callers queued behind wait for the following tokens
+            self._tokens -= 1
+            wait_time = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait_time:
+            time.sleep(wait_time)
+
+        return wait_time
+
+
+class RequestScheduler:
+    """Thread safe scheduler of the requests of one or more clients
+
+    The scheduler limits the number of requests in flight and, when a rate is set, the number of requests
+    per second.  The limit of requests in flight adapts to throttling: it is halved (multiplicative
+    decrease) when a request is throttled, and grows back by one request per round of successful requests
+    (additive increase) up to max_concurrency.  While throttled, no request is sent until the Retry-After
+    delay is over.
+    """
+    def __init__(self, max_concurrency=10, min_concurrency=1, rate=0, burst=1, window=10):
+        """Creates a RequestScheduler instance.
+
+        :param max_concurrency: maximum number of requests in flight
+        :type max_concurrency: int
+        :param min_concurrency: number of requests in flight allowed however throttled the requests are
+        :type min_concurrency: int
+        :param rate: maximum number of requests per second, 0 for no limit
+        :type rate: float
+        :param burst: number of requests allowed at once by the rate limit after a pause
+        :type burst: int
+        :param window: number of seconds over which the rate of requests is measured
+        :type window: int
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.concurrency = float(self.max_concurrency)
+        self.limiter = RateLimiter(rate, burst) if rate else None
+        self.window = window
 
-        offset = 0
-        has_more = False
-        data = None
+        self.in_flight = 0
+        self.queued = 0
+        self.throttles = 0
+        self.paused_until = 0.0
 
-        response = self.admin_session.get(url + f'&limit=100&offset={offset}')
-        response.raise_for_status()
+        self._sent = deque()
+        self._created_at = time.monotonic()
+        self._condition = threading.Condition()
 
-        formatted_response = json.loads(response.text)
 
-        if 'hasMore' in formatted_response:
-            has_more = formatted_response['hasMore']
-        if 'data' in formatted_response:
-            data = formatted_response['data']
+    @contextmanager
+    def slot(self, timeout=None):
+        """Wait for the right to send a request, held until the context is left
 
-        # loop over the data until 'hasMore' is False
-        while has_more:
-            offset += 100
-            response = self.admin_session.get(url + f'&limit=100&offset={offset}')
-            response.raise_for_status()
+        :param timeout: maximum number of seconds to wait for a pause to end or a request in flight to complete
+        :type timeout: float
 
-            formatted_response = json.loads(response.text)
+        :return: None
 
-            data += formatted_response['data']
-            # update has_more
-            has_more = formatted_response['hasMore']
+        :exception DeadlineExceeded: raised if no slot is free within timeout seconds
+        """
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+
+        with self._condition:
+            self.queued += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    pause = self.paused_until - now
+                    if pause <= 0 and self.in_flight < int(self.concurrency):
+                        break
+
+                    if give_up_at is not None:
+                        if now >= give_up_at:
+                            raise DeadlineExceeded('deadline exceeded waiting for a request slot')
+                        pause = min(pause, give_up_at - now) if pause > 0 else give_up_at - now
+                    self._condition.wait(pause if pause > 0 else None)
+            finally:
+                self.queued -= 1
+            self.in_flight += 1
+
+        try:
+            if self.limiter:
+                self.limiter.acquire()
+            with self._condition:
+                self._sent.append(time.monotonic())
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+
+    def succeeded(self):
+        """Record a request which was not throttled, growing the limit of requests in flight
 
-        # use the final response
-        result = formatted_response
-        # if data exists, replace data with the accumulated result
-        if data:
-            result['count'] = result['total']
-            result['data'] = data
+        :return: None
+        """
+        with self._condition:
+            if self.concurrency < self.max_concurrency:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+                self._condition.notify_all()
 
-        return result
 
+    def throttled(self, retry_after):
+        """Record a throttled request, pausing the requests and halving the limit of requests in flight
 
-    def _post_setup_data(self, url, data):
-        """Perform a POST request on the given URL
+        The limit is only lowered once for the requests throttled during the same pause.
 
-        :param url: complete API URL
-        :type: str
-        :param data: a dictionary of data to post to the API.  the data is submitted as JSON
-        :type: dict
+        :param retry_after: number of seconds to wait before the next request
+        :type retry_after: float
 
-        :return: API response formatted as a data dictionary
+        :return: None
+        """
+        with self._condition:
+            now = time.monotonic()
+            self.throttles += 1
+            if now >= self.paused_until:
+                self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+            self.paused_until = max(self.paused_until, now + retry_after)
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+
+    def stats(self):
+        """Get the state of the scheduler
+
+        :return: the current limit of requests in flight, the requests in flight, the requests waiting for
+                 a slot, the number of throttled requests and the requests sent per second over the window
+        :rtype: dict
         """
-        self._set_setup_session()  # verify the session is setup
+        with self._condition:
+            now = time.monotonic()
+            while self._sent and self._sent[0] < now - self.window:
+                self._sent.popleft()
+            elapsed = min(self.window, max(1.0, now - self._created_at))
 
-        response = self.admin_session.post(url, json=data)
+            return { 'concurrency': int(self.concurrency),
+                     'in_flight': self.in_flight,
+                     'queued': self.queued,
+                     'throttles': self.throttles,
+                     'rate': len(self._sent) / elapsed if elapsed else 0.0 }
 
-        response.raise_for_status()
 
-        return json.loads(response.text)
+class DeadlineExceeded(requests.Timeout):
+    """Raised when the deadline of a call is reached, see OnSchedService.deadline"""
 
 
-    def _update_setup_data(self, url, data):
-        """Perform a PUT request on the given URL
+class CircuitOpenError(requests.RequestException):
+    """Raised without sending a request when the circuit of its endpoint is open"""
 
-        :param url: complete API URL
-        :param data: a dictionary of data to send to the update (PUT/PATCH) endpoint.  the data is submitted as JSON
 
-        :return: API response formatted as a data dictionary
+class CircuitBreaker:
+    """Thread safe circuit breaker, with one circuit per endpoint
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
+    A circuit opens after failure_threshold consecutive failed requests (connection errors, timeouts
+    and 5xx statuses) to its endpoint.  While open, requests fail fast with CircuitOpenError.  Once
+    reset_timeout seconds have passed, a single trial request is let through: the circuit closes if it
+    succeeds and opens again if it fails.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """Creates a CircuitBreaker instance.
+
+        :param failure_threshold: number of consecutive failures opening a circuit
+        :type failure_threshold: int
+        :param reset_timeout: number of seconds a circuit stays open before a trial request
+        :type reset_timeout: float
         """
-        self._set_setup_session()  # verify the session is setup
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
 
-        response = self.admin_session.put(url, json=data)
+        self._circuits = {}
+        self._lock = threading.Lock()
 
-        response.raise_for_status()
 
-        return json.loads(response.text)
+    def before(self, endpoint):
+        """Check that a request to an endpoint may be sent
 
+        :param endpoint: the endpoint of the request
+        :type endpoint: str
 
-    def _delete_setup_data(self, url):
-        """Perform a PUT request on the given URL
+        :return: True if the request is the trial request of the circuit, to release once it completes
+        :rtype: bool
 
-        :param url: complete API URL
-        :param data: a dictionary of data to send to the update (PUT/PATCH) endpoint.  the data is submitted as JSON
+        :exception CircuitOpenError: raised if the circuit of the endpoint is open
+        """
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None or circuit['opened_at'] is None:
+                return False
 
-        :return: API response formatted as a data dictionary
+            if circuit['trial'] or time.monotonic() - circuit['opened_at'] < self.reset_timeout:
+                raise CircuitOpenError(f'circuit open for {endpoint}')
 
-        :exception HTTPError: raised if the HTTP request returned an unsuccessful status code
-        :exception Timeout: raised if the request times out
-        :exception TooManyRedirects: raised if a request exceeds the configured number of maximum re-directions
-        """
-        self._set_setup_session()
+            circuit['trial'] = True
+            return True
 
-        response = self.admin_session.delete(url)
 
-        response.raise_for_status()
+    def succeeded(self, endpoint):
+        """Record a successful request, closing the circuit of its endpoint
+
+        :return: None
+        """
+        with self._lock:
+            self._circuits.pop(endpoint, None)
 
-        return json.loads(response.text)
 
+    def failed(self, endpoint):
+        """Record a failed request, opening the circuit of its endpoint once failure_threshold is reached
 
-    def _set_session(self):
-        """Setup session and token objects by querying the OAuth server
         :return: None
         """
-        current_time = datetime.now(timezone.utc)
-        unix_timestamp = current_time.timestamp()
+        with self._lock:
+            circuit = self._circuits.setdefault(endpoint, { 'failures': 0, 'opened_at': None, 'trial': False })
+            circuit['failures'] += 1
+            circuit['trial'] = False
+            if circuit['failures'] >= self.failure_threshold:
+                circuit['opened_at'] = time.monotonic()
 
-        # check if the token is already set up and
-        # if the access token is valid
-        if self.session and \
-                self.session.token and \
-                (self.session.token['expires_at'] > unix_timestamp):
-            return
-        else:
-            client = BackendApplicationClient(client_id=self.client_id, scope=self.scope)
-            self.session = OAuth2Session(client=client)
 
-            self.session.fetch_token(token_url=self.token_url,
-                                     client_id=self.client_id,
-                                     client_secret=self.client_secret)
+    def release(self, endpoint):
+        """End a trial request, letting another request through as the trial
 
+        A trial request recorded as succeeded or failed is already ended.  Releasing it is only needed
+        when it ends without an outcome for the circuit, e.g. on a 429 status or a deadline.
 
-    def _set_setup_session(self):
-        """Setup admin session and token objects for accessing the OnSchedule Setup API
         :return: None
         """
-        current_time = datetime.now(timezone.utc)
-        unix_timestamp = current_time.timestamp()
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is not None:
+                circuit['trial'] = False
 
-        # check if the token is already set up and
-        # if the access token is valid
-        if self.admin_session and \
-                self.admin_session.token and \
-                (self.admin_session.token['expires_at'] > unix_timestamp):
-            return
-        else:
-            client = BackendApplicationClient(client_id=self.client_id, scope=self.scope)  # TODO: change scope here for setup API
-            self.admin_session = OAuth2Session(client=client)
 
-            self.admin_session.fetch_token(token_url=self.token_url,
-                                           client_id=self.client_id,
-                                           client_secret=self.client_secret)
+    def state(self, endpoint):
+        """Get the state of the circuit of an endpoint
+
+        :return: 'closed', 'open' or 'half-open' (a trial request may be sent or is in flight)
+        :rtype: str
+        """
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None or circuit['opened_at'] is None:
+                return 'closed'
+            if circuit['trial'] or time.monotonic() - circuit['opened_at'] >= self.reset_timeout:
+                return 'half-open'
+
+            return 'open'
+
+
+class BulkReport:
+    """Thread safe count of the results of a bulk operation, with its throughput"""
+    def __init__(self):
+        """Creates a BulkReport instance.
+
+        The clock starts when the report is created.
+        """
+        self.succeeded = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+
+        self._lock = threading.Lock()
+
 
+    def add(self, result):
+        """Count a result
+
+        :param result: the result of an item, failed when its 'error' is set
+        :type result: dict
+        """
+        with self._lock:
+            if result.get('error') is None:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+
+
+    def stats(self):
+        """Get the counts and throughput of the results
+
+        :return: the number of succeeded, failed and completed items, the elapsed seconds and the completed items per second
+        :rtype: dict
+        """
+        with self._lock:
+            completed = self.succeeded + self.failed
+            elapsed = time.monotonic() - self.started_at
+
+            return { 'succeeded': self.succeeded,
+                     'failed': self.failed,
+                     'completed': completed,
+                     'elapsed': elapsed,
+                     'per_second': completed / elapsed if elapsed else 0.0 }
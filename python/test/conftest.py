@@ -0,0 +1,56 @@
+import threading
+import json
+import time
+import os
+import sys
+
+import requests
+
+# the modules under test live next to this directory, outside of any package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def response(status=200, data=None, headers=None):
+    """Build an HTTP response with a JSON body"""
+    result = requests.Response()
+    result.status_code = status
+    result._content = json.dumps({} if data is None else data).encode()
+    result.headers.update(headers or {})
+
+    return result
+
+
+class FakeSession:
+    """Session standing in for the OAuth session of a client, without network
+
+    Requests are answered in order with the given outcomes: a status code, a response, or an exception
+    which is raised.  Once the outcomes are used up, requests get a 200 status.  The body of a status
+    is built by respond(), which returns data unless a test overrides it.
+    """
+    def __init__(self, *outcomes, data=None):
+        self.outcomes = list(outcomes)
+        self.data = { 'id': '1', 'status': 'CN' } if data is None else data
+        self.requests = []
+        self.token = { 'access_token': 'token', 'expires_at': time.time() + 3600 }
+        self.lock = threading.Lock()
+
+    @property
+    def gets(self):
+        with self.lock:
+            return sum(1 for method, url, kwargs in self.requests if method == 'GET')
+
+    def request(self, method, url, **kwargs):
+        with self.lock:
+            self.requests.append((method, url, kwargs))
+            outcome = self.outcomes.pop(0) if self.outcomes else 200
+
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, int):
+            return response(outcome,
+                            self.respond(method, url, kwargs),
+                            { 'Retry-After': '0' } if outcome == 429 else None)
+        return outcome
+
+    def respond(self, method, url, kwargs):
+        return self.data
@@ -0,0 +1,102 @@
+import unittest
+from datetime import *
+
+try:
+    from ..appointment_index import AppointmentIndex, AppointmentConflictError
+    from ..onsched_service import parse_date_time
+except ImportError:
+    from appointment_index import AppointmentIndex, AppointmentConflictError
+    from onsched_service import parse_date_time
+
+
+def appointment(appointment_id, start, end, resource_id='r1', status='BK'):
+    return { 'id': appointment_id, 'resourceId': resource_id, 'status': status,
+             'startDateTime': start, 'endDateTime': end }
+
+
+class TestParseDateTime(unittest.TestCase):
+    def test_single_digit_fields(self):
+        self.assertEqual(parse_date_time('2016-10-30T9:00:00-5:00'), datetime(2016, 10, 30, 9))
+        self.assertEqual(parse_date_time('2016-10-30T9:00:00-5:00', utc=True), datetime(2016, 10, 30, 14))
+
+    def test_offsets(self):
+        self.assertEqual(parse_date_time('2016-10-30T09:00:00+05:30', utc=True), datetime(2016, 10, 30, 3, 30))
+        self.assertEqual(parse_date_time('2016-10-30T09:00:00Z', utc=True), datetime(2016, 10, 30, 9))
+        self.assertEqual(parse_date_time('2016-10-30T09:00:00.25-0400', utc=True),
+                         datetime(2016, 10, 30, 13, 0, 0, 250000))
+
+    def test_naive_values_are_kept(self):
+        self.assertEqual(parse_date_time('2016-10-30T09:00:00', utc=True), datetime(2016, 10, 30, 9))
+        self.assertEqual(parse_date_time(datetime(2016, 10, 30, 9), utc=True), datetime(2016, 10, 30, 9))
+        self.assertEqual(parse_date_time(datetime(2016, 10, 30, 9, tzinfo=timezone(timedelta(hours=-5))), utc=True),
+                         datetime(2016, 10, 30, 14))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_date_time('30/10/2016 9:00')
+
+
+class TestAppointmentIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = AppointmentIndex({ 'data': [
+            appointment('1', '2026-10-01T09:00:00-5:00', '2026-10-01T10:00:00-5:00'),
+            appointment('2', '2026-10-01T11:00:00-5:00', '2026-10-01T12:00:00-5:00'),
+            appointment('3', '2026-10-01T09:00:00-5:00', '2026-10-01T10:00:00-5:00', resource_id='r2'),
+            appointment('4', '2026-10-01T13:00:00-5:00', '2026-10-01T14:00:00-5:00', status='CN'),
+        ] })
+
+    def test_overlapping(self):
+        overlapping = self.index.overlapping('r1', '2026-10-01T09:30:00-05:00', '2026-10-01T11:30:00-05:00')
+        self.assertEqual([item['id'] for item in overlapping], ['1', '2'])
+
+    def test_adjacent_times_do_not_overlap(self):
+        self.assertEqual(self.index.overlapping('r1', '2026-10-01T10:00:00-05:00', '2026-10-01T11:00:00-05:00'), [])
+
+    def test_offsets_are_compared_in_utc(self):
+        # 15:30 UTC is 10:30 at -5:00, free; 14:30 UTC is 09:30 at -5:00, busy
+        self.assertEqual(self.index.overlapping('r1', '2026-10-01T15:30:00Z', '2026-10-01T16:00:00Z'), [])
+        self.assertEqual(len(self.index.overlapping('r1', '2026-10-01T14:30:00Z', '2026-10-01T15:00:00Z')), 1)
+
+    def test_cancelled_appointments_are_not_indexed(self):
+        self.assertEqual(self.index.overlapping('r1', '2026-10-01T13:00:00-05:00', '2026-10-01T14:00:00-05:00'), [])
+
+        self.index.add(appointment('2', '2026-10-01T11:00:00-5:00', '2026-10-01T12:00:00-5:00', status='CN'))
+        self.assertEqual(self.index.overlapping('r1', '2026-10-01T11:00:00-05:00', '2026-10-01T12:00:00-05:00'), [])
+
+    def test_add_replaces_same_id(self):
+        self.index.add(appointment('1', '2026-10-01T15:00:00-5:00', '2026-10-01T16:00:00-5:00'))
+
+        self.assertEqual(self.index.overlapping('r1', '2026-10-01T09:00:00-05:00', '2026-10-01T10:00:00-05:00'), [])
+        self.assertEqual(len(self.index.overlapping('r1', '2026-10-01T15:00:00-05:00', '2026-10-01T16:00:00-05:00')), 1)
+
+    def test_remove(self):
+        self.assertTrue(self.index.remove('1'))
+        self.assertFalse(self.index.remove('1'))
+        self.assertEqual(self.index.overlapping('r1', '2026-10-01T09:00:00-05:00', '2026-10-01T10:00:00-05:00'), [])
+
+    def test_check(self):
+        self.index.check('r1', '2026-10-01T10:00:00-05:00', '2026-10-01T11:00:00-05:00')
+
+        with self.assertRaises(AppointmentConflictError) as context:
+            self.index.check('r2', '2026-10-01T09:45:00-05:00', '2026-10-01T10:15:00-05:00')
+        self.assertEqual([item['id'] for item in context.exception.appointments], ['3'])
+
+    def test_check_excluding_the_moved_appointment(self):
+        self.index.check('r1', '2026-10-01T09:30:00-05:00', '2026-10-01T10:30:00-05:00', exclude='1')
+
+        with self.assertRaises(AppointmentConflictError):
+            self.index.check('r1', '2026-10-01T09:30:00-05:00', '2026-10-01T11:30:00-05:00', exclude='1')
+
+    def test_many_appointments(self):
+        index = AppointmentIndex()
+        start = datetime(2026, 10, 1)
+        for number in range(500):
+            slot_start = start + timedelta(minutes=30 * number)
+            index.add(appointment(str(number), slot_start.isoformat(), (slot_start + timedelta(minutes=30)).isoformat()))
+
+        overlapping = index.overlapping('r1', start + timedelta(minutes=100), start + timedelta(minutes=200))
+        self.assertEqual([item['id'] for item in overlapping], ['3', '4', '5', '6'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import unittest
+import urllib.parse
+import json
+import time
+
+import aiohttp
+
+try:
+    from ..async_onsched_service import AsyncOnSchedService
+except ImportError:
+    from async_onsched_service import AsyncOnSchedService
+
+
+class FakeResponse:
+    """Response of the fake session, sent when entered"""
+    def __init__(self, http_session, data):
+        self.http_session = http_session
+        self.data = data
+
+    async def __aenter__(self):
+        self.http_session.in_flight += 1
+        self.http_session.max_in_flight = max(self.http_session.max_in_flight, self.http_session.in_flight)
+        # let the other tasks run while the request is in flight
+        await asyncio.sleep(0.001)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.http_session.in_flight -= 1
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self):
+        return json.dumps(self.data).encode()
+
+    async def text(self):
+        return json.dumps(self.data)
+
+
+class FakeHttpSession:
+    """aiohttp session answering the token requests, and the GET requests with the pages of a list of records"""
+    def __init__(self, total):
+        self.records = [{ 'id': str(number) } for number in range(total)]
+        self.token_requests = 0
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def post(self, url, data=None, auth=None):
+        self.token_requests += 1
+        return FakeResponse(self, { 'access_token': f'token {self.token_requests}', 'expires_in': 3600 })
+
+    def request(self, method, url, json=None, headers=None):
+        self.requests.append((method, url, headers))
+
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+        offset, limit = int(query['offset'][0]), int(query['limit'][0])
+        page = self.records[offset:offset + limit]
+        return FakeResponse(self, { 'count': len(page), 'total': len(self.records),
+                                    'hasMore': offset + limit < len(self.records), 'data': page })
+
+    async def close(self):
+        pass
+
+
+def client(total=1, **kwargs):
+    service = AsyncOnSchedService(client_id='client', client_secret='secret', **kwargs)
+    service.http_session = FakeHttpSession(total)
+
+    return service
+
+
+def ids(records):
+    return [int(record['id']) for record in records]
+
+
+class TestAsyncToken(unittest.TestCase):
+    def test_token_is_requested_once_by_concurrent_calls(self):
+        service = client()
+
+        async def run():
+            return await asyncio.gather(*(service.locations() for call in range(10)))
+
+        self.assertEqual([ids(locations['data']) for locations in asyncio.run(run())], [[0]] * 10)
+        self.assertEqual(service.http_session.token_requests, 1)
+        self.assertEqual({ headers['Authorization'] for method, url, headers in service.http_session.requests },
+                         { 'Bearer token 1' })
+
+    def test_expired_token_is_renewed(self):
+        service = client()
+
+        asyncio.run(service.locations())
+        service.tokens[service.scope]['expires_at'] = time.time() - 1
+        asyncio.run(service.locations())
+
+        self.assertEqual(service.http_session.token_requests, 2)
+        self.assertEqual(service.http_session.requests[-1][2]['Authorization'], 'Bearer token 2')
+
+    def test_session_times_out_requests(self):
+        service = AsyncOnSchedService(client_id='client', client_secret='secret', timeout=5)
+        service.tokens[service.scope] = { 'access_token': 'token', 'expires_at': time.time() + 3600 }
+
+        async def run():
+            async with service:
+                await service._set_session(service.scope)
+                return service.http_session.timeout
+
+        self.assertEqual(asyncio.run(run()), aiohttp.ClientTimeout(total=5))
+
+
+class TestAsyncPagination(unittest.TestCase):
+    def test_pages_are_fetched_concurrently_in_offset_order(self):
+        service = client(1050, max_workers=4)
+
+        locations = asyncio.run(service.locations())
+
+        self.assertEqual(ids(locations['data']), list(range(1050)))
+        self.assertEqual(locations['count'], 1050)
+        self.assertEqual(len(service.http_session.requests), 11)
+        self.assertGreater(service.http_session.max_in_flight, 1)
+        self.assertLessEqual(service.http_session.max_in_flight, 4)
+
+    def test_serial_pages(self):
+        service = client(1050, max_workers=1)
+
+        self.assertEqual(ids(asyncio.run(service.locations())['data']), list(range(1050)))
+        self.assertEqual(service.http_session.max_in_flight, 1)
+
+    def test_iterators_yield_the_records_in_order(self):
+        for prefetch in (False, True):
+            service = client(1050)
+
+            async def run():
+                return [record async for record in service.iter_locations(prefetch=prefetch)]
+
+            self.assertEqual(ids(asyncio.run(run())), list(range(1050)))
+            self.assertEqual(len(service.http_session.requests), 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import *
+
+try:
+    from ..availability_engine import AvailabilityEngine, WEEKDAYS
+    from ..onsched_service import OnSchedService
+except ImportError:
+    from availability_engine import AvailabilityEngine, WEEKDAYS
+    from onsched_service import OnSchedService
+
+
+DAY = date(2026, 10, 1)
+
+
+def appointment(appointment_id, start, end, status='BK'):
+    return { 'id': appointment_id, 'resourceId': '1', 'status': status, 'startDateTime': start, 'endDateTime': end }
+
+
+def client(appointments=(), available_times=()):
+    """Client answering the calls of the engine without requests"""
+    onsched = OnSchedService(client_id='client', client_secret='secret')
+    onsched.services = lambda location_id='': { 'data': [{ 'id': '5', 'duration': 60 }] }
+    onsched.service_allocations = lambda *args, **kwargs: { 'data': [] }
+    onsched.appointments = lambda **filters: { 'data': list(appointments) }
+    onsched.availability = lambda *args, **kwargs: { 'availableTimes': list(available_times) }
+
+    return onsched
+
+
+def engine(onsched, service_id='5'):
+    business_hours = { weekday: { 'startTime': 800, 'endTime': 1200 } for weekday in WEEKDAYS }
+    return AvailabilityEngine(onsched, service_id, ['1'], business_hours=business_hours)
+
+
+def starts(availability):
+    return [time_slot['startDateTime'] for time_slot in availability['availableTimes']]
+
+
+class TestAvailabilityEngine(unittest.TestCase):
+    def test_slots_skip_appointments(self):
+        local = engine(client([appointment('1', '2026-10-01T9:00:00-5:00', '2026-10-01T10:00:00-5:00')]))
+        local.load(DAY, DAY)
+
+        self.assertEqual(starts(local.availability(DAY, DAY)),
+                         ['2026-10-01T08:00:00', '2026-10-01T10:00:00', '2026-10-01T11:00:00'])
+
+    def test_appointments_are_counted_once(self):
+        local = engine(client())
+        local.load(DAY, DAY)
+        reserved = appointment('1', '2026-10-01T08:00:00', '2026-10-01T09:00:00', status='IN')
+
+        local.add_appointment(reserved)
+        local.add_appointment(dict(reserved, status='BK'))
+        local.remove_appointment(reserved)
+        local.remove_appointment(reserved)
+
+        self.assertEqual(len(starts(local.availability(DAY, DAY))), 4)
+        self.assertEqual(local.busy_minutes[DAY].min(), 0)
+
+    def test_unknown_service(self):
+        with self.assertRaises(ValueError):
+            engine(client(), service_id='7').load(DAY, DAY)
+
+    def test_verify_matches_non_padded_api_times(self):
+        available_times = [{ 'startDateTime': '2026-10-01T8:00:00-5:00', 'endDateTime': '2026-10-01T9:00:00-5:00', 'resourceId': 1 },
+                           { 'startDateTime': '2026-10-01T9:00:00-5:00', 'endDateTime': '2026-10-01T10:00:00-5:00', 'resourceId': 1 },
+                           { 'startDateTime': '2026-10-01T10:00:00-5:00', 'endDateTime': '2026-10-01T11:00:00-5:00', 'resourceId': 1 }]
+        local = engine(client(available_times=available_times))
+        local.load(DAY, DAY)
+
+        self.assertEqual(local.verify(DAY, DAY), { 'missing': [], 'extra': [('2026-10-01T11:00', '1')] })
+
+
+if __name__ == '__main__':
+    unittest.main()
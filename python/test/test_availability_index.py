@@ -0,0 +1,103 @@
+import unittest
+from datetime import *
+
+try:
+    from ..availability_index import SlotBitmapIndex, SlotTimeline
+except ImportError:
+    from availability_index import SlotBitmapIndex, SlotTimeline
+
+
+DAY = date(2026, 10, 1)
+
+
+def at(hour, minute=0, day=DAY):
+    return datetime.combine(day, time(hour, minute))
+
+
+class TestSlotBitmapIndex(unittest.TestCase):
+    def test_add_time_marks_fully_covered_slots(self):
+        index = SlotBitmapIndex(granularity=15)
+        index.add_time('r1', at(9, 10), at(10, 5))
+
+        # 09:10 to 10:05 fully covers the slots 09:15, 09:30 and 09:45 only
+        self.assertEqual(index.count_free('r1', DAY), 3)
+        self.assertEqual(index.first_common_slot(['r1'], at(0)), at(9, 15))
+
+    def test_add_time_aligned(self):
+        index = SlotBitmapIndex(granularity=15)
+        index.add_time('r1', at(9), at(10))
+
+        self.assertEqual(index.count_free('r1', DAY), 4)
+        self.assertEqual(index.free('r1', DAY), 0b1111 << (9 * 4))
+
+    def test_add_time_shorter_than_a_slot(self):
+        index = SlotBitmapIndex(granularity=15)
+        index.add_time('r1', at(9, 5), at(9, 20))
+
+        self.assertEqual(index.count_free('r1', DAY), 0)
+
+    def test_add_time_across_midnight(self):
+        index = SlotBitmapIndex(granularity=60)
+        index.add_time('r1', at(23), at(1, day=DAY + timedelta(days=1)))
+
+        self.assertEqual(index.free('r1', DAY), 1 << 23)
+        self.assertEqual(index.free('r1', DAY + timedelta(days=1)), 1)
+
+    def test_first_common_slot_needs_exact_run(self):
+        index = SlotBitmapIndex(granularity=15)
+        # a run of 3 slots, then a run of 4 slots
+        index.add_time('r1', at(9), at(9, 45))
+        index.add_time('r1', at(10), at(11))
+
+        self.assertEqual(index.first_common_slot(['r1'], at(0), slots=3), at(9))
+        self.assertEqual(index.first_common_slot(['r1'], at(0), slots=4), at(10))
+        self.assertIsNone(index.first_common_slot(['r1'], at(0), slots=5))
+
+    def test_first_common_slot_is_not_before_after(self):
+        index = SlotBitmapIndex(granularity=15)
+        index.add_time('r1', at(10), at(11))
+
+        self.assertEqual(index.first_common_slot(['r1'], at(10)), at(10))
+        self.assertEqual(index.first_common_slot(['r1'], at(10) + timedelta(seconds=30)), at(10, 15))
+        self.assertEqual(index.first_common_slot(['r1'], at(10) + timedelta(microseconds=1)), at(10, 15))
+
+    def test_first_common_slot_of_many_resources(self):
+        index = SlotBitmapIndex(granularity=15)
+        index.add_time('r1', at(9), at(12))
+        index.add_time('r2', at(10, 30), at(11, 30))
+
+        self.assertEqual(index.first_common_slot(['r1', 'r2'], at(0), slots=2), at(10, 30))
+        self.assertEqual(index.first_common_slot(['r1', 'r2'], at(10, 40), slots=2), at(10, 45))
+        self.assertIsNone(index.first_common_slot(['r1', 'r2'], at(10, 40), slots=4))
+
+    def test_invalid_granularity(self):
+        with self.assertRaises(ValueError):
+            SlotBitmapIndex(granularity=7)
+
+
+class TestSlotTimeline(unittest.TestCase):
+    def setUp(self):
+        self.timeline = SlotTimeline({ 'availableTimes': [
+            { 'resourceId': 'r1', 'startDateTime': '2026-10-01T10:00:00', 'endDateTime': '2026-10-01T11:00:00' },
+            { 'resourceId': 'r1', 'startDateTime': '2026-10-01T09:00:00', 'endDateTime': '2026-10-01T10:00:00' },
+            { 'resourceId': 'r2', 'startDateTime': '2026-10-01T09:30:00', 'endDateTime': '2026-10-01T10:30:00' },
+        ] })
+
+    def test_next_available(self):
+        self.assertEqual(self.timeline.next_available('r1', at(9, 30))['startDateTime'], '2026-10-01T10:00:00')
+        self.assertIsNone(self.timeline.next_available('r1', at(10, 30)))
+        self.assertIsNone(self.timeline.next_available('r3', at(0)))
+
+    def test_slots_between(self):
+        slots = self.timeline.slots_between('r1', at(9), at(10, 30))
+        self.assertEqual([time_slot['startDateTime'] for time_slot in slots],
+                         ['2026-10-01T09:00:00', '2026-10-01T10:00:00'])
+
+    def test_is_free(self):
+        self.assertTrue(self.timeline.is_free('r2', at(9, 30), at(10, 30)))
+        self.assertFalse(self.timeline.is_free('r2', at(9), at(10)))
+        self.assertFalse(self.timeline.is_free('r3', at(9)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
+
+try:
+    from ..batch_loader import BatchLoader, LocationLoader
+except ImportError:
+    from batch_loader import BatchLoader, LocationLoader
+
+
+class FakeOnSched:
+    """Client holding locations, recording the calls made to fetch them"""
+    max_workers = 4
+
+    def __init__(self, location_ids):
+        self.locations_data = { location_id: { 'id': location_id, 'name': f'location {location_id}' }
+                                for location_id in location_ids }
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def locations(self):
+        with self.lock:
+            self.calls.append('locations')
+        return { 'data': [location for location_id, location in self.locations_data.items() if location_id != 'hidden'] }
+
+    def location(self, location_id):
+        with self.lock:
+            self.calls.append(location_id)
+        if location_id not in self.locations_data:
+            raise LookupError(location_id)
+        return self.locations_data[location_id]
+
+
+class RecordingLoader(BatchLoader):
+    """Loader answering each id with a new dict, failing the ids starting with 'bad'"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def fetch(self, entity_ids):
+        self.batches.append(entity_ids)
+        if 'all-bad' in entity_ids:
+            raise RuntimeError('batch failed')
+
+        return { entity_id: ValueError(entity_id) if entity_id.startswith('bad') else { 'id': entity_id }
+                 for entity_id in entity_ids if entity_id != 'missing' }
+
+
+class TestBatchLoader(unittest.TestCase):
+    def test_ids_are_fetched_once_per_batch(self):
+        loader = RecordingLoader(None, window=0.05)
+
+        self.assertEqual(loader.load_many(['1', '2', '1', 2]), [{ 'id': '1' }, { 'id': '2' }, { 'id': '1' }, { 'id': '2' }])
+        self.assertEqual(loader.batches, [['1', '2']])
+
+    def test_concurrent_loads_share_a_batch(self):
+        loader = RecordingLoader(None, window=0.1)
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(loader.load, [str(number % 4) for number in range(16)]))
+
+        self.assertEqual([result['id'] for result in results], [str(number % 4) for number in range(16)])
+        self.assertEqual(len(loader.batches), 1)
+        self.assertEqual(sorted(loader.batches[0]), ['0', '1', '2', '3'])
+
+    def test_each_caller_gets_its_own_copy(self):
+        loader = RecordingLoader(None, window=0.05)
+
+        first, second = loader.load_many(['1', '1'])
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+
+    def test_per_id_errors(self):
+        loader = RecordingLoader(None, window=0.05)
+        futures = [loader.load_async(entity_id) for entity_id in ('1', 'bad', 'missing')]
+
+        self.assertEqual(futures[0].result(timeout=1), { 'id': '1' })
+        self.assertIsInstance(futures[1].exception(timeout=1), ValueError)
+        self.assertIsInstance(futures[2].exception(timeout=1), KeyError)
+
+    def test_batch_error_fails_every_caller(self):
+        loader = RecordingLoader(None, window=0.05)
+        futures = [loader.load_async(entity_id) for entity_id in ('1', 'all-bad')]
+
+        for future in futures:
+            self.assertIsInstance(future.exception(timeout=1), RuntimeError)
+
+    def test_full_batch_is_fetched_without_waiting(self):
+        loader = RecordingLoader(None, window=60, max_batch=2)
+
+        self.assertEqual(loader.load_many(['1', '2']), [{ 'id': '1' }, { 'id': '2' }])
+
+    def test_cancelled_caller_does_not_block_the_others(self):
+        for entity_ids in (('1', '2'), ('1', 'all-bad')):
+            loader = RecordingLoader(None, window=0.05)
+            cancelled = loader.load_async('1')
+            futures = [loader.load_async(entity_id) for entity_id in entity_ids]
+
+            self.assertTrue(cancelled.cancel())
+            for future in futures:
+                future.exception(timeout=1)
+            self.assertTrue(futures[0].done())
+
+    def test_cancelled_batch_is_not_fetched(self):
+        loader = RecordingLoader(None, window=0.01)
+        future = loader.load_async('1')
+        future.cancel()
+
+        self.assertEqual(loader.load_async('2').result(timeout=1), { 'id': '2' })
+        self.assertEqual(loader.batches, [['2']])
+
+
+class TestLocationLoader(unittest.TestCase):
+    def test_one_id_is_fetched_alone(self):
+        onsched = FakeOnSched(['1', '2'])
+
+        self.assertEqual(LocationLoader(onsched, window=0.01).load('1')['id'], '1')
+        self.assertEqual(onsched.calls, ['1'])
+
+    def test_many_ids_are_listed_once(self):
+        onsched = FakeOnSched(['1', '2', 'hidden'])
+        loader = LocationLoader(onsched, window=0.05)
+        futures = [loader.load_async(location_id) for location_id in ('1', '2', 'hidden', 'unknown')]
+
+        self.assertEqual(futures[0].result(timeout=1)['id'], '1')
+        self.assertEqual(futures[1].result(timeout=1)['id'], '2')
+        self.assertEqual(futures[2].result(timeout=1)['id'], 'hidden')
+        self.assertIsInstance(futures[3].exception(timeout=1), LookupError)
+        self.assertEqual(sorted(onsched.calls), ['hidden', 'locations', 'unknown'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from conftest import FakeSession
+
+try:
+    from ..onsched_service import OnSchedService
+except ImportError:
+    from onsched_service import OnSchedService
+
+
+ORIGINAL = { 'id': '1', 'serviceId': '5', 'resourceId': '1', 'locationId': '2', 'customerId': '3',
+             'serviceAllocationId': '4', 'bookedBy': 'front desk', 'status': 'BK',
+             'startDateTime': '2026-10-01T9:00:00-5:00', 'endDateTime': '2026-10-01T10:00:00-5:00',
+             'email': 'customer@example.com', 'name': 'Customer', 'phone': '5551234', 'phoneType': 'M',
+             'notes': 'first visit', 'appointmentBookingFields': [{ 'name': 'reason', 'value': 'checkup' }] }
+
+
+class AppointmentSession(FakeSession):
+    """Session listing the original appointment, and answering the other requests with a new appointment"""
+    def respond(self, method, url, kwargs):
+        if method == 'GET':
+            return { 'count': 1, 'total': 1, 'data': [ORIGINAL] }
+
+        return dict(kwargs.get('json') or {}, id='10' if not url.endswith('/1/cancel') else '1')
+
+
+def payloads(session, method, suffix):
+    return [kwargs['json'] for request_method, url, kwargs in session.requests
+            if request_method == method and url.endswith(suffix)]
+
+
+class TestBulkReschedule(unittest.TestCase):
+    def test_booking_data_is_carried_over(self):
+        service = OnSchedService(client_id='client', client_secret='secret')
+        service.session = AppointmentSession()
+
+        results = list(service.bulk_reschedule_appointments(
+            lambda appointment: { 'resource_id': '6', 'notes': 'moved' }, resource_id='1'))
+        self.assertEqual(results[0]['stage'], 'done')
+
+        created, = payloads(service.session, 'POST', '/appointments')
+        self.assertEqual(created['resourceId'], '6')
+        self.assertEqual(created['serviceAllocationId'], '4')
+        self.assertEqual(created['bookedBy'], 'front desk')
+        self.assertEqual(created['customerId'], '3')
+
+        booked, = payloads(service.session, 'PUT', '/10/book')
+        self.assertEqual(booked['email'], 'customer@example.com')
+        self.assertEqual(booked['phoneType'], 'M')
+        self.assertEqual(booked['notes'], 'moved')
+        self.assertEqual(booked['appointmentBookingFields'], ORIGINAL['appointmentBookingFields'])
+
+        self.assertEqual(len(payloads(service.session, 'PUT', '/1/cancel')), 1)
+
+    def test_unchanged_appointments_are_left_alone(self):
+        service = OnSchedService(client_id='client', client_secret='secret')
+        service.session = AppointmentSession()
+
+        results = list(service.bulk_reschedule_appointments(lambda appointment: None))
+        self.assertEqual(results[0]['stage'], 'done')
+        self.assertEqual([method for method, url, kwargs in service.session.requests], ['GET'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
+import time
+
+import requests
+
+from conftest import FakeSession
+
+try:
+    from ..onsched_service import OnSchedService, ResponseCache, DeadlineExceeded
+except ImportError:
+    from onsched_service import OnSchedService, ResponseCache, DeadlineExceeded
+
+
+class GatedSession(FakeSession):
+    """Session holding its first request until released, so the calls made meanwhile join it"""
+    def __init__(self, *outcomes, data=None):
+        super().__init__(*outcomes, data=data)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def request(self, method, url, **kwargs):
+        if not self.started.is_set():
+            self.started.set()
+            self.release.wait(5)
+
+        return super().request(method, url, **kwargs)
+
+
+def client(*outcomes, **kwargs):
+    service = OnSchedService(client_id='client', client_secret='secret', **kwargs)
+    service.session = GatedSession(*outcomes, data={ 'id': '1', 'name': 'location' })
+
+    return service
+
+
+def run_coalesced(service, leader_call, call, waiters):
+    """Start leader_call, then the waiters while it is in flight, and return the futures of all the calls"""
+    with ThreadPoolExecutor(max_workers=waiters + 1) as executor:
+        futures = [executor.submit(leader_call)]
+        service.session.started.wait(5)
+
+        futures += [executor.submit(call) for waiter in range(waiters)]
+        while service.coalescing_stats()['coalesced'] < waiters:
+            time.sleep(0.001)
+
+        service.session.release.set()
+
+    return futures
+
+
+class TestCoalescing(unittest.TestCase):
+    def test_identical_calls_are_fetched_once(self):
+        service = client()
+        call = lambda: service.location('1')
+
+        results = [future.result() for future in run_coalesced(service, call, call, 7)]
+
+        self.assertEqual(service.session.gets, 1)
+        self.assertEqual(service.coalescing_stats(), { 'fetches': 1, 'coalesced': 7 })
+        self.assertEqual(results, [{ 'id': '1', 'name': 'location' }] * 8)
+
+    def test_each_caller_gets_its_own_copy(self):
+        service = client()
+        call = lambda: service.location('1')
+
+        results = [future.result() for future in run_coalesced(service, call, call, 3)]
+
+        self.assertEqual(len({ id(result) for result in results }), 4)
+
+    def test_error_is_raised_to_every_caller(self):
+        service = client(404)
+        call = lambda: service.location('1')
+
+        for future in run_coalesced(service, call, call, 3):
+            self.assertIsInstance(future.exception(), requests.HTTPError)
+        self.assertEqual(service.session.gets, 1)
+
+    def test_deadline_of_the_first_call_does_not_fail_the_others(self):
+        service = client(503, backoff=10 ** 6, max_backoff=10 ** 6)
+
+        def leader_call():
+            with service.deadline(5):
+                return service.location('1')
+
+        futures = run_coalesced(service, leader_call, lambda: service.location('1'), 3)
+
+        self.assertIsInstance(futures[0].exception(), DeadlineExceeded)
+        for future in futures[1:]:
+            self.assertEqual(future.result(), { 'id': '1', 'name': 'location' })
+        # the waiters fetched again rather than sharing the error of the first call
+        self.assertGreaterEqual(service.session.gets, 2)
+
+    def test_calls_made_after_an_invalidation_are_not_coalesced(self):
+        service = client(response_cache=ResponseCache())
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            leader = executor.submit(service.location, '1')
+            service.session.started.wait(5)
+
+            service.response_cache.invalidate('location')
+            self.assertEqual(service.location('1'), { 'id': '1', 'name': 'location' })
+            service.session.release.set()
+
+        self.assertEqual(leader.result(), { 'id': '1', 'name': 'location' })
+        self.assertEqual(service.session.gets, 2)
+        self.assertEqual(service.coalescing_stats(), { 'fetches': 2, 'coalesced': 0 })
+
+
+if __name__ == '__main__':
+    unittest.main()
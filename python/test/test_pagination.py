@@ -0,0 +1,154 @@
+import itertools
+import unittest
+import urllib.parse
+import time
+
+import requests
+
+from conftest import FakeSession, response
+
+try:
+    from ..onsched_service import OnSchedService
+except ImportError:
+    from onsched_service import OnSchedService
+
+
+class PagedSession(FakeSession):
+    """Session answering the GET requests with the pages of a list of records
+
+    failures maps an offset to the outcomes of its first requests, before the page is answered.
+    """
+    def __init__(self, total, failures=None):
+        super().__init__()
+        self.records = [{ 'id': str(number) } for number in range(total)]
+        self.failures = { offset: list(outcomes) for offset, outcomes in (failures or {}).items() }
+
+    @property
+    def offsets(self):
+        with self.lock:
+            return [offset(url) for method, url, kwargs in self.requests if method == 'GET']
+
+    def request(self, method, url, **kwargs):
+        with self.lock:
+            outcomes = self.failures.get(offset(url))
+            outcome = outcomes.pop(0) if outcomes else None
+
+        if outcome is None:
+            return super().request(method, url, **kwargs)
+
+        with self.lock:
+            self.requests.append((method, url, kwargs))
+        return response(outcome)
+
+    def respond(self, method, url, kwargs):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+        page_offset, limit = int(query['offset'][0]), int(query['limit'][0])
+        page = self.records[page_offset:page_offset + limit]
+
+        return { 'count': len(page), 'total': len(self.records), 'hasMore': page_offset + limit < len(self.records),
+                 'data': page }
+
+
+def offset(url):
+    return int(urllib.parse.parse_qs(urllib.parse.urlparse(url).query)['offset'][0])
+
+
+def client(total, failures=None, **kwargs):
+    kwargs.setdefault('backoff', 0)
+    service = OnSchedService(client_id='client', client_secret='secret', **kwargs)
+    service.session = PagedSession(total, failures)
+
+    return service
+
+
+def ids(records):
+    return [int(record['id']) for record in records]
+
+
+class TestFetchPages(unittest.TestCase):
+    def test_pages_are_merged_in_offset_order(self):
+        for max_workers in (1, 8):
+            service = client(1050, max_workers=max_workers)
+
+            locations = service.locations()
+            self.assertEqual(ids(locations['data']), list(range(1050)))
+            self.assertEqual(locations['count'], 1050)
+            self.assertEqual(sorted(service.session.offsets), list(range(0, 1050, 100)))
+
+    def test_last_page_filling_the_limit(self):
+        service = client(1000)
+
+        self.assertEqual(ids(service.locations()['data']), list(range(1000)))
+        self.assertEqual(sorted(service.session.offsets), list(range(0, 1000, 100)))
+
+    def test_single_page(self):
+        service = client(30)
+
+        self.assertEqual(ids(service.locations()['data']), list(range(30)))
+        self.assertEqual(service.session.offsets, [0])
+
+    def test_failed_page_is_retried_at_its_offset(self):
+        service = client(1050, failures={ 500: [503] })
+
+        self.assertEqual(ids(service.locations()['data']), list(range(1050)))
+        self.assertEqual(sorted(service.session.offsets), sorted(list(range(0, 1050, 100)) + [500]))
+
+    def test_error_in_a_middle_page_is_raised(self):
+        service = client(1050, failures={ 500: [404] })
+
+        with self.assertRaises(requests.HTTPError):
+            service.locations()
+
+
+class TestIterData(unittest.TestCase):
+    def test_records_are_yielded_in_order(self):
+        for prefetch in (False, True):
+            service = client(1050)
+
+            self.assertEqual(ids(service.iter_locations(prefetch=prefetch)), list(range(1050)))
+            self.assertEqual(service.session.offsets, list(range(0, 1050, 100)))
+
+    def test_pages_are_fetched_as_they_are_consumed(self):
+        service = client(1050)
+        records = service.iter_locations()
+
+        self.assertEqual(ids(itertools.islice(records, 100)), list(range(100)))
+        self.assertEqual(service.session.offsets, [0])
+        self.assertEqual(ids(itertools.islice(records, 1)), [100])
+        self.assertEqual(service.session.offsets, [0, 100])
+
+    def test_prefetch_fetches_one_page_ahead(self):
+        service = client(1050)
+        records = service.iter_locations(prefetch=True)
+
+        # the second page is fetched while the caller processes the first one
+        self.assertEqual(ids(itertools.islice(records, 1)), [0])
+        started_at = time.monotonic()
+        while service.session.offsets != [0, 100] and time.monotonic() - started_at < 1:
+            time.sleep(0.001)
+        self.assertEqual(service.session.offsets, [0, 100])
+
+        self.assertEqual(ids(itertools.islice(records, 100)), list(range(1, 101)))
+        records.close()
+        self.assertLessEqual(len(service.session.offsets), 3)
+
+    def test_failed_page_is_retried_at_its_offset(self):
+        for prefetch in (False, True):
+            service = client(1050, failures={ 500: [503] })
+
+            self.assertEqual(ids(service.iter_locations(prefetch=prefetch)), list(range(1050)))
+            self.assertEqual(service.session.offsets, [0, 100, 200, 300, 400, 500, 500, 600, 700, 800, 900, 1000])
+
+    def test_error_in_a_middle_page_is_raised_after_the_previous_pages(self):
+        for prefetch in (False, True):
+            service = client(1050, failures={ 500: [404] })
+            records = []
+
+            with self.assertRaises(requests.HTTPError):
+                for record in service.iter_locations(prefetch=prefetch):
+                    records.append(record)
+            self.assertEqual(ids(records), list(range(500)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,292 @@
+import threading
+import unittest
+import time
+
+import requests
+
+from conftest import FakeSession, response
+
+try:
+    from ..onsched_service import OnSchedService, RequestScheduler, CircuitBreaker, CircuitOpenError, \
+        DeadlineExceeded, RateLimiter
+except ImportError:
+    from onsched_service import OnSchedService, RequestScheduler, CircuitBreaker, CircuitOpenError, \
+        DeadlineExceeded, RateLimiter
+
+
+def client(*outcomes, **kwargs):
+    kwargs.setdefault('backoff', 0)
+    service = OnSchedService(client_id='client', client_secret='secret', **kwargs)
+    service.session = FakeSession(*outcomes)
+
+    return service
+
+
+APPOINTMENT = { 'service_id': '5',
+                'start_date_time': '2026-10-01T09:00:00-5:00',
+                'end_date_time': '2026-10-01T10:00:00-5:00',
+                'resource_id': '1' }
+
+
+class TestRetries(unittest.TestCase):
+    def test_transient_status_is_retried(self):
+        service = client(503, 200)
+
+        self.assertEqual(service.cancel_appointment('1')['status'], 'CN')
+        self.assertEqual(len(service.session.requests), 2)
+
+    def test_retries_are_bounded(self):
+        service = client(503, 503, 503, 503, retries=2)
+
+        with self.assertRaises(requests.HTTPError):
+            service.cancel_appointment('1')
+        self.assertEqual(len(service.session.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        service = client(400, 200)
+
+        with self.assertRaises(requests.HTTPError):
+            service.cancel_appointment('1')
+        self.assertEqual(len(service.session.requests), 1)
+
+    def test_throttled_request_is_retried(self):
+        service = client(429, 429, 200)
+
+        service.cancel_appointment('1')
+        self.assertEqual(len(service.session.requests), 3)
+        self.assertEqual(service.scheduler.stats()['throttles'], 2)
+
+    def test_post_read_timeout_is_not_retried(self):
+        service = client(requests.ReadTimeout(), 200)
+
+        with self.assertRaises(requests.ReadTimeout):
+            service.create_appointment(**APPOINTMENT)
+        self.assertEqual(len(service.session.requests), 1)
+
+    def test_post_connect_timeout_is_retried(self):
+        service = client(requests.ConnectTimeout(), 200)
+
+        service.create_appointment(**APPOINTMENT)
+        self.assertEqual(len(service.session.requests), 2)
+
+    def test_posts_carry_one_idempotency_key(self):
+        service = client(requests.ConnectTimeout(), 200)
+
+        service.create_appointment(**APPOINTMENT)
+        keys = [kwargs['headers']['Idempotency-Key'] for method, url, kwargs in service.session.requests]
+        self.assertEqual(len(set(keys)), 1)
+
+    def test_get_read_timeout_is_retried(self):
+        service = client(requests.ReadTimeout(), 200)
+
+        service.location('1')
+        self.assertEqual(len(service.session.requests), 2)
+
+    def test_put_read_timeout_and_server_error_are_not_retried(self):
+        for outcome in (requests.ReadTimeout(), 500, 502, 504):
+            service = client(outcome, 200)
+
+            with self.assertRaises(requests.RequestException):
+                service.cancel_appointment('1')
+            self.assertEqual(len(service.session.requests), 1)
+
+    def test_puts_carry_an_idempotency_key(self):
+        service = client(503, 200)
+
+        service.cancel_appointment('1')
+        keys = [kwargs['headers']['Idempotency-Key'] for method, url, kwargs in service.session.requests]
+        self.assertEqual(len(set(keys)), 1)
+
+    def test_processed_booking_is_not_released(self):
+        # the booking is processed, but its response times out
+        service = client(200, requests.ReadTimeout(), 200)
+
+        with self.assertRaises(requests.ReadTimeout):
+            service.reserve_and_book(email='customer@example.com', **APPOINTMENT)
+        self.assertEqual([(method, url.rsplit('/', 1)[-1]) for method, url, kwargs in service.session.requests],
+                         [('POST', 'appointments'), ('PUT', 'book')])
+
+    def test_rejected_booking_is_released(self):
+        service = client(200, 409, 200)
+
+        with self.assertRaises(requests.HTTPError):
+            service.reserve_and_book(email='customer@example.com', **APPOINTMENT)
+        self.assertEqual([(method, url.rsplit('/', 1)[-1]) for method, url, kwargs in service.session.requests],
+                         [('POST', 'appointments'), ('PUT', 'book'), ('PUT', 'cancel')])
+
+    def test_bulk_retries_override(self):
+        service = client(503, 200, retries=2)
+        service.appointments = lambda **filters: { 'data': [{ 'id': '1' }] }
+
+        results = list(service.bulk_cancel_appointments(retries=0))
+        self.assertIsInstance(results[0]['error'], requests.HTTPError)
+        self.assertEqual(len(service.session.requests), 1)
+
+        # the override only applies to the calls of the bulk operation
+        service.session.outcomes = [503, 200]
+        service.cancel_appointment('1')
+        self.assertEqual(len(service.session.requests), 3)
+
+    def test_deadline_stops_the_retries(self):
+        service = client(503, 503, 503, retries=5, backoff=10 ** 6, max_backoff=10 ** 6)
+
+        with self.assertRaises(DeadlineExceeded):
+            with service.deadline(1):
+                service.cancel_appointment('1')
+        self.assertEqual(len(service.session.requests), 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        service = client(500, 500, 200, retries=0, circuit_breaker=breaker)
+
+        for attempt in range(2):
+            with self.assertRaises(requests.HTTPError):
+                service.cancel_appointment('1')
+        with self.assertRaises(CircuitOpenError):
+            service.cancel_appointment('1')
+
+        self.assertEqual(len(service.session.requests), 2)
+        self.assertEqual(breaker.state('PUT /consumer/v1/appointments/{id}/cancel'), 'open')
+
+    def test_trial_closes_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        service = client(500, 200, retries=0, circuit_breaker=breaker)
+
+        with self.assertRaises(requests.HTTPError):
+            service.cancel_appointment('1')
+        service.cancel_appointment('1')
+
+        self.assertEqual(breaker.state('PUT /consumer/v1/appointments/{id}/cancel'), 'closed')
+
+    def test_only_one_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.failed('endpoint')
+
+        self.assertTrue(breaker.before('endpoint'))
+        with self.assertRaises(CircuitOpenError):
+            breaker.before('endpoint')
+
+        breaker.failed('endpoint')
+        self.assertTrue(breaker.before('endpoint'))
+
+    def test_throttled_trial_is_released(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        service = client(500, 429, 200, retries=0, throttle_retries=0, circuit_breaker=breaker)
+
+        with self.assertRaises(requests.HTTPError):
+            service.cancel_appointment('1')
+        with self.assertRaises(requests.HTTPError):
+            service.cancel_appointment('1')
+
+        self.assertEqual(breaker.state('PUT /consumer/v1/appointments/{id}/cancel'), 'half-open')
+        service.cancel_appointment('1')
+        self.assertEqual(breaker.state('PUT /consumer/v1/appointments/{id}/cancel'), 'closed')
+
+    def test_trial_is_released_on_other_errors(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        service = client(500, RuntimeError('token expired'), 200, retries=0, circuit_breaker=breaker)
+
+        with self.assertRaises(requests.HTTPError):
+            service.cancel_appointment('1')
+        with self.assertRaises(RuntimeError):
+            service.cancel_appointment('1')
+
+        service.cancel_appointment('1')
+        self.assertEqual(breaker.state('PUT /consumer/v1/appointments/{id}/cancel'), 'closed')
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def test_throttling_halves_the_concurrency(self):
+        scheduler = RequestScheduler(max_concurrency=8, min_concurrency=2)
+
+        scheduler.throttled(0)
+        self.assertEqual(scheduler.stats()['concurrency'], 4)
+        scheduler.throttled(0)
+        scheduler.throttled(0)
+        self.assertEqual(scheduler.stats()['concurrency'], 2)
+
+        for request in range(20):
+            scheduler.succeeded()
+        self.assertGreater(scheduler.stats()['concurrency'], 2)
+
+    def test_throttles_during_a_pause_lower_the_concurrency_once(self):
+        scheduler = RequestScheduler(max_concurrency=8)
+
+        scheduler.throttled(60)
+        scheduler.throttled(60)
+        self.assertEqual(scheduler.stats()['concurrency'], 4)
+
+    def test_slots_bound_the_requests_in_flight(self):
+        scheduler = RequestScheduler(max_concurrency=2)
+        in_flight = []
+        lock = threading.Lock()
+
+        def send():
+            with scheduler.slot():
+                with lock:
+                    in_flight.append(scheduler.stats()['in_flight'])
+                time.sleep(0.01)
+
+        threads = [threading.Thread(target=send) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(in_flight), 8)
+        self.assertLessEqual(max(in_flight), 2)
+
+    def test_pause_delays_the_slots(self):
+        scheduler = RequestScheduler()
+        scheduler.throttled(0.05)
+
+        started_at = time.monotonic()
+        with scheduler.slot():
+            pass
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.04)
+
+    def test_slot_timeout_during_a_pause(self):
+        scheduler = RequestScheduler()
+        scheduler.throttled(60)
+
+        started_at = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            with scheduler.slot(0.05):
+                pass
+        self.assertLess(time.monotonic() - started_at, 1)
+        self.assertEqual(scheduler.stats()['queued'], 0)
+
+    def test_slot_timeout_at_the_concurrency_limit(self):
+        scheduler = RequestScheduler(max_concurrency=1)
+
+        with scheduler.slot():
+            with self.assertRaises(DeadlineExceeded):
+                with scheduler.slot(0.05):
+                    pass
+        self.assertEqual(scheduler.stats()['in_flight'], 0)
+
+    def test_deadline_bounds_the_retry_after_pause(self):
+        service = client(response(429, headers={ 'Retry-After': '60' }), 200)
+
+        started_at = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            with service.deadline(0.1):
+                service.cancel_appointment('1')
+        self.assertLess(time.monotonic() - started_at, 1)
+        self.assertEqual(len(service.session.requests), 1)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_rate(self):
+        limiter = RateLimiter(100)
+
+        started_at = time.monotonic()
+        for request in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.04)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import time
+
+from conftest import FakeSession
+
+try:
+    from ..onsched_service import OnSchedService, ResponseCache
+except ImportError:
+    from onsched_service import OnSchedService, ResponseCache
+
+
+class BookingSession(FakeSession):
+    """Session answering every GET with the current data, and POST and PUT with an appointment"""
+    def respond(self, method, url, kwargs):
+        if method == 'GET':
+            return self.data
+
+        return { 'id': '10', 'serviceId': '5', 'resourceId': '1', 'status': 'IN',
+                 'startDateTime': '2026-10-01T09:00:00-5:00', 'endDateTime': '2026-10-01T10:00:00-5:00' }
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_get_and_set(self):
+        cache = ResponseCache()
+        self.assertIsNone(cache.get('url'))
+
+        cache.set('url', { 'data': [] }, endpoint='locations')
+        self.assertEqual(cache.get('url'), { 'data': [] })
+        self.assertEqual(cache.stats(), { 'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1 })
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=0.01, ttls={ 'locations': 60 })
+        cache.set('short', 1)
+        cache.set('long', 2, endpoint='locations')
+
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('short'))
+        self.assertEqual(cache.get('long'), 2)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        cache = ResponseCache()
+        cache.set('a', 1, endpoint='availability', info={ 'serviceId': '5' })
+        cache.set('b', 2, endpoint='availability', info={ 'serviceId': '6' })
+        cache.set('c', 3, endpoint='locations')
+
+        cache.invalidate('availability', match=lambda info: info['serviceId'] == '5')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 2)
+
+        cache.invalidate('availability')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_response_fetched_across_an_invalidation_is_not_cached(self):
+        cache = ResponseCache()
+        generation = cache.generation
+
+        cache.invalidate('availability')
+        cache.set('a', 1, endpoint='availability', generation=generation)
+        self.assertIsNone(cache.get('a'))
+
+        cache.set('a', 1, endpoint='availability', generation=cache.generation)
+        self.assertEqual(cache.get('a'), 1)
+
+
+class TestCachedClient(unittest.TestCase):
+    def test_reference_data_is_cached(self):
+        service = OnSchedService(client_id='client', client_secret='secret', response_cache=ResponseCache())
+        service.session = FakeSession(data={ 'id': '1', 'name': 'location' })
+
+        first = service.location('1')
+        first['name'] = 'changed'
+        self.assertEqual(service.location('1')['name'], 'location')
+        self.assertEqual(service.session.gets, 1)
+
+    def test_booking_invalidates_the_availability(self):
+        service = OnSchedService(client_id='client', client_secret='secret', availability_cache=ResponseCache())
+        service.session = BookingSession(data={ 'serviceId': '5', 'availableTimes': ['09:00'] })
+
+        service.availability(5, '2026-10-01', '2026-10-01')
+        service.availability(5, '2026-10-01', '2026-10-01')
+        self.assertEqual(service.session.gets, 1)
+
+        service.create_appointment('5', '2026-10-01T09:00:00-5:00', '2026-10-01T10:00:00-5:00', '1')
+        service.session.data = { 'serviceId': '5', 'availableTimes': [] }
+        self.assertEqual(service.availability(5, '2026-10-01', '2026-10-01')['availableTimes'], [])
+        self.assertEqual(service.session.gets, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import tempfile
+import unittest
+import time
+import os
+from unittest import mock
+
+from requests_oauthlib import OAuth2Session
+
+try:
+    from ..onsched_service import OnSchedService, TokenStore, SharedMemoryTokenStore
+except ImportError:
+    from onsched_service import OnSchedService, TokenStore, SharedMemoryTokenStore
+
+
+def token(expires_in=3600):
+    return { 'access_token': 'token', 'token_type': 'Bearer', 'expires_at': time.time() + expires_in }
+
+
+class MemoryTokenStore(TokenStore):
+    """Token store keeping the tokens in a dict, as if written by other processes"""
+    def __init__(self, tokens=None):
+        self.tokens = dict(tokens or {})
+
+
+    def get(self, key):
+        return self.tokens.get(key)
+
+
+    def set(self, key, token):
+        self.tokens[key] = token
+
+
+class TestTokenRefreshes(unittest.TestCase):
+    def setUp(self):
+        self.service = OnSchedService(client_id='client', client_secret='secret')
+
+        with mock.patch.object(OAuth2Session, 'fetch_token', return_value=token()):
+            self.service._set_session()
+        self.service.session.token = token(expires_in=-60)
+
+    def test_first_token_is_not_a_refresh(self):
+        self.assertEqual(self.service.token_refreshes, { 'consumer': 0, 'setup': 0 })
+
+    def test_refresh_is_counted(self):
+        with mock.patch.object(OAuth2Session, 'fetch_token', return_value=token()):
+            self.service._set_session()
+
+        self.assertEqual(self.service.token_refreshes['consumer'], 1)
+
+    def test_failed_refresh_is_not_counted(self):
+        with mock.patch.object(OAuth2Session, 'fetch_token', side_effect=RuntimeError('server down')):
+            with self.assertRaises(RuntimeError):
+                self.service._set_session()
+
+        self.assertEqual(self.service.token_refreshes['consumer'], 0)
+
+    def test_token_of_another_process_is_not_counted(self):
+        key = TokenStore().key(client_id='client', scope=self.service.scope, token_url=self.service.token_url)
+        self.service.token_store = MemoryTokenStore({ key: token() })
+
+        with mock.patch.object(OAuth2Session, 'fetch_token', side_effect=AssertionError('token requested')):
+            self.service._set_session()
+
+        self.assertEqual(self.service.token_refreshes['consumer'], 0)
+
+
+class TestSharedMemoryTokenStore(unittest.TestCase):
+    def setUp(self):
+        self.lock_dir = tempfile.TemporaryDirectory()
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            for block in store._blocks.values():
+                block.close()
+        if self.stores and self.stores[0]._blocks:
+            next(iter(self.stores[0]._blocks.values())).unlink()
+        self.lock_dir.cleanup()
+
+    def store(self):
+        self.stores.append(SharedMemoryTokenStore(lock_dir=self.lock_dir.name))
+        return self.stores[-1]
+
+    def test_token_is_shared_between_stores(self):
+        self.assertIsNone(self.store().get('key'))
+
+        self.stores[0].set('key', token())
+        self.assertEqual(self.store().get('key')['access_token'], 'token')
+
+    def test_block_name_is_random_and_saved_privately(self):
+        store = self.store()
+        store.get('key')
+
+        path = store._name_path('key')
+        with open(path) as name_file:
+            self.assertEqual(name_file.read(), store._blocks['key'].name)
+        self.assertNotIn('key', store._blocks['key'].name)
+        self.assertEqual(os.stat(path).st_mode & 0o077, 0)
+
+    def test_name_writable_by_other_users_is_refused(self):
+        self.store().get('key')
+        os.chmod(self.stores[0]._name_path('key'), 0o666)
+
+        with self.assertRaises(PermissionError):
+            self.store().get('key')
+
+
+if __name__ == '__main__':
+    unittest.main()